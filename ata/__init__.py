@@ -1,13 +1,31 @@
 """
 AI Terminal Assistant
+
+公共接口按需导入：``import ata`` 本身不会加载 rich、aiohttp、pydantic、psutil
+等第三方依赖，只有在首次访问对应名称时才导入所在模块。
 """
 
 __version__ = "1.0.0"
 
-from .ai_interface import AIInterface, Message
-from .command_executor import CommandExecutor, CommandExecutionError, CommandResult
-from .config_manager import ConfigManager
-from .cli import CLI
+import importlib
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .ai_interface import AIInterface, Message
+    from .command_executor import CommandExecutor, CommandExecutionError, CommandResult
+    from .config_manager import ConfigManager
+    from .cli import CLI
+
+# 公共名称 -> 所在模块
+_LAZY_ATTRS = {
+    "AIInterface": ".ai_interface",
+    "Message": ".ai_interface",
+    "CommandExecutor": ".command_executor",
+    "CommandExecutionError": ".command_executor",
+    "CommandResult": ".command_executor",
+    "ConfigManager": ".config_manager",
+    "CLI": ".cli",
+}
 
 __all__ = [
     "AIInterface",
@@ -19,7 +37,19 @@ __all__ = [
     "CLI",
 ]
 
-from typing import Dict, Any, Optional
+
+def __getattr__(name: str) -> Any:
+    """首次访问公共名称时导入所在模块"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 __author__ = "AI Terminal Assistant Team"
 __email__ = "corbing1031@gmail.com"
@@ -31,7 +61,7 @@ def create_assistant(
     model: Optional[str] = None,
     shell: Optional[str] = None,
     working_dir: Optional[str] = None
-) -> CLI:
+) -> "CLI":
     """
     创建一个新的终端助手实例
     
@@ -45,6 +75,11 @@ def create_assistant(
     返回:
         CLI实例
     """
+    from .ai_interface import AIInterface
+    from .cli import CLI
+    from .command_executor import CommandExecutor
+    from .config_manager import ConfigManager
+    
     # 创建配置管理器
     config_manager = ConfigManager(config_path)
     
@@ -64,6 +99,7 @@ def create_assistant(
     ai_interface = AIInterface(
         provider=current_provider,
         model=provider_config.get("model"),
+        config=config_manager,
         fallback_provider=config_manager.get("ai.fallback_provider"),
         fallback_model=config_manager.get_provider_config(
             config_manager.get("ai.fallback_provider")
@@ -100,6 +136,9 @@ def execute_command(
     返回:
         命令执行结果
     """
+    from .command_executor import CommandExecutor
+    from .config_manager import ConfigManager
+    
     config = ConfigManager()
     if shell:
         config.set("general.default_shell", shell)
@@ -127,6 +166,10 @@ def generate_command(
     返回:
         生成的命令数据
     """
+    from .ai_interface import AIInterface
+    from .command_executor import CommandExecutor
+    from .config_manager import ConfigManager
+    
     ai_interface = AIInterface(
         provider=provider,
         model=model,
@@ -10,13 +10,8 @@ import asyncio
 from pathlib import Path
 from typing import Optional
 
-from rich.logging import RichHandler
-
 from .config_manager import ConfigManager
-from .command_executor import CommandExecutor
-from .ai_interface import AIInterface
-from .cli import CLI
-from .web_server import WebServer
+from .log_pipeline import PayloadPolicy, configure_logging
 
 
 logger = logging.getLogger(__name__)
@@ -32,6 +27,8 @@ def setup_logging(config: ConfigManager) -> None:
     log_format = config.get("logging.format", "%(message)s")
     log_file = config.get("logging.file")
     
+    from rich.logging import RichHandler
+    
     # 设置Rich日志处理器
     rich_handler = RichHandler(
         rich_tracebacks=True,
@@ -40,22 +37,20 @@ def setup_logging(config: ConfigManager) -> None:
         show_path=False
     )
     
-    # 如果指定了日志文件，同时输出到文件
-    handlers = [rich_handler]
+    # 如果指定了日志文件，同时输出到文件（在后台线程中写入）
+    file_handlers = []
     if log_file:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(logging.Formatter(
-            config.get("logging.format"),
-            datefmt=config.get("logging.date_format")
-        ))
-        handlers.append(file_handler)
+        file_handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
     
     # 配置根日志记录器
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format=log_format,
-        handlers=handlers,
-        force=True
+    configure_logging(
+        level=log_level,
+        console_handler=rich_handler,
+        file_handlers=file_handlers,
+        fmt=log_format,
+        datefmt=config.get("logging.date_format"),
+        as_json=config.get("logging.json", False),
+        policy=PayloadPolicy.from_config(config)
     )
 
 
@@ -74,8 +69,8 @@ def parse_args() -> argparse.Namespace:
     
     parser.add_argument(
         "--provider",
-        choices=["openai", "deepseek"],
-        help="AI提供商"
+        choices=["openai", "deepseek", "mock"],
+        help="AI提供商（mock为本地模拟服务，需先运行 python -m ata.mock_server）"
     )
     
     parser.add_argument(
@@ -144,6 +139,10 @@ async def async_main(args: Optional[argparse.Namespace] = None) -> int:
         if args.working_dir:
             config.set("general.working_directory", args.working_dir)
         
+        # 各模式只导入自己需要的模块，Web模式不加载rich界面，CLI模式不加载Quart
+        from .ai_interface import AIInterface
+        from .command_executor import CommandExecutor
+        
         # 创建组件
         ai_interface = AIInterface(config)
         command_executor = CommandExecutor(config)
@@ -152,6 +151,8 @@ async def async_main(args: Optional[argparse.Namespace] = None) -> int:
             # 根据模式选择运行方式
             if args.web or config.get("general.web_server.enabled", False):
                 # Web模式
+                from .web_server import WebServer
+                
                 web_server = WebServer(config)
                 host = config.get("general.web_server.host", "127.0.0.1")
                 port = config.get("general.web_server.port", 8000)
@@ -162,6 +163,8 @@ async def async_main(args: Optional[argparse.Namespace] = None) -> int:
                     
             else:
                 # CLI模式
+                from .cli import CLI
+                
                 cli = CLI(ai_interface, command_executor, config)
                 
                 # 如果提供了查询，直接执行
@@ -4,53 +4,191 @@ AI接口模块，提供与不同AI提供商的交互功能
 
 import os
 import json
+import time
+import hashlib
+import functools
 import logging
 import asyncio
-import socket
 import sys
-from typing import Dict, Any, List, Optional, Generator, Union, AsyncGenerator
+from typing import Dict, Any, List, Optional, Generator, Sequence, Tuple, Union, AsyncGenerator
 from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
 
-import openai
-from openai import OpenAI
 import aiohttp
-import requests
-from aiohttp import ClientTimeout, TCPConnector
-from pydantic import BaseModel, Field
 
 # 网络配置
-DEFAULT_TIMEOUT = 30  # 默认超时时间（秒）
-MAX_RETRIES = 3      # 最大重试次数
-RETRY_DELAY = 1      # 重试延迟（秒）
+STREAM_DONE = b"[DONE]"  # 流式响应结束标记
 
 from .config_manager import ConfigManager
 from .exceptions import AIError, APIError
+from .http_pool import HTTPConnectionPool, PoolConfig, get_shared_pool
+from .response_cache import ResponseCache, make_cache_key, normalize_input, fingerprint
+from .singleflight import SingleFlight
+from .json_stream import IncrementalJSONParser
+from .json_repair import StructuredOutputConfig, StructuredOutputStats, loads_lenient
+from .context_builder import ContextBuilder, message_tokens
+from .conversation_store import DEFAULT_SESSION, ConversationStore
+from .fast_path import FastPath
+from .prefetch import Prefetcher
+from .log_pipeline import payload, register_secret
+from .failover import FailoverStats, HedgePolicy, ProviderHealth, hedged_call, mark_response_started
+from .sse import SSEEvent, iter_events
+from .timing import begin_timing, current_timing, end_timing, track_timing
+from .rate_limiter import (PRIORITY_BATCH, RateLimitConfig, RateLimiter, get_rate_limiter,
+                           limiter_name, request_priority)
+from .retry import NETWORK_ERRORS, CircuitBreaker, RetryPolicy, get_breaker, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
 
-class Message(BaseModel):
-    """对话消息模型"""
-    role: str = Field(..., description="消息角色（user/assistant/system）")
-    content: str = Field(..., description="消息内容")
+def __getattr__(name: str) -> Any:
+    """按需创建依赖pydantic的Message模型，导入本模块时不加载pydantic"""
+    if name != "Message":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from pydantic import BaseModel, Field
+
+    class Message(BaseModel):
+        """对话消息模型"""
+        role: str = Field(..., description="消息角色（user/assistant/system）")
+        content: str = Field(..., description="消息内容")
+
+    Message.__module__ = __name__
+    globals()["Message"] = Message
+    return Message
+
+
+@dataclass
+class StreamStats:
+    """流式生成命令的统计信息"""
+    streams: int = 0
+    total_time_to_command: float = 0.0
+    last_time_to_command: float = 0.0
+    max_time_to_command: float = 0.0
+    
+    def record(self, time_to_command: float) -> None:
+        """记录一次命令可用耗时"""
+        self.streams += 1
+        self.total_time_to_command += time_to_command
+        self.last_time_to_command = time_to_command
+        self.max_time_to_command = max(self.max_time_to_command, time_to_command)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["avg_time_to_command"] = (
+            self.total_time_to_command / self.streams if self.streams else 0.0
+        )
+        return data
+
+
+@dataclass
+class UsageStats:
+    """提供商返回的令牌用量统计"""
+    requests: int = 0  # 返回了用量的请求数
+    prompt_tokens: int = 0  # 累计提示令牌数
+    completion_tokens: int = 0  # 累计生成令牌数
+    cached_tokens: int = 0  # 累计命中提供商前缀缓存的提示令牌数
+    
+    def record(self, usage: Dict[str, int]) -> None:
+        """记录一次请求的用量"""
+        self.requests += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cached_tokens += usage.get("cached_tokens", 0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["cached_ratio"] = self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+        return data
 
 
 class AIProvider:
     """AI提供商基类"""
     
     DEFAULT_MODEL = None  # 子类必须定义默认模型
+    DEFAULT_API_KEY = None  # 无需密钥的提供商可定义默认密钥
+    
+    # 生成命令时使用的系统提示分为两部分：
+    # 前缀在进程内保持字节级不变，便于提供商侧的前缀缓存命中；
+    # 随请求变化的系统信息放在末尾的后缀中
+    SYSTEM_PROMPT_PREFIX = ""
+    SYSTEM_PROMPT_SUFFIX = "系统信息：{system_info}"
+    PROMPT_CACHE_SIZE = 32  # 渲染结果缓存的条目数
     
-    def __init__(self, api_key: str, model: str, temperature: float = 0.7):
+    def __init__(self, api_key: str, model: str, temperature: float = 0.7,
+                 pool: Optional[HTTPConnectionPool] = None):
         """初始化AI提供商
         
         Args:
             api_key: API密钥
             model: 模型名称
             temperature: 温度参数
+            pool: HTTP连接池，未指定时使用进程级共享连接池
         """
         self.api_key = api_key
         self.model = model
         self.temperature = temperature
+        self.pool = pool or get_shared_pool()
+        self._prompt_prefix: Optional[str] = None
+        self._prompt_cache: "OrderedDict[str, str]" = OrderedDict()
+    
+    def prompt_fingerprint(self) -> str:
+        """获取系统提示模板的指纹，模板变化时指纹随之变化
+        
+        Returns:
+            指纹字符串
+        """
+        template = self.SYSTEM_PROMPT_PREFIX + self.SYSTEM_PROMPT_SUFFIX
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+    
+    def render_prompt_prefix(self) -> str:
+        """渲染系统提示的静态前缀，每个实例只调用一次
+        
+        Returns:
+            前缀文本
+        """
+        return self.SYSTEM_PROMPT_PREFIX
+    
+    @property
+    def prompt_prefix(self) -> str:
+        """系统提示的静态前缀"""
+        if self._prompt_prefix is None:
+            self._prompt_prefix = self.render_prompt_prefix()
+        return self._prompt_prefix
+    
+    def system_prompt(self, system_info: Dict[str, Any]) -> str:
+        """生成命令时使用的系统提示
+        
+        渲染结果按系统信息的指纹缓存，系统信息不变时不会重新渲染。
+        
+        Args:
+            system_info: 系统信息
+            
+        Returns:
+            系统提示文本
+        """
+        key = fingerprint(system_info)
+        prompt = self._prompt_cache.get(key)
+        if prompt is not None:
+            self._prompt_cache.move_to_end(key)
+            return prompt
+        
+        prompt = self.prompt_prefix + self.SYSTEM_PROMPT_SUFFIX.format(
+            system_info=json.dumps(system_info, ensure_ascii=False, sort_keys=True)
+        )
+        self._prompt_cache[key] = prompt
+        if len(self._prompt_cache) > self.PROMPT_CACHE_SIZE:
+            self._prompt_cache.popitem(last=False)
+        return prompt
+    
+    async def close(self):
+        """释放提供商自身持有的资源
+        
+        连接池由AIInterface统一管理，这里不关闭共享连接。
+        """
+        pass
     
     async def generate_command(self, 
                              user_input: str,
@@ -91,30 +229,17 @@ class AIProvider:
             APIError: API调用错误
         """
         raise NotImplementedError
-
-
-class OpenAIProvider(AIProvider):
-    """OpenAI提供商实现"""
     
-    DEFAULT_MODEL = "gpt-3.5-turbo"  # OpenAI的默认模型
-    
-    def __init__(self, api_key: str, model: Optional[str] = None, temperature: float = 0.7):
-        """初始化OpenAI提供商
-        
-        Args:
-            api_key: API密钥
-            model: 模型名称，如果未指定则使用默认模型
-            temperature: 温度参数
-        """
-        super().__init__(api_key, model or self.DEFAULT_MODEL, temperature)
-        self.client = OpenAI(api_key=api_key)
-    
-    async def generate_command(self,
+    async def stream_command(self,
                              user_input: str,
                              system_info: Dict[str, Any],
                              history: Optional[List[Dict[str, str]]] = None
-                             ) -> Dict[str, Any]:
-        """生成命令
+                             ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式生成命令
+        
+        先产出 type="command" 事件（当前系统可用的命令），
+        最后产出 type="result" 事件（完整结果及耗时指标）。
+        默认实现在完整响应到达后一次性产出两个事件。
         
         Args:
             user_input: 用户输入
@@ -122,195 +247,218 @@ class OpenAIProvider(AIProvider):
             history: 历史记录
             
         Returns:
-            包含命令和解释的字典
+            事件生成器
             
         Raises:
-            APIError: API调用错误
             AIError: AI服务错误
-        """
-        try:
-            messages = []
-            
-            # 添加系统信息
-            messages.append({
-                "role": "system",
-                "content": """你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
-你必须以JSON格式返回响应，格式如下：
-{
-    "command": "具体的命令",
-    "explanation": "命令的解释",
-    "warnings": ["可能的风险提示"]
-}
-
-系统信息：""" + json.dumps(system_info)
-            })
-            
-            # 添加历史记录
-            if history:
-                messages.extend(history)
-            
-            # 添加用户输入
-            messages.append({
-                "role": "user",
-                "content": user_input
-            })
-            
-            # 调用API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature
-            )
-            
-            # 解析响应
-            content = response.choices[0].message.content
-            try:
-                result = json.loads(content)
-                return {
-                    "command": result["command"],
-                    "explanation": result["explanation"],
-                    "warnings": result.get("warnings", [])
-                }
-            except (json.JSONDecodeError, KeyError) as e:
-                raise AIError(f"无效的AI响应格式: {str(e)}")
-            
-        except Exception as e:
-            if isinstance(e, AIError):
-                raise
-            raise APIError(f"OpenAI API调用失败: {str(e)}")
-    
-    async def stream_chat(self,
-                         messages: List[Dict[str, str]],
-                         system_info: Dict[str, Any]
-                         ) -> AsyncGenerator[str, None]:
-        """流式聊天
-        
-        Args:
-            messages: 消息列表
-            system_info: 系统信息
-            
-        Returns:
-            聊天响应生成器
-            
-        Raises:
             APIError: API调用错误
         """
-        try:
-            # 添加系统信息
-            all_messages = [
-                {
-                    "role": "system",
-                    "content": """你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
-你必须以JSON格式返回响应，格式如下：
-{
-    "command": "具体的命令",
-    "explanation": "命令的解释",
-    "warnings": ["可能的风险提示"]
-}
-
-系统信息：""" + json.dumps(system_info)
-                }
-            ]
-            all_messages.extend(messages)
-            
-            # 调用流式API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=all_messages,
-                temperature=self.temperature,
-                stream=True
-            )
-            
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-                    
-        except Exception as e:
-            raise APIError(f"OpenAI流式API调用失败: {str(e)}")
+        start = time.monotonic()
+        result = await self.generate_command(user_input, system_info, history)
+        elapsed = time.monotonic() - start
+        yield {
+            "type": "command",
+            "command": result["command"],
+            "explanation": result.get("explanation", ""),
+            "time_to_command": elapsed
+        }
+        yield dict(result, type="result", time_to_command=elapsed, total_time=elapsed)
 
 
-class DeepSeekProvider(AIProvider):
-    """DeepSeek提供商实现"""
+class OpenAICompatibleProvider(AIProvider):
+    """兼容OpenAI Chat Completions协议的提供商基类
     
-    API_URL = "https://api.deepseek.com/v1/chat/completions"  # 更新为正确的API端点
-    DEFAULT_MODEL = "deepseek-chat"  # DeepSeek的默认模型
+    所有请求都通过共享连接池以异步方式发送，
+    子类只需定义API端点并实现提示词和响应解析。
+    """
     
-    def __init__(self, api_key: str, model: Optional[str] = None, temperature: float = 0.7):
-        """初始化DeepSeek提供商
+    API_URL = None  # 子类必须定义API端点
+    PROVIDER_LABEL = "AI"  # 用于错误信息的提供商名称
+    STREAM_WATCH: List[tuple] = []  # 流式解析时关注的JSON路径
+    
+    def __init__(self, api_key: str, model: Optional[str] = None, temperature: float = 0.7,
+                 pool: Optional[HTTPConnectionPool] = None, api_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 structured_output: Optional[StructuredOutputConfig] = None,
+                 output_stats: Optional[StructuredOutputStats] = None):
+        """初始化提供商
         
         Args:
             api_key: API密钥
             model: 模型名称，如果未指定则使用默认模型
             temperature: 温度参数
+            pool: HTTP连接池
+            api_url: API端点，未指定时使用类上定义的默认端点
+            retry_policy: 重试策略，未指定时使用默认策略
+            breaker: 熔断器，未指定时使用该端点的共享熔断器
+            rate_limiter: 客户端限流器，未指定时不限流
+            structured_output: 结构化输出配置，未指定时启用JSON模式和本地修复
+            output_stats: 命令响应的解析统计，未指定时单独统计
         """
-        super().__init__(api_key, model or self.DEFAULT_MODEL, temperature)
+        super().__init__(api_key, model or self.DEFAULT_MODEL, temperature, pool)
+        self.api_url = api_url or self.API_URL
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or get_breaker(self.breaker_name(self.api_url))
+        self.rate_limiter = rate_limiter
+        self.structured_output = structured_output or StructuredOutputConfig()
+        self.output_stats = output_stats or StructuredOutputStats()
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-        self._session = None
     
     @property
     async def session(self) -> aiohttp.ClientSession:
-        """获取或创建aiohttp会话"""
-        if self._session is None or self._session.closed:
-            # 配置SSL和超时
-            timeout = ClientTimeout(total=DEFAULT_TIMEOUT)
-            connector = TCPConnector(
-                ssl=False,  # 禁用SSL验证以处理某些证书问题
-                force_close=True,  # 强制关闭连接以避免连接池问题
-                enable_cleanup_closed=True,  # 清理已关闭的连接
-                ttl_dns_cache=300,  # DNS缓存时间（秒）
-            )
-            self._session = aiohttp.ClientSession(
-                headers=self.headers,
-                timeout=timeout,
-                connector=connector
+        """获取共享连接池中的aiohttp会话"""
+        return await self.pool.get_session()
+    
+    @classmethod
+    def breaker_name(cls, api_url: Optional[str] = None) -> str:
+        """获取端点对应的共享熔断器名称"""
+        return f"{cls.PROVIDER_LABEL}:{api_url or cls.API_URL}"
+    
+    async def _post(self, url: str, data: Dict[str, Any]) -> aiohttp.ClientResponse:
+        """发送一次请求，非200响应转换为带状态码的APIError
+        
+        Args:
+            url: API端点URL
+            data: 请求数据
+            
+        Returns:
+            状态码为200的响应，调用方负责释放
+            
+        Raises:
+            APIError: 响应状态码不是200
+        """
+        session = await self.session
+        started = time.monotonic()
+        response = await session.post(url, json=data, headers=self.headers)
+        timing = current_timing()
+        if timing is not None:
+            timing.time_to_first_byte = time.monotonic() - started
+        if response.status != 200:
+            try:
+                error_text = await response.text()
+            finally:
+                response.release()
+            raise APIError(
+                f"{self.PROVIDER_LABEL} API调用失败: {response.status} - {error_text}",
+                status=response.status,
+                retry_after=parse_retry_after(response.headers.get("Retry-After"))
             )
-        return self._session
+        mark_response_started()
+        return response
     
-    async def close(self):
-        """关闭会话"""
-        if self._session and not self._session.closed:
-            await self._session.close()
+    @staticmethod
+    def _estimate_tokens(data: Dict[str, Any]) -> int:
+        """估算请求的提示令牌数"""
+        return sum(message_tokens(message) for message in data.get("messages", []))
     
-    async def _make_request(self, url: str, data: Dict[str, Any], retry_count: int = 0) -> Dict[str, Any]:
-        """发送请求并处理重试逻辑
+    async def _acquire_rate_limit(self, data: Dict[str, Any]) -> None:
+        """按估算的提示令牌获取限流额度
+        
+        由重试策略在每次尝试、检查熔断器之前调用。
+        
+        Args:
+            data: 请求数据
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self._estimate_tokens(data))
+    
+    async def _request_once(self, url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """发送一次非流式请求并解析JSON响应"""
+        response = await self._post(url, data)
+        try:
+            response_text = await response.text()
+        finally:
+            response.release()
+        logger.debug("API原始响应: %s", payload(response_text))
+        result = json.loads(response_text)
+        
+        # 按实际用量校正令牌桶
+        if self.rate_limiter is not None:
+            usage = self._parse_usage(result)
+            if usage is not None:
+                self.rate_limiter.correct(
+                    self._estimate_tokens(data), usage["prompt_tokens"] + usage["completion_tokens"]
+                )
+        return result
+    
+    async def _make_request(self, url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """按重试策略和熔断器发送请求
         
         Args:
             url: API端点URL
             data: 请求数据
-            retry_count: 当前重试次数
             
         Returns:
             API响应数据
             
         Raises:
+            CircuitOpenError: 提供商处于熔断状态
             APIError: API调用失败
         """
         try:
-            session = await self.session
-            async with session.post(url, json=data) as response:
-                response_text = await response.text()
-                logger.debug(f"API响应状态码: {response.status}")
-                logger.debug(f"API原始响应: {response_text}")
-                
-                if response.status != 200:
-                    raise APIError(f"DeepSeek API调用失败: {response.status} - {response_text}")
-                
-                return json.loads(response_text)
-                
-        except (aiohttp.ClientError, socket.gaierror, asyncio.TimeoutError) as e:
-            if retry_count < MAX_RETRIES:
-                logger.warning(f"API请求失败，将在{RETRY_DELAY}秒后重试 ({retry_count + 1}/{MAX_RETRIES}): {str(e)}")
-                await asyncio.sleep(RETRY_DELAY)
-                return await self._make_request(url, data, retry_count + 1)
-            else:
-                logger.error(f"API请求在{MAX_RETRIES}次重试后仍然失败: {str(e)}")
-                raise APIError(f"DeepSeek API调用失败: {str(e)}")
+            return await self.retry_policy.run(
+                lambda: self._request_once(url, data), self.breaker, self.PROVIDER_LABEL,
+                acquire=lambda: self._acquire_rate_limit(data)
+            )
+        except APIError:
+            raise
+        except NETWORK_ERRORS as e:
+            logger.error(f"API请求失败: {str(e)}")
+            raise APIError(f"{self.PROVIDER_LABEL} API调用失败: {str(e)}")
         except Exception as e:
             logger.error(f"API请求出现未预期的错误: {str(e)}", exc_info=True)
-            raise APIError(f"DeepSeek API调用失败: {str(e)}")
+            raise APIError(f"{self.PROVIDER_LABEL} API调用失败: {str(e)}")
+    
+    async def _make_stream_request(self, url: str, data: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        """发送流式请求
+        
+        建立连接阶段按重试策略重试；开始产出内容后不再重试，避免重复输出。
+        
+        Args:
+            url: API端点URL
+            data: 请求数据
+            
+        Returns:
+            流式响应生成器
+            
+        Raises:
+            CircuitOpenError: 提供商处于熔断状态
+            APIError: API调用失败
+        """
+        try:
+            response = await self.retry_policy.run(
+                lambda: self._post(url, data), self.breaker, self.PROVIDER_LABEL,
+                acquire=lambda: self._acquire_rate_limit(data)
+            )
+        except APIError:
+            raise
+        except NETWORK_ERRORS as e:
+            logger.error(f"流式API请求失败: {str(e)}")
+            raise APIError(f"{self.PROVIDER_LABEL}流式API调用失败: {str(e)}")
+        except Exception as e:
+            logger.error(f"流式API请求出现未预期的错误: {str(e)}", exc_info=True)
+            raise APIError(f"{self.PROVIDER_LABEL}流式API调用失败: {str(e)}")
+        
+        timing = current_timing()
+        try:
+            async for event in iter_events(response.content.iter_any()):
+                if event.data == STREAM_DONE:
+                    return
+                content = self._delta_content(event)
+                if content:
+                    if timing is not None and timing.time_to_first_token is None:
+                        timing.time_to_first_token = timing.elapsed()
+                    yield content
+        except NETWORK_ERRORS as e:
+            self.breaker.record_failure()
+            logger.error(f"流式响应中断: {str(e)}")
+            raise APIError(f"{self.PROVIDER_LABEL}流式API调用失败: {str(e)}")
+        finally:
+            response.release()
     
     def _clean_json_response(self, content: str) -> str:
         """清理JSON响应，处理可能的Markdown格式
@@ -334,9 +482,276 @@ class DeepSeekProvider(AIProvider):
         # 移除可能存在的制表符和多余的空格
         content = content.strip()
         
-        logger.debug(f"清理后的JSON响应: {content}")
+        logger.debug("清理后的JSON响应: %s", payload(content))
         return content
+    
+    def _load_json(self, content: str) -> Any:
+        """解析JSON响应，严格解析失败时在本地修复，省去一次重新请求
+        
+        Args:
+            content: AI响应内容
+            
+        Returns:
+            解析后的JSON数据
+            
+        Raises:
+            json.JSONDecodeError: 修复后仍无法解析
+        """
+        try:
+            data, repaired = loads_lenient(self._clean_json_response(content),
+                                           repair=self.structured_output.repair)
+        except json.JSONDecodeError:
+            self.output_stats.record(None)
+            raise
+        self.output_stats.record(repaired)
+        if repaired:
+            logger.info("AI响应不是严格的JSON，已在本地修复")
+        return data
+    
+    def _command_request(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        """构建生成命令的请求数据，启用JSON模式时要求提供商只返回JSON对象
+        
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式响应
+            
+        Returns:
+            请求数据
+        """
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature
+        }
+        if stream:
+            data["stream"] = True
+        if self.structured_output.json_mode:
+            data["response_format"] = {"type": "json_object"}
+        return data
+    
+    @staticmethod
+    def _parse_usage(response: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """提取响应中的令牌用量
+        
+        兼容OpenAI的 prompt_tokens_details.cached_tokens
+        和DeepSeek的 prompt_cache_hit_tokens 两种缓存命中字段。
+        
+        Args:
+            response: API响应数据
+            
+        Returns:
+            包含 prompt_tokens、completion_tokens 和 cached_tokens 的字典，响应未提供用量时返回None
+        """
+        usage = response.get("usage")
+        if not isinstance(usage, dict):
+            return None
+        details = usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens")
+        if cached is None:
+            cached = usage.get("prompt_cache_hit_tokens", 0)
+        return {
+            "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+            "cached_tokens": int(cached or 0),
+        }
+    
+    @staticmethod
+    def _record_parse(started: float) -> None:
+        """将响应解析耗时计入当前请求的耗时分解"""
+        timing = current_timing()
+        if timing is not None:
+            timing.parse += time.monotonic() - started
+    
+    def _attach_usage(self, command: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """将响应中的令牌用量附加到命令结果"""
+        usage = self._parse_usage(response)
+        if usage is not None:
+            command["usage"] = usage
+        return command
+    
+    def _delta_content(self, event: SSEEvent) -> Optional[str]:
+        """从流式事件中提取增量内容
+        
+        Args:
+            event: SSE事件
+            
+        Returns:
+            增量内容，事件不包含内容时返回None
+        """
+        try:
+            choices = event.json()["choices"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"解析流式响应失败: {str(e)}")
+            return None
+        if not choices:
+            return None
+        return choices[0].get("delta", {}).get("content")
+    
+    def _build_command_messages(self,
+                                user_input: str,
+                                system_info: Dict[str, Any],
+                                history: Optional[List[Dict[str, str]]] = None
+                                ) -> List[Dict[str, str]]:
+        """构建生成命令所需的消息列表
+        
+        Args:
+            user_input: 用户输入
+            system_info: 系统信息
+            history: 历史记录
+            
+        Returns:
+            消息列表
+        """
+        raise NotImplementedError
+    
+    def _parse_command_data(self, command_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从解析后的响应中提取命令结果
+        
+        Args:
+            command_data: 解析后的JSON响应
+            
+        Returns:
+            包含命令、解释和警告的字典
+            
+        Raises:
+            AIError: 响应中缺少所需字段
+            KeyError: 响应字段不完整
+        """
+        raise NotImplementedError
+    
+    def _command_from_partial(self, path: tuple, value: Any) -> Optional[Dict[str, Any]]:
+        """判断流式解析出的局部值是否已经是可用的命令
+        
+        Args:
+            path: 值在JSON文档中的路径
+            value: 解析出的值
+            
+        Returns:
+            可用时返回包含command和explanation的字典，否则返回None
+        """
+        return None
+    
+    async def stream_command(self,
+                             user_input: str,
+                             system_info: Dict[str, Any],
+                             history: Optional[List[Dict[str, str]]] = None
+                             ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式生成命令
+        
+        在流式响应上运行增量JSON解析，当前系统的命令一旦完整出现就立即产出，
+        解释和警告仍在继续生成。
+        
+        Args:
+            user_input: 用户输入
+            system_info: 系统信息
+            history: 历史记录
+            
+        Returns:
+            事件生成器
+            
+        Raises:
+            APIError: API调用错误
+            AIError: AI服务错误
+        """
+        data = self._command_request(
+            self._build_command_messages(user_input, system_info, history), stream=True
+        )
+        parser = IncrementalJSONParser(watch=self.STREAM_WATCH)
+        start = time.monotonic()
+        time_to_command = None
+        
+        async for chunk in self._make_stream_request(self.api_url, data):
+            for path, value in parser.feed(chunk):
+                if time_to_command is not None or path == ():
+                    continue
+                partial = self._command_from_partial(path, value)
+                if partial is not None:
+                    time_to_command = time.monotonic() - start
+                    logger.debug(f"流式命令可用，耗时{time_to_command:.3f}秒")
+                    yield dict(partial, type="command", time_to_command=time_to_command)
+        
+        try:
+            if parser.done:
+                command_data = parser.document
+                self.output_stats.record(False)
+            else:
+                # 响应不是严格的JSON（增量解析已停止）或不完整时，对完整文本做本地修复
+                command_data = self._load_json(parser.buffer)
+            result = self._parse_command_data(command_data)
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error(f"AI响应格式无效: {parser.buffer}")
+            raise AIError(f"无效的AI响应格式: {str(e)}")
+        
+        total_time = time.monotonic() - start
+        if time_to_command is None:
+            time_to_command = total_time
+            yield {
+                "type": "command",
+                "command": result["command"],
+                "explanation": result["explanation"],
+                "time_to_command": time_to_command
+            }
+        yield dict(result, type="result", time_to_command=time_to_command, total_time=total_time)
+    
 
+class OpenAIProvider(OpenAICompatibleProvider):
+    """OpenAI提供商实现"""
+    
+    API_URL = "https://api.openai.com/v1/chat/completions"
+    PROVIDER_LABEL = "OpenAI"
+    DEFAULT_MODEL = "gpt-3.5-turbo"  # OpenAI的默认模型
+    
+    SYSTEM_PROMPT_PREFIX = """你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
+你必须以JSON格式返回响应，格式如下：
+{
+    "command": "具体的命令",
+    "explanation": "命令的解释",
+    "warnings": ["可能的风险提示"]
+}
+
+"""
+    
+    STREAM_WATCH = [("command",)]
+    
+    def _build_command_messages(self,
+                                user_input: str,
+                                system_info: Dict[str, Any],
+                                history: Optional[List[Dict[str, str]]] = None
+                                ) -> List[Dict[str, str]]:
+        """构建生成命令所需的消息列表"""
+        messages = []
+        
+        # 添加系统信息
+        messages.append({
+            "role": "system",
+            "content": self.system_prompt(system_info)
+        })
+        
+        # 添加历史记录
+        if history:
+            messages.extend(history)
+        
+        # 添加用户输入
+        messages.append({
+            "role": "user",
+            "content": user_input
+        })
+        return messages
+    
+    def _parse_command_data(self, command_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从解析后的响应中提取命令结果"""
+        return {
+            "command": command_data["command"],
+            "explanation": command_data["explanation"],
+            "warnings": command_data.get("warnings", [])
+        }
+    
+    def _command_from_partial(self, path: tuple, value: Any) -> Optional[Dict[str, Any]]:
+        """command字段完整出现即可使用，解释随最终结果返回"""
+        if path == ("command",) and isinstance(value, str):
+            return {"command": value, "explanation": ""}
+        return None
+    
     async def generate_command(self,
                              user_input: str,
                              system_info: Dict[str, Any],
@@ -354,15 +769,87 @@ class DeepSeekProvider(AIProvider):
             
         Raises:
             APIError: API调用错误
-            AIError: AI服务错误
+            AIError: AI服务错误
+        """
+        try:
+            # 调用API
+            data = self._command_request(self._build_command_messages(user_input, system_info, history))
+            response = await self._make_request(self.api_url, data)
+            
+            # 解析响应
+            content = response["choices"][0]["message"]["content"]
+            parse_started = time.monotonic()
+            try:
+                command = self._parse_command_data(self._load_json(content))
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                raise AIError(f"无效的AI响应格式: {str(e)}")
+            self._record_parse(parse_started)
+            return self._attach_usage(command, response)
+            
+        except Exception as e:
+            if isinstance(e, AIError):
+                raise
+            logger.error(f"生成命令时出错: {str(e)}", exc_info=True)
+            raise APIError(f"OpenAI API调用失败: {str(e)}")
+    
+    async def stream_chat(self,
+                         messages: List[Dict[str, str]],
+                         system_info: Dict[str, Any]
+                         ) -> AsyncGenerator[str, None]:
+        """流式聊天
+        
+        Args:
+            messages: 消息列表
+            system_info: 系统信息
+            
+        Returns:
+            聊天响应生成器
+            
+        Raises:
+            APIError: API调用错误
         """
         try:
-            messages = []
-            
             # 添加系统信息
-            system_message = {
-                "role": "system",
-                "content": f"""你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
+            all_messages = [
+                {
+                    "role": "system",
+                    "content": """你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
+你必须以JSON格式返回响应，格式如下：
+{
+    "command": "具体的命令",
+    "explanation": "命令的解释",
+    "warnings": ["可能的风险提示"]
+}
+
+系统信息：""" + json.dumps(system_info)
+                }
+            ]
+            all_messages.extend(messages)
+            
+            # 调用流式API
+            data = {
+                "model": self.model,
+                "messages": all_messages,
+                "temperature": self.temperature,
+                "stream": True
+            }
+            async for chunk in self._make_stream_request(self.api_url, data):
+                yield chunk
+                    
+        except Exception as e:
+            if isinstance(e, APIError):
+                raise
+            raise APIError(f"OpenAI流式API调用失败: {str(e)}")
+
+
+class DeepSeekProvider(OpenAICompatibleProvider):
+    """DeepSeek提供商实现"""
+    
+    API_URL = "https://api.deepseek.com/v1/chat/completions"  # 更新为正确的API端点
+    PROVIDER_LABEL = "DeepSeek"
+    DEFAULT_MODEL = "deepseek-chat"  # DeepSeek的默认模型
+    
+    SYSTEM_PROMPT_PREFIX = """你是一个命令行助手。你的任务是将用户的自然语言输入转换为具体的命令。
 你必须以JSON格式返回响应，格式如下：
 {{
     "commands": [
@@ -384,85 +871,153 @@ class DeepSeekProvider(AIProvider):
     ],
     "warnings": ["可能的风险提示"]
 }}
+请把当前操作系统的命令放在commands数组的第一位，以便尽早使用。
 
 当前系统信息：
-- 操作系统：{os.name} ({sys.platform})
-- Python版本：{sys.version}
+- 操作系统：{os_name} ({platform})
+- Python版本：{python_version}
 
-其他系统信息：{json.dumps(system_info)}"""
-            }
-            messages.append(system_message)
-            logger.debug(f"系统提示: {system_message['content']}")
-            
-            # 添加历史记录
-            if history:
-                messages.extend(history)
-                logger.debug(f"历史记录: {json.dumps(history, ensure_ascii=False)}")
-            
-            # 添加用户输入
-            user_message = {
-                "role": "user",
-                "content": user_input
+"""
+    SYSTEM_PROMPT_SUFFIX = "其他系统信息：{system_info}"
+    
+    STREAM_WATCH = [("commands", "*")]
+
+    def render_prompt_prefix(self) -> str:
+        """渲染包含当前平台信息的静态前缀"""
+        return self.SYSTEM_PROMPT_PREFIX.format(
+            os_name=os.name,
+            platform=sys.platform,
+            python_version=sys.version
+        )
+
+    @staticmethod
+    def _current_os_key() -> str:
+        """获取当前操作系统在响应中对应的键"""
+        current_os = sys.platform
+        if current_os.startswith("win"):
+            return "windows"
+        elif current_os.startswith("linux"):
+            return "linux"
+        elif current_os.startswith("darwin"):
+            return "darwin"
+        return "linux"  # 默认使用Linux命令
+
+    def _build_command_messages(self,
+                                user_input: str,
+                                system_info: Dict[str, Any],
+                                history: Optional[List[Dict[str, str]]] = None
+                                ) -> List[Dict[str, str]]:
+        """构建生成命令所需的消息列表"""
+        messages = []
+
+        # 添加系统信息
+        system_message = {
+            "role": "system",
+            "content": self.system_prompt(system_info)
+        }
+        messages.append(system_message)
+        logger.debug("系统提示: %s", payload(system_message["content"]))
+
+        # 添加历史记录
+        if history:
+            messages.extend(history)
+            logger.debug("历史记录: %s", payload(history))
+
+        # 添加用户输入
+        messages.append({
+            "role": "user",
+            "content": user_input
+        })
+        logger.debug("用户输入: %s", payload(user_input))
+        return messages
+
+    def _parse_command_data(self, command_data: Dict[str, Any]) -> Dict[str, Any]:
+        """根据当前操作系统从多平台命令中选择合适的命令"""
+        current_os = sys.platform
+        selected_command = None
+
+        # 查找当前操作系统的命令，跳过被截断或格式不完整的条目
+        candidates = [
+            cmd for cmd in command_data["commands"]
+            if isinstance(cmd, dict) and isinstance(cmd.get("os"), str) and "command" in cmd
+        ]
+        for cmd in candidates:
+            if current_os.startswith(cmd["os"]):
+                selected_command = cmd
+                break
+
+        if not selected_command:
+            # 如果没有找到完全匹配的，尝试使用通用命令
+            os_key = self._current_os_key()
+            for cmd in candidates:
+                if cmd["os"] == os_key:
+                    selected_command = cmd
+                    break
+
+        if not selected_command:
+            raise AIError(f"未找到适用于当前操作系统({current_os})的命令")
+
+        return {
+            "command": selected_command["command"],
+            "explanation": selected_command.get("explanation", ""),
+            "warnings": command_data.get("warnings", [])
+        }
+
+    def _command_from_partial(self, path: tuple, value: Any) -> Optional[Dict[str, Any]]:
+        """commands数组中当前系统的命令对象完整出现即可使用"""
+        if not isinstance(value, dict) or "command" not in value:
+            return None
+        os_name = value.get("os", "")
+        if os_name and (sys.platform.startswith(os_name) or os_name == self._current_os_key()):
+            return {
+                "command": value["command"],
+                "explanation": value.get("explanation", ""),
+                "os": os_name
             }
-            messages.append(user_message)
-            logger.debug(f"用户输入: {user_input}")
+        return None
+
+    async def generate_command(self,
+                             user_input: str,
+                             system_info: Dict[str, Any],
+                             history: Optional[List[Dict[str, str]]] = None
+                             ) -> Dict[str, Any]:
+        """生成命令
+        
+        Args:
+            user_input: 用户输入
+            system_info: 系统信息
+            history: 历史记录
+            
+        Returns:
+            包含命令和解释的字典
+            
+        Raises:
+            APIError: API调用错误
+            AIError: AI服务错误
+        """
+        try:
+            messages = self._build_command_messages(user_input, system_info, history)
             
             # 调用API
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": self.temperature
-            }
-            logger.debug(f"API请求数据: {json.dumps(data, ensure_ascii=False)}")
+            data = self._command_request(messages)
+            logger.debug("API请求数据: %s", payload(data))
             
             # 发送请求
-            result = await self._make_request(self.API_URL, data)
+            result = await self._make_request(self.api_url, data)
             content = result["choices"][0]["message"]["content"]
-            logger.debug(f"AI响应内容: {content}")
+            logger.debug("AI响应内容: %s", payload(content))
             
+            parse_started = time.monotonic()
             try:
-                # 清理响应内容
-                cleaned_content = self._clean_json_response(content)
-                command_data = json.loads(cleaned_content)
-                logger.info(f"解析后的命令: {json.dumps(command_data, ensure_ascii=False)}")
-                
-                # 根据当前操作系统选择合适的命令
-                current_os = sys.platform
-                selected_command = None
-                
-                # 查找当前操作系统的命令
-                for cmd in command_data["commands"]:
-                    if current_os.startswith(cmd["os"]):
-                        selected_command = cmd
-                        break
-                
-                if not selected_command:
-                    # 如果没有找到完全匹配的，尝试使用通用命令
-                    if current_os.startswith("win"):
-                        os_key = "windows"
-                    elif current_os.startswith("linux"):
-                        os_key = "linux"
-                    elif current_os.startswith("darwin"):
-                        os_key = "darwin"
-                    else:
-                        os_key = "linux"  # 默认使用Linux命令
-                    
-                    for cmd in command_data["commands"]:
-                        if cmd["os"] == os_key:
-                            selected_command = cmd
-                            break
-                
-                if not selected_command:
-                    raise AIError(f"未找到适用于当前操作系统({current_os})的命令")
-                
-                return {
-                    "command": selected_command["command"],
-                    "explanation": selected_command["explanation"],
-                    "warnings": command_data.get("warnings", [])
-                }
-            except (json.JSONDecodeError, KeyError) as e:
+                # 清理并解析响应内容，必要时在本地修复
+                command_data = self._load_json(content)
+                logger.info("解析后的命令: %s", payload(command_data))
+                command = self._parse_command_data(command_data)
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
                 logger.error(f"AI响应格式无效: {content}")
                 raise AIError(f"无效的AI响应格式: {str(e)}")
+            self._record_parse(parse_started)
+            return self._attach_usage(command, result)
             
         except Exception as e:
             if isinstance(e, (AIError, APIError)):
@@ -470,55 +1025,6 @@ class DeepSeekProvider(AIProvider):
             logger.error(f"生成命令时出错: {str(e)}", exc_info=True)
             raise APIError(f"DeepSeek API调用失败: {str(e)}")
     
-    async def _make_stream_request(self, url: str, data: Dict[str, Any], retry_count: int = 0) -> AsyncGenerator[str, None]:
-        """发送流式请求并处理重试逻辑
-        
-        Args:
-            url: API端点URL
-            data: 请求数据
-            retry_count: 当前重试次数
-            
-        Returns:
-            流式响应生成器
-            
-        Raises:
-            APIError: API调用失败
-        """
-        try:
-            session = await self.session
-            async with session.post(url, json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"流式API调用失败: {response.status} - {error_text}")
-                    raise APIError(f"DeepSeek流式API调用失败: {response.status} - {error_text}")
-                
-                async for line in response.content:
-                    if line:
-                        try:
-                            line_text = line.decode("utf-8").replace("data: ", "")
-                            logger.debug(f"流式响应行: {line_text}")
-                            event = json.loads(line_text)
-                            if event["choices"][0]["delta"].get("content"):
-                                content = event["choices"][0]["delta"]["content"]
-                                logger.debug(f"流式内容片段: {content}")
-                                yield content
-                        except Exception as e:
-                            logger.warning(f"解析流式响应失败: {str(e)}")
-                            continue
-                            
-        except (aiohttp.ClientError, socket.gaierror, asyncio.TimeoutError) as e:
-            if retry_count < MAX_RETRIES:
-                logger.warning(f"流式API请求失败，将在{RETRY_DELAY}秒后重试 ({retry_count + 1}/{MAX_RETRIES}): {str(e)}")
-                await asyncio.sleep(RETRY_DELAY)
-                async for chunk in self._make_stream_request(url, data, retry_count + 1):
-                    yield chunk
-            else:
-                logger.error(f"流式API请求在{MAX_RETRIES}次重试后仍然失败: {str(e)}")
-                raise APIError(f"DeepSeek流式API调用失败: {str(e)}")
-        except Exception as e:
-            logger.error(f"流式API请求出现未预期的错误: {str(e)}", exc_info=True)
-            raise APIError(f"DeepSeek流式API调用失败: {str(e)}")
-    
     async def stream_chat(self,
                          messages: List[Dict[str, str]],
                          system_info: Dict[str, Any]
@@ -552,7 +1058,7 @@ class DeepSeekProvider(AIProvider):
                 }
             ]
             all_messages.extend(messages)
-            logger.debug(f"流式聊天消息: {json.dumps(all_messages, ensure_ascii=False)}")
+            logger.debug("流式聊天消息: %s", payload(all_messages))
             
             # 调用流式API
             data = {
@@ -561,10 +1067,10 @@ class DeepSeekProvider(AIProvider):
                 "temperature": self.temperature,
                 "stream": True
             }
-            logger.debug(f"流式API请求数据: {json.dumps(data, ensure_ascii=False)}")
+            logger.debug("流式API请求数据: %s", payload(data))
             
             # 发送流式请求
-            async for chunk in self._make_stream_request(self.API_URL, data):
+            async for chunk in self._make_stream_request(self.api_url, data):
                 yield chunk
                         
         except Exception as e:
@@ -572,48 +1078,307 @@ class DeepSeekProvider(AIProvider):
             raise APIError(f"DeepSeek流式API调用失败: {str(e)}")
 
 
+class MockProvider(OpenAIProvider):
+    """本地模拟服务提供商，用于离线测试和压测（见 ata.mock_server）"""
+    
+    API_URL = "http://127.0.0.1:8765/v1/chat/completions"  # ata.mock_server 的默认端点
+    PROVIDER_LABEL = "Mock"
+    DEFAULT_MODEL = "mock-model"
+    DEFAULT_API_KEY = "mock"  # 模拟服务不校验密钥
+
+
 class AIInterface:
     """AI接口类"""
     
     PROVIDERS = {
         "openai": OpenAIProvider,
-        "deepseek": DeepSeekProvider
+        "deepseek": DeepSeekProvider,
+        "mock": MockProvider
     }
     
-    def __init__(self, provider: str = "deepseek", model: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(self, provider: Union[str, ConfigManager] = "deepseek", model: Optional[str] = None,
+                 api_key: Optional[str] = None, config: Optional[ConfigManager] = None,
+                 cache: Optional[ResponseCache] = None,
+                 fallback_provider: Optional[Union[str, List[str]]] = None,
+                 fallback_model: Optional[str] = None,
+                 fast_path: Optional[FastPath] = None):
         """初始化AI接口
         
         Args:
-            provider: AI提供商名称
+            provider: AI提供商名称，也可以直接传入配置管理器
             model: 模型名称
             api_key: API密钥
+            config: 配置管理器，用于读取提供商、模型、密钥、连接池、缓存、重试和熔断配置
+            cache: 响应缓存，未指定时根据配置创建（无配置时仅使用内存缓存）
+            fallback_provider: 备用提供商（或按顺序排列的列表），未指定时读取 ai.fallback_provider
+            fallback_model: 第一个备用提供商使用的模型
+            fast_path: 本地快速通道，未指定时根据 ai.fast_path 配置创建（无配置时不启用）
         """
+        if isinstance(provider, ConfigManager):
+            config = provider
+            provider = config.get("ai.provider", "deepseek")
+        
         if provider not in self.PROVIDERS:
             raise ValueError(f"不支持的AI提供商: {provider}")
-            
+        
+        self.config = config
         self.provider_name = provider
         self.provider_class = self.PROVIDERS[provider]
         
+        # 结构化输出配置和解析统计，由主提供商和备用提供商共享
+        self.structured_output = (
+            StructuredOutputConfig.from_config(config) if config is not None else StructuredOutputConfig()
+        )
+        self.output_stats = StructuredOutputStats()
+        
+        # 登记共享连接池，由本实例的close()负责释放
+        pool_config = PoolConfig.from_config(config) if config is not None else None
+        self.pool = get_shared_pool(pool_config).acquire()
+        
+        # 创建主提供商实例
+        self.provider = self._create_provider(provider, model, api_key)
+        self.model = self.provider.model
+        
+        # 创建备用提供商，缺少API密钥的备用提供商会被跳过
+        if fallback_provider is None and config is not None and config.get("ai.auto_fallback", True):
+            fallback_provider = config.get("ai.fallback_provider")
+        if isinstance(fallback_provider, str):
+            fallback_provider = [fallback_provider]
+        self.fallbacks: List[Tuple[str, AIProvider]] = []
+        for index, name in enumerate(fallback_provider or []):
+            if name == provider or name in dict(self.fallbacks):
+                continue
+            try:
+                fallback = self._create_provider(name, fallback_model if index == 0 else None)
+            except ValueError as e:
+                logger.warning(f"无法启用备用提供商{name}: {str(e)}")
+                continue
+            self.fallbacks.append((name, fallback))
+        
+        # 对冲与故障转移
+        self.hedge_policy = HedgePolicy.from_config(config) if config is not None else HedgePolicy()
+        self.health: Dict[str, ProviderHealth] = {
+            name: ProviderHealth(name, self.hedge_policy.window)
+            for name in [provider] + [name for name, _ in self.fallbacks]
+        }
+        self.failover_stats = FailoverStats()
+        
+        # 初始化响应缓存
+        if cache is None:
+            cache = ResponseCache.from_config(config) if config is not None else ResponseCache()
+        self.cache = cache
+        self._cache_prepared = False
+        
+        # 本地快速通道：常见请求不经过大模型
+        if fast_path is None and config is not None:
+            fast_path = FastPath.from_config(config)
+        self.fast_path = fast_path
+        
+        # 初始化上下文构建器
+        self.context_builder = ContextBuilder.from_config(config) if config is not None else ContextBuilder()
+        
+        # 初始化请求合并器
+        self.singleflight = SingleFlight()
+        
+        # 流式生成命令的耗时统计
+        self.stream_stats = StreamStats()
+        
+        # 令牌用量统计
+        self.usage_stats = UsageStats()
+        
+        # 按会话保存的对话历史
+        self.conversations = (
+            ConversationStore.from_config(config) if config is not None else ConversationStore()
+        )
+        
+        # 后台预取后续请求（默认不启用）
+        self.prefetcher = Prefetcher.from_config(config, self) if config is not None else None
+        self._closed = False
+    
+    def _create_provider(self, name: str, model: Optional[str] = None,
+                         api_key: Optional[str] = None) -> AIProvider:
+        """根据配置创建提供商实例
+        
+        Args:
+            name: 提供商名称
+            model: 模型名称，未指定时读取配置或使用默认模型
+            api_key: API密钥，未指定时读取配置
+            
+        Returns:
+            提供商实例
+            
+        Raises:
+            ValueError: 不支持的提供商或缺少API密钥
+        """
+        if name not in self.PROVIDERS:
+            raise ValueError(f"不支持的AI提供商: {name}")
+        provider_class = self.PROVIDERS[name]
+        config = self.config
+        
+        # 从配置中补全模型和API密钥
+        if config is not None:
+            provider_config = config.get(f"ai.{name}", {}) or {}
+            model = model or provider_config.get("model")
+            api_key = api_key or config.get_api_key(name) or provider_config.get("api_key")
+            api_url = provider_config.get("api_url")
+        else:
+            api_url = None
+        
         # 如果未指定模型，使用提供商的默认模型
         if not model:
-            model = self.provider_class.DEFAULT_MODEL
-            
+            model = provider_class.DEFAULT_MODEL
+        
+        api_key = api_key or provider_class.DEFAULT_API_KEY
         if not api_key:
             raise ValueError(f"未提供API密钥")
-            
-        # 创建提供商实例
-        self.provider = self.provider_class(
+        register_secret(api_key)
+        
+        # 重试策略和按端点共享的熔断器
+        retry_policy = RetryPolicy.from_config(config) if config is not None else RetryPolicy()
+        breaker_config = (config.get("ai.circuit_breaker", {}) if config is not None else None) or {}
+        breaker = get_breaker(
+            provider_class.breaker_name(api_url),
+            failure_threshold=breaker_config.get("failure_threshold"),
+            recovery_timeout=breaker_config.get("recovery_timeout")
+        )
+        
+        # 按提供商和API密钥共享的限流器
+        rate_config = RateLimitConfig.from_config(config, name) if config is not None else RateLimitConfig.default(name)
+        rate_limiter = None
+        if rate_config.enabled:
+            rate_limiter = get_rate_limiter(
+                limiter_name(name, api_key),
+                rate_config.requests_per_minute,
+                rate_config.tokens_per_minute
+            )
+        
+        return provider_class(
             api_key=api_key,
-            model=model
+            model=model,
+            pool=self.pool,
+            api_url=api_url,
+            retry_policy=retry_policy,
+            breaker=breaker,
+            rate_limiter=rate_limiter,
+            structured_output=self.structured_output,
+            output_stats=self.output_stats
+        )
+    
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """默认会话的对话历史（副本）"""
+        return self.get_history()
+    
+    @history.setter
+    def history(self, turns: List[Dict[str, Any]]) -> None:
+        self.conversations.replace(DEFAULT_SESSION, turns)
+    
+    @property
+    def chain(self) -> List[Tuple[str, AIProvider]]:
+        """按优先级排列的提供商链"""
+        return [(self.provider_name, self.provider)] + self.fallbacks
+    
+    async def close(self) -> None:
+        """关闭AI接口并释放连接池"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.prefetcher is not None:
+            await self.prefetcher.close()
+        for _, provider in self.chain:
+            await provider.close()
+        await self.pool.release()
+        if self.cache is not None:
+            self.cache.close()
+        self.conversations.close()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取AI层的运行指标
+        
+        Returns:
+            指标字典
+        """
+        return {
+            "pool": self.pool.get_stats(),
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "fast_path": self.fast_path.get_stats() if self.fast_path is not None else None,
+            "singleflight": self.singleflight.get_stats(),
+            "context": self.context_builder.get_stats(),
+            "conversations": self.conversations.get_stats(),
+            "prefetch": self.prefetcher.get_stats() if self.prefetcher is not None else None,
+            "streaming": self.stream_stats.to_dict(),
+            "usage": self.usage_stats.to_dict(),
+            "structured_output": self.output_stats.to_dict(),
+            "retry": self.provider.retry_policy.get_stats(),
+            "circuit_breaker": self.provider.breaker.get_stats(),
+            "rate_limit": self.provider.rate_limiter.get_stats() if self.provider.rate_limiter else None,
+            "failover": self.failover_stats.to_dict(),
+            "providers": {name: health.to_dict() for name, health in self.health.items()}
+        }
+    
+    def _cache_key(self, user_input: str, system_info: Dict[str, Any],
+                   history: List[Dict[str, str]], provider_name: Optional[str] = None) -> str:
+        """生成提供商（默认为主提供商）、模型、提示模板和裁剪后历史下的缓存键"""
+        name = provider_name or self.provider_name
+        provider = dict(self.chain)[name]
+        return make_cache_key(
+            user_input=user_input,
+            system_info=system_info,
+            provider=name,
+            model=provider.model,
+            temperature=provider.temperature,
+            prompt_version=provider.prompt_fingerprint(),
+            history=history
         )
+    
+    async def _cache_result(self, cache_key: str, served_by: str, user_input: str,
+                            system_info: Dict[str, Any], history: List[Dict[str, str]],
+                            result: Dict[str, Any]) -> None:
+        """写入响应缓存
+        
+        备用提供商生成的结果写在该提供商自己的缓存键下，主提供商的请求不会命中。
+        """
+        provider = dict(self.chain)[served_by]
+        if served_by != self.provider_name:
+            cache_key = self._cache_key(user_input, system_info, history, served_by)
+        await self.cache.set(
+            cache_key, result,
+            provider=served_by,
+            model=provider.model,
+            prompt_version=provider.prompt_fingerprint()
+        )
+    
+    async def _prepare_cache(self) -> None:
+        """首次使用缓存时清除旧提示模板生成的持久化条目"""
+        if self._cache_prepared or self.cache is None:
+            return
+        self._cache_prepared = True
+        await self.cache.invalidate(
+            provider=self.provider_name,
+            keep_prompt_version=self.provider.prompt_fingerprint()
+        )
+    
+    async def invalidate_cache(self, model_only: bool = False) -> int:
+        """使响应缓存失效
         
-        # 初始化历史记录
-        self.history: List[Dict[str, str]] = []
+        Args:
+            model_only: 为True时仅清除当前模型的条目
+            
+        Returns:
+            持久化缓存中删除的条目数
+        """
+        if self.cache is None:
+            return 0
+        return await self.cache.invalidate(
+            provider=self.provider_name,
+            model=self.provider.model if model_only else None
+        )
     
     async def generate_command(self, 
                              user_input: str,
                              system_info: Dict[str, Any],
-                             history: Optional[List[Dict[str, str]]] = None
+                             history: Optional[List[Dict[str, str]]] = None,
+                             bypass_cache: bool = False
                              ) -> Dict[str, Any]:
         """生成命令
         
@@ -621,33 +1386,190 @@ class AIInterface:
             user_input: 用户输入
             system_info: 系统信息
             history: 历史记录
+            bypass_cache: 是否跳过缓存读取（新结果仍会写入缓存）
             
         Returns:
-            包含命令和解释的字典
+            包含命令和解释的字典，新生成的结果带有估算的 prompt_tokens，命中缓存时带有 cached=True，
+            由本地快速通道翻译时 provider 为 "local" 且带有命中的规则名 rule，
+            timing 为本次调用的耗时分解
             
         Raises:
             AIError: AI服务错误
             APIError: API调用错误
         """
+        with track_timing() as timing:
+            result = await self._generate_command(user_input, system_info, history, bypass_cache)
+        timing.finish(result)
+        result["timing"] = timing.to_dict()
+        return result
+    
+    async def _generate_command(self,
+                                user_input: str,
+                                system_info: Dict[str, Any],
+                                history: Optional[List[Dict[str, str]]],
+                                bypass_cache: bool) -> Dict[str, Any]:
+        """生成命令（本地快速通道、缓存、上下文裁剪和请求合并）"""
         try:
-            return await self.provider.generate_command(
-                user_input=user_input,
-                system_info=system_info,
-                history=history or self.history
+            if self.fast_path is not None:
+                local = self.fast_path.match(user_input)
+                if local is not None:
+                    logger.info(f"快速通道命中规则{local['rule']}: {user_input}")
+                    return local
+            
+            # 在令牌预算内裁剪历史
+            history, context = self._build_context(
+                user_input, system_info,
+                self.conversations.turns(DEFAULT_SESSION) if history is None else history
             )
+            
+            cache_key = None
+            if self.cache is not None:
+                await self._prepare_cache()
+                cache_key = self._cache_key(user_input, system_info, history)
+                if bypass_cache:
+                    self.cache.record_bypass()
+                else:
+                    cached = await self.cache.get(cache_key)
+                    if cached is not None:
+                        logger.info(f"命中响应缓存: {user_input}")
+                        self._record_prefetch_hit(cached)
+                        cached["cached"] = True
+                        return cached
+            
+            # 合并并发的相同请求，只发起一次上游调用
+            flight_key = self._flight_key(user_input, system_info, history)
+            result = await self.singleflight.do(
+                flight_key,
+                lambda: self._generate_uncached(user_input, system_info, history, cache_key)
+            )
+            return dict(result, prompt_tokens=context["prompt_tokens"])
         except Exception as e:
             logger.error(f"生成命令失败: {str(e)}", exc_info=True)
             raise
     
-    async def chat(self, message: str) -> str:
+    def _build_context(self, user_input: str, system_info: Dict[str, Any],
+                       history: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """按 ai.max_context_length 和 ai.max_history_length 裁剪历史
+        
+        Returns:
+            (裁剪后的历史消息, 构建报告)
+        """
+        return self.context_builder.build(self.provider.system_prompt(system_info), user_input, history)
+    
+    def _flight_key(self, user_input: str, system_info: Dict[str, Any],
+                    history: List[Dict[str, str]]) -> str:
+        """生成请求合并键：规范化输入 + 上下文指纹 + 模型"""
+        return "|".join([
+            normalize_input(user_input),
+            fingerprint({"system_info": system_info, "history": history}),
+            self.provider_name,
+            self.provider.model,
+        ])
+    
+    async def _generate_uncached(self, user_input: str, system_info: Dict[str, Any],
+                                 history: List[Dict[str, str]],
+                                 cache_key: Optional[str],
+                                 prefetched: bool = False) -> Dict[str, Any]:
+        """沿提供商链生成命令并写入缓存，结果中的 provider 为实际提供服务的提供商
+        
+        prefetched 为True时缓存条目带有 prefetched 标记，用于统计预取的命中。
+        """
+        served_by, result = await hedged_call(
+            [
+                (self.health[name], functools.partial(
+                    provider.generate_command,
+                    user_input=user_input,
+                    system_info=system_info,
+                    history=history
+                ))
+                for name, provider in self.chain
+            ],
+            self.hedge_policy,
+            self.failover_stats
+        )
+        result = dict(result, provider=served_by)
+        if "usage" in result:
+            self.usage_stats.record(result["usage"])
+        
+        if cache_key is not None:
+            # 令牌用量只属于本次请求，不写入缓存
+            cached = {k: v for k, v in result.items() if k != "usage"}
+            if prefetched:
+                cached["prefetched"] = True
+            await self._cache_result(cache_key, served_by, user_input, system_info, history, cached)
+        return result
+    
+    def _record_prefetch_hit(self, cached: Dict[str, Any]) -> None:
+        """缓存命中的条目来自预取时计入预取统计"""
+        if cached.get("prefetched") and self.prefetcher is not None:
+            self.prefetcher.stats.served += 1
+    
+    async def prefetch(self, user_input: str, system_info: Dict[str, Any]) -> bool:
+        """预先生成命令并写入响应缓存
+        
+        不使用会话历史，只有不带历史的请求会命中预取的条目；不计入缓存和快速通道的命中统计；
+        由调用方设置后台优先级（见 ata.prefetch.Prefetcher）。
+        
+        Args:
+            user_input: 预测的用户输入
+            system_info: 系统信息
+            
+        Returns:
+            是否发起了上游请求；未启用缓存、可由本地快速通道翻译或已有缓存时返回False
+            
+        Raises:
+            AIError: AI服务错误
+            APIError: API调用错误
+        """
+        if self.cache is None:
+            return False
+        if self.fast_path is not None and self.fast_path.answers(user_input):
+            return False
+        await self._prepare_cache()
+        cache_key = self._cache_key(user_input, system_info, [])
+        if await self.cache.contains(cache_key):
+            return False
+        await self.singleflight.do(
+            self._flight_key(user_input, system_info, []),
+            lambda: self._generate_uncached(user_input, system_info, [], cache_key, prefetched=True)
+        )
+        return True
+    
+    async def chat(self, message: str, bypass_cache: bool = False,
+                   session_id: str = DEFAULT_SESSION, provisional: bool = False) -> str:
         """处理聊天消息
         
         Args:
             message: 用户消息
+            bypass_cache: 是否跳过响应缓存
+            session_id: 会话ID，不同会话的对话历史相互独立
+            provisional: 会话ID是服务端刚分配的，客户端回传之前只保存为临时会话
             
         Returns:
             AI响应
             
+        Raises:
+            AIError: AI服务错误
+            APIError: API调用错误
+        """
+        command_data = await self.chat_detailed(
+            message, bypass_cache=bypass_cache, session_id=session_id, provisional=provisional
+        )
+        return command_data.get("command", "")
+    
+    async def chat_detailed(self, message: str, bypass_cache: bool = False,
+                            session_id: str = DEFAULT_SESSION, provisional: bool = False) -> Dict[str, Any]:
+        """处理聊天消息并返回完整结果
+        
+        Args:
+            message: 用户消息
+            bypass_cache: 是否跳过响应缓存
+            session_id: 会话ID，不同会话的对话历史相互独立
+            provisional: 会话ID是服务端刚分配的，客户端回传之前只保存为临时会话
+            
+        Returns:
+            包含命令、解释、警告以及提供服务的提供商（provider）的字典
+            
         Raises:
             AIError: AI服务错误
             APIError: API调用错误
@@ -657,26 +1579,232 @@ class AIInterface:
             command_data = await self.generate_command(
                 user_input=message,
                 system_info={},  # 这里可以添加系统信息
-                history=self.history
+                history=await self.conversations.load(session_id),
+                bypass_cache=bypass_cache
             )
             
             # 保存对话历史
-            self.history.append({
-                "user": message,
-                "assistant": command_data.get("command", "")
-            })
+            await self.conversations.append(
+                session_id, message, command_data.get("command", ""), provisional=provisional
+            )
             
-            return command_data.get("command", "")
+            return command_data
             
         except Exception as e:
             logger.error(f"AI处理失败: {str(e)}", exc_info=True)
             raise
     
-    def get_history(self) -> List[Dict[str, str]]:
+    async def stream_command(self,
+                             user_input: str,
+                             system_info: Dict[str, Any],
+                             history: Optional[List[Dict[str, str]]] = None,
+                             bypass_cache: bool = False
+                             ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式生成命令
+        
+        当前系统的命令一旦可用即产出 type="command" 事件，
+        完整结果以 type="result" 事件结束，其中包含 time_to_command 指标。
+        每个事件的 provider 为提供服务的提供商；尚未产出事件前出错时转移到下一个提供商。
+        result 事件带有 timing 耗时分解。
+        
+        Args:
+            user_input: 用户输入
+            system_info: 系统信息
+            history: 历史记录
+            bypass_cache: 是否跳过缓存读取
+            
+        Returns:
+            事件生成器
+            
+        Raises:
+            AIError: AI服务错误
+            APIError: API调用错误
+        """
+        timing, token = begin_timing()
+        try:
+            async for event in self._stream_command(user_input, system_info, history, bypass_cache):
+                if event["type"] == "result":
+                    timing.finish(event)
+                    event["timing"] = timing.to_dict()
+                yield event
+        finally:
+            end_timing(token)
+    
+    async def _stream_command(self,
+                              user_input: str,
+                              system_info: Dict[str, Any],
+                              history: Optional[List[Dict[str, str]]],
+                              bypass_cache: bool) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式生成命令（本地快速通道、缓存、上下文裁剪和故障转移）"""
+        if self.fast_path is not None:
+            local = self.fast_path.match(user_input)
+            if local is not None:
+                self.stream_stats.record(0.0)
+                yield {
+                    "type": "command",
+                    "command": local["command"],
+                    "explanation": local["explanation"],
+                    "provider": local["provider"],
+                    "time_to_command": 0.0
+                }
+                yield dict(local, type="result", time_to_command=0.0, total_time=0.0)
+                return
+        
+        history, context = self._build_context(
+            user_input, system_info,
+            self.conversations.turns(DEFAULT_SESSION) if history is None else history
+        )
+        cache_key = None
+        if self.cache is not None:
+            await self._prepare_cache()
+            cache_key = self._cache_key(user_input, system_info, history)
+            if bypass_cache:
+                self.cache.record_bypass()
+            else:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    self._record_prefetch_hit(cached)
+                    self.stream_stats.record(0.0)
+                    yield {
+                        "type": "command",
+                        "command": cached["command"],
+                        "explanation": cached.get("explanation", ""),
+                        "time_to_command": 0.0
+                    }
+                    yield dict(cached, type="result", cached=True, time_to_command=0.0, total_time=0.0)
+                    return
+        
+        self.failover_stats.requests += 1
+        chain = self.chain
+        order = self.hedge_policy.order([self.health[name] for name, _ in chain])
+        for position, index in enumerate(order):
+            name, provider = chain[index]
+            health = self.health[name]
+            started = time.monotonic()
+            latency = None
+            yielded = False
+            try:
+                async for event in provider.stream_command(
+                    user_input=user_input,
+                    system_info=system_info,
+                    history=history
+                ):
+                    event["provider"] = name
+                    if latency is None:
+                        # 与对冲延迟一致，记录到响应开始（第一个事件）的时间
+                        latency = time.monotonic() - started
+                    if event["type"] == "command":
+                        self.stream_stats.record(event["time_to_command"])
+                    elif event["type"] == "result":
+                        event["prompt_tokens"] = context["prompt_tokens"]
+                        health.record_success(latency)
+                        health.served += 1
+                        if cache_key is not None:
+                            result = {k: event[k] for k in ("command", "explanation", "warnings") if k in event}
+                            await self._cache_result(
+                                cache_key, name, user_input, system_info, history, dict(result, provider=name)
+                            )
+                    yielded = True
+                    yield event
+                return
+            except AIError as e:
+                health.record_failure()
+                # 已经输出内容后不再转移，避免重复输出
+                if yielded or position == len(order) - 1:
+                    logger.error(f"流式生成命令失败: {str(e)}", exc_info=True)
+                    raise
+                self.failover_stats.failovers += 1
+                logger.warning(f"{name}流式生成命令失败，转移到下一个提供商: {str(e)}")
+    
+    async def chat_stream(self, message: str,
+                          bypass_cache: bool = False,
+                          session_id: str = DEFAULT_SESSION,
+                          provisional: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式处理聊天消息，完成后保存对话历史
+        
+        Args:
+            message: 用户消息
+            bypass_cache: 是否跳过响应缓存
+            session_id: 会话ID，不同会话的对话历史相互独立
+            provisional: 会话ID是服务端刚分配的，客户端回传之前只保存为临时会话
+            
+        Returns:
+            事件生成器，事件格式同 stream_command
+        """
+        async for event in self.stream_command(
+            user_input=message,
+            system_info={},
+            history=await self.conversations.load(session_id),
+            bypass_cache=bypass_cache
+        ):
+            if event["type"] == "result":
+                await self.conversations.append(
+                    session_id, message, event.get("command", ""), provisional=provisional
+                )
+            yield event
+    
+    async def generate_commands_batch(self,
+                                      inputs: Sequence[str],
+                                      system_info: Optional[Dict[str, Any]] = None,
+                                      concurrency: Optional[int] = None,
+                                      bypass_cache: bool = False
+                                      ) -> AsyncGenerator[Dict[str, Any], None]:
+        """以有限并发批量生成命令
+        
+        各条输入相互独立，不使用也不写入对话历史。结果按完成顺序产出，
+        单条失败不影响其他条目。生成器提前关闭时取消尚未完成的请求。
+        
+        Args:
+            inputs: 用户输入列表
+            system_info: 系统信息
+            concurrency: 最大并发数，未指定时读取 ai.batch_concurrency
+            bypass_cache: 是否跳过缓存读取
+            
+        Returns:
+            事件生成器，每个事件为 {"index", "input", "result"} 或 {"index", "input", "error"}
+        """
+        if concurrency is None:
+            concurrency = self.config.get("ai.batch_concurrency", 5) if self.config is not None else 5
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        system_info = system_info or {}
+        
+        async def run(index: int, user_input: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    # 批量请求在限流队列中让位于交互式请求
+                    with request_priority(PRIORITY_BATCH):
+                        result = await self.generate_command(
+                            user_input, system_info, history=[], bypass_cache=bypass_cache
+                        )
+                    return {"index": index, "input": user_input, "result": result}
+                except Exception as e:
+                    logger.warning(f"批量生成第{index}条失败: {str(e)}")
+                    return {"index": index, "input": user_input, "error": str(e)}
+        
+        tasks = [asyncio.ensure_future(run(i, text)) for i, text in enumerate(inputs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def get_history(self, session_id: str = DEFAULT_SESSION) -> List[Dict[str, Any]]:
         """获取对话历史
         
+        Args:
+            session_id: 会话ID
+            
         Returns:
-            对话历史列表
+            对话历史列表，每项为 {"user", "assistant", "created_at"}
+        """
+        return [turn.to_dict() for turn in self.conversations.turns(session_id)]
+    
+    async def clear_history(self, session_id: str = DEFAULT_SESSION) -> None:
+        """清除会话的对话历史
+        
+        Args:
+            session_id: 会话ID
         """
-        return self.history
+        await self.conversations.clear(session_id)
 
@@ -12,25 +12,25 @@ import argparse
 import json
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 from datetime import datetime
 
 from rich.console import Console
 from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.prompt import Prompt, Confirm
-from rich.syntax import Syntax
-from rich.table import Table
+from rich.prompt import Prompt
 from rich.logging import RichHandler
-from rich.live import Live
-from rich.spinner import Spinner
 
 from . import __version__
-from .ai_interface import AIInterface, Message
 from .command_executor import CommandExecutor, CommandResult
 from .config_manager import ConfigManager
 from .exceptions import ATAError, AIError, APIError, CommandExecutionError, SecurityError, ConfigError
+from .log_pipeline import PayloadPolicy, configure_logging
+from .timing import format_timing
+
+if TYPE_CHECKING:
+    from .ai_interface import AIInterface
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +38,7 @@ logger = logging.getLogger(__name__)
 class CLI:
     """命令行界面类，负责处理用户输入和显示结果"""
 
-    def __init__(self, ai_interface: Optional[AIInterface] = None, 
+    def __init__(self, ai_interface: Optional["AIInterface"] = None, 
                  command_executor: Optional[CommandExecutor] = None,
                  config_manager: Optional[ConfigManager] = None):
         """
@@ -56,6 +56,8 @@ class CLI:
         
         # 如果没有提供AI接口，创建一个新的
         if ai_interface is None:
+            from .ai_interface import AIInterface
+            
             provider = self.config_manager.get("ai.provider", "openai")
             provider_config = self.config_manager.get_provider_config(provider)
             model = provider_config.get("model")
@@ -63,6 +65,7 @@ class CLI:
             self.ai_interface = AIInterface(
                 provider=provider,
                 model=model,
+                config=self.config_manager,
                 fallback_provider=self.config_manager.get("ai.fallback_provider"),
                 fallback_model=self.config_manager.get_provider_config(
                     self.config_manager.get("ai.fallback_provider")
@@ -83,9 +86,23 @@ class CLI:
         # 加载历史记录
         self.history: List[Dict[str, str]] = self._load_history()
         
+        # 后台预取（ai.prefetch），用历史记录训练后续请求的预测
+        self.prefetcher = getattr(self.ai_interface, "prefetcher", None)
+        if self.prefetcher is not None:
+            self.prefetcher.predictor.learn(self.history)
+        
         # 调试模式
         self.debug = self.config_manager.get("ui.debug_mode", False)
         
+        # 流式显示生成的命令
+        self.stream_command = self.config_manager.get("ui.stream_command", True)
+        
+        # 实时显示命令输出
+        self.stream_output = self.config_manager.get("ui.stream_output", True)
+        
+        # 最近一次AI请求的耗时分解
+        self.last_timing: Optional[Dict[str, Any]] = None
+        
         # 加载欢迎信息
         self.show_welcome = self.config_manager.get("ui.show_welcome", True)
         
@@ -117,7 +134,7 @@ class CLI:
             console=self.console
         )
         
-        # 设置文件处理器
+        # 设置文件处理器（在后台线程中写入）
         file_handler = logging.handlers.RotatingFileHandler(
             log_file,
             maxBytes=self.config_manager.get("logging.max_size", 10) * 1024 * 1024,
@@ -126,10 +143,13 @@ class CLI:
         )
         
         # 配置日志记录
-        logging.basicConfig(
+        configure_logging(
             level=self.config_manager.get("logging.level", "INFO"),
-            format=log_format,
-            handlers=[rich_handler, file_handler]
+            console_handler=rich_handler,
+            file_handlers=[file_handler],
+            fmt=log_format,
+            as_json=self.config_manager.get("logging.json", False),
+            policy=PayloadPolicy.from_config(self.config_manager)
         )
         
         self.logger = logging.getLogger("ata")
@@ -188,6 +208,7 @@ class CLI:
             working_dir=self.command_executor.working_dir
         )
         
+        from rich.markdown import Markdown  # 加载较慢，仅在显示时导入
         self.console.print(Panel(Markdown(welcome_text)))
     
     def _show_help(self) -> None:
@@ -224,6 +245,7 @@ class CLI:
 - 使用 Ctrl+C 中断当前操作
         """
         
+        from rich.markdown import Markdown
         self.console.print(Panel(Markdown(help_text)))
     
     async def process_user_input(self, user_input: str) -> bool:
@@ -247,11 +269,17 @@ class CLI:
         try:
             # 生成命令
             self.console.print("[bold blue]思考中...[/]")
-            command = await self.ai_interface.chat(user_input)
-            
-            # 显示生成的命令
-            self.console.print("\n[bold green]生成的命令:[/]")
-            self.console.print(command)
+            self.last_timing = None
+            if self.stream_command:
+                command = await self._stream_command(user_input)
+            else:
+                command_data = await self.ai_interface.chat_detailed(user_input)
+                command = command_data.get("command", "")
+                self.last_timing = command_data.get("timing")
+                
+                # 显示生成的命令
+                self.console.print("\n[bold green]生成的命令:[/]")
+                self.console.print(command)
             
             # 检查命令安全性
             is_dangerous, warnings = self.command_executor.is_dangerous(command)
@@ -270,25 +298,7 @@ class CLI:
                 
                 if choice == 'y':
                     # 执行命令
-                    self.console.print("\n[bold blue]执行命令...[/]")
-                    result = self.command_executor.execute(command)
-                    
-                    # 显示结果
-                    self.console.print("\n[bold]执行结果:[/]")
-                    if result.success:
-                        self.console.print("[green]命令执行成功[/]")
-                    else:
-                        self.console.print("[red]命令执行失败[/]")
-                    
-                    if result.stdout:
-                        self.console.print("\n[bold]输出:[/]")
-                        self.console.print(result.stdout)
-                    
-                    if result.stderr:
-                        self.console.print("\n[bold red]错误:[/]")
-                        self.console.print(result.stderr)
-                    
-                    self.console.print(f"\n退出代码: {result.exit_code}")
+                    await self._execute_command(user_input, command)
                     break
                     
                 elif choice == 'e':
@@ -298,29 +308,14 @@ class CLI:
                     edited_command = Prompt.ask("编辑命令")
                     
                     if edited_command:
-                        self.console.print("\n[bold blue]执行命令...[/]")
-                        result = self.command_executor.execute(edited_command)
-                        
-                        # 显示结果
-                        self.console.print("\n[bold]执行结果:[/]")
-                        if result.success:
-                            self.console.print("[green]命令执行成功[/]")
-                        else:
-                            self.console.print("[red]命令执行失败[/]")
-                        
-                        if result.stdout:
-                            self.console.print("\n[bold]输出:[/]")
-                            self.console.print(result.stdout)
-                        
-                        if result.stderr:
-                            self.console.print("\n[bold red]错误:[/]")
-                            self.console.print(result.stderr)
-                        
-                        self.console.print(f"\n退出代码: {result.exit_code}")
+                        await self._execute_command(user_input, edited_command)
+                    else:
+                        self._show_timing()
                     break
                     
                 elif choice == 'n':
                     self.console.print("已取消执行")
+                    self._show_timing()
                     break
             
             # 保存到历史记录
@@ -339,6 +334,140 @@ class CLI:
             self.console.print(f"[bold red]错误:[/] {str(e)}")
             return True
     
+    async def _stream_command(self, user_input: str) -> str:
+        """流式生成命令，命令可用时立即显示，解释和警告随后显示
+        
+        Args:
+            user_input: 用户输入的文本
+            
+        Returns:
+            生成的命令
+        """
+        command = ""
+        async for event in self.ai_interface.chat_stream(user_input):
+            if event["type"] == "command":
+                command = event["command"]
+                self.console.print("\n[bold green]生成的命令:[/]")
+                self.console.print(command)
+                if self.debug:
+                    self.console.print(f"[dim]命令可用耗时: {event['time_to_command']:.2f}s[/]")
+            elif event["type"] == "result":
+                command = event.get("command", command)
+                self.last_timing = event.get("timing")
+                if event.get("explanation"):
+                    self.console.print(f"\n[bold]说明:[/] {event['explanation']}")
+                for warning in event.get("warnings", []):
+                    self.console.print(f"[{self.colors.get('warning', 'yellow')}]- {warning}[/]")
+        return command
+    
+    async def _execute_command(self, user_input: str, command: str) -> None:
+        """执行命令并显示结果
+        
+        Args:
+            user_input: 用户输入的文本
+            command: 要执行的命令
+        """
+        self.console.print("\n[bold blue]执行命令...[/]")
+        if self.stream_output:
+            result = await self._stream_output(command)
+        else:
+            result = await self.command_executor.execute_async(command)
+        
+        # 显示结果
+        self.console.print("\n[bold]执行结果:[/]")
+        if result.success:
+            self.console.print("[green]命令执行成功[/]")
+        else:
+            self.console.print("[red]命令执行失败[/]")
+        
+        if result.stdout:
+            self.console.print("\n[bold]输出:[/]")
+            self.console.print(result.stdout)
+        
+        if result.stderr:
+            self.console.print("\n[bold red]错误:[/]")
+            self.console.print(result.stderr)
+        
+        self.console.print(f"\n退出代码: {result.exit_code}")
+        self._show_timing(result.duration)
+        self._prefetch_follow_ups(user_input, command, result)
+    
+    async def _stream_output(self, command: str) -> CommandResult:
+        """实时显示命令的stdout和stderr
+        
+        输出边到达边显示，不在内存中保留，因此返回结果的 stdout 和 stderr 为空。
+        
+        Args:
+            command: 要执行的命令
+            
+        Returns:
+            命令执行结果
+        """
+        error_style = self.colors.get("error", "red")
+        async for event in self.command_executor.stream(command):
+            if event["type"] == "stdout":
+                self.console.out(event["data"], end="", highlight=False)
+            elif event["type"] == "stderr":
+                self.console.out(event["data"], end="", style=error_style, highlight=False)
+            elif event["type"] == "exit":
+                return CommandResult(
+                    success=event["success"],
+                    exit_code=event["exit_code"],
+                    stdout="",
+                    stderr="",
+                    duration=event["duration"]
+                )
+        raise CommandExecutionError(f"命令执行错误: '{command}' 未返回退出状态")
+    
+    def _show_timing(self, execution: Optional[float] = None) -> None:
+        """调试模式下显示最近一次请求的耗时摘要
+        
+        Args:
+            execution: 命令执行耗时（秒），未执行时为None
+        """
+        if self.debug and self.last_timing:
+            self.console.print(f"[dim]{format_timing(self.last_timing, execution)}[/]")
+    
+    def _prefetch_follow_ups(self, user_input: str, command: str, result: CommandResult) -> None:
+        """命令执行成功后在后台预取可能的后续请求
+        
+        Args:
+            user_input: 用户输入的文本
+            command: 执行的命令
+            result: 执行结果
+        """
+        if self.prefetcher is not None and result.success:
+            self.prefetcher.on_executed(user_input, command)
+    
+    async def _ask_input(self, prompt: str) -> str:
+        """读取用户输入
+        
+        启用预取时在守护线程中等待输入，事件循环不被阻塞，
+        预取任务可以在用户阅读输出和输入下一条请求时完成。
+        
+        Args:
+            prompt: 提示文本
+            
+        Returns:
+            用户输入的文本
+        """
+        if self.prefetcher is None:
+            return Prompt.ask(prompt)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def read() -> None:
+            try:
+                value = Prompt.ask(prompt)
+            except BaseException as e:
+                loop.call_soon_threadsafe(lambda error=e: future.done() or future.set_exception(error))
+            else:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(value))
+        
+        threading.Thread(target=read, name="ata-input", daemon=True).start()
+        return await future
+    
     async def run(self) -> int:
         """运行命令行界面"""
         try:
@@ -346,11 +475,12 @@ class CLI:
             
             while True:
                 try:
-                    user_input = Prompt.ask("\n请输入命令")
+                    user_input = await self._ask_input("\n请输入命令")
                     should_continue = await self.process_user_input(user_input)
                     if not should_continue:
                         break
-                except KeyboardInterrupt:
+                except (KeyboardInterrupt, asyncio.CancelledError):
+                    # 在线程中等待输入时，Ctrl+C 表现为主任务被取消
                     self.console.print("\n程序已中断")
                     return 1
                 except Exception as e:
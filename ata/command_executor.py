@@ -5,25 +5,48 @@
 提供安全检查和跨平台支持。
 """
 
+import io
 import os
-import re
 import sys
+import codecs
 import shlex
 import signal
+import asyncio
 import logging
 import platform
 import subprocess
+import threading
 import time
-import psutil
-from typing import Dict, List, Optional, Tuple, Union
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 from dataclasses import dataclass
 
 from .config_manager import ConfigManager
+from .danger_matcher import CommandAnalysis, DangerMatcher, DangerVerdict
 from .exceptions import CommandExecutionError, SecurityError
+from .log_pipeline import payload
+from .output_capture import CaptureConfig, OutputCapture, OutputStore
 
 logger = logging.getLogger(__name__)
 
+# 超时或取消时先发送SIGTERM，进程组在该时间内未退出则发送SIGKILL（秒）
+KILL_GRACE_PERIOD = 2.0
+
+# 流式执行时每次从管道读取的字节数
+STREAM_CHUNK_SIZE = 4096
+
+# 流式执行时等待消费的输出块数上限；队列满时停止读取管道，子进程写满管道后阻塞，
+# 慢速的消费者不会让内存无限增长
+STREAM_MAX_PENDING = 64
+
+
+# 默认缓存的命令解析结果和安全检查结论数
+DEFAULT_ANALYSIS_CACHE_SIZE = 1024
+
+# 从管道读取输出时每次读取的字节数
+CAPTURE_CHUNK_SIZE = 64 * 1024
+
 
 @dataclass
 class CommandResult:
@@ -33,6 +56,10 @@ class CommandResult:
     stdout: str
     stderr: str
     duration: float
+    stdout_bytes: int = 0  # stdout 总字节数（包括被省略的部分）
+    stderr_bytes: int = 0  # stderr 总字节数
+    truncated: bool = False  # stdout 或 stderr 超出内存上限，只保留了开头和结尾
+    output_id: Optional[str] = None  # 完整输出已写入临时文件时，用于 read_output 分页读取
 
 
 class CommandExecutor:
@@ -47,7 +74,7 @@ class CommandExecutor:
         r"dd\s+if=/dev/zero",  # 磁盘写零
         r">\s+/dev/sd[a-z]",  # 直接写入磁盘
         r"chmod\s+-R\s+777",  # 修改权限为777
-        r":(){:\|:&};:",  # Fork炸弹
+        r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:",  # Fork炸弹
         r"wget\s+.*\s+\|\s+bash",  # 下载并执行脚本
         r"curl\s+.*\s+\|\s+bash",  # 下载并执行脚本
     ]
@@ -78,6 +105,23 @@ class CommandExecutor:
         self.sensitive_dirs = config.get("security.sensitive_directories", [])
         self.require_confirmation = config.get("security.require_confirmation", True)
         
+        # 内置模式、危险命令和敏感目录预编译为一个匹配器
+        self.danger_matcher = DangerMatcher(self.DANGEROUS_PATTERNS, self.dangerous_commands, self.sensitive_dirs)
+        
+        # 按命令文本缓存解析结果和结论（LRU），历史中重复的命令和执行前的再次检查只需查表
+        self.analysis_cache_size = int(config.get("security.analysis_cache_size", DEFAULT_ANALYSIS_CACHE_SIZE))
+        self._analyses: "OrderedDict[str, CommandAnalysis]" = OrderedDict()
+        self._analyses_lock = threading.Lock()
+        self.analysis_hits = 0
+        self.analysis_misses = 0
+        
+        # Web界面执行命令的超时（秒），由调用方显式传给 execute_async，0或空表示不限制
+        self.command_timeout = config.get("ui.command_timeout", 30)
+        
+        # 输出捕获：限制每个输出流占用的内存，超出部分写入临时文件
+        self.capture_config = CaptureConfig.from_config(config)
+        self.outputs = OutputStore(self.capture_config.max_spilled)
+        
         # 设置环境变量
         self.env = os.environ.copy()
         self.env["PYTHONIOENCODING"] = "utf-8"
@@ -118,29 +162,46 @@ class CommandExecutor:
         Returns:
             (是否危险, 警告信息)
         """
-        warnings = []
+        verdict = self.check_command(command)
+        return verdict.dangerous, list(verdict.warnings)
+    
+    def check_command(self, command: str) -> DangerVerdict:
+        """检查命令，返回命中的规则
         
-        # 检查危险命令模式
-        for pattern in self.DANGEROUS_PATTERNS:
-            if re.search(pattern, command, re.IGNORECASE):
-                warnings.append(f"命令匹配危险模式: {pattern}")
+        Args:
+            command: 要检查的命令
         
-        # 检查敏感目录
-        for dir_path in self.sensitive_dirs:
-            if dir_path in command:
-                warnings.append(f"命令涉及敏感目录: {dir_path}")
+        Returns:
+            安全检查结论
+        """
+        return self.analyze_command(command).verdict
+    
+    def analyze_command(self, command: str) -> CommandAnalysis:
+        """解析并检查命令，结果按命令文本缓存
         
-        # 检查特权命令
-        if command.startswith(("sudo ", "su ")):
-            warnings.append("命令需要特权访问")
+        is_dangerous 检查过的命令在执行时不再重复解析。
         
-        # 检查管道和重定向到系统目录
-        if ">" in command or "|" in command:
-            for dir_path in self.sensitive_dirs:
-                if dir_path in command:
-                    warnings.append(f"命令包含对敏感目录的重定向或管道操作: {dir_path}")
+        Args:
+            command: 要检查的命令
         
-        return len(warnings) > 0, warnings
+        Returns:
+            解析结果和安全检查结论
+        """
+        with self._analyses_lock:
+            analysis = self._analyses.get(command)
+            if analysis is not None:
+                self._analyses.move_to_end(command)
+                self.analysis_hits += 1
+                return analysis
+            self.analysis_misses += 1
+        
+        analysis = self.danger_matcher.analyze(command)
+        if self.analysis_cache_size > 0:
+            with self._analyses_lock:
+                self._analyses[command] = analysis
+                while len(self._analyses) > self.analysis_cache_size:
+                    self._analyses.popitem(last=False)
+        return analysis
     
     def _parse_command(self, command: str) -> List[str]:
         """解析命令字符串
@@ -164,6 +225,43 @@ class CommandExecutor:
         except Exception as e:
             raise CommandExecutionError(f"命令解析错误: {str(e)}")
     
+    def _prepare(self, command: str, env: Optional[Dict[str, str]],
+                 shell: bool) -> Tuple[Union[str, List[str]], Dict[str, str]]:
+        """执行前的检查和准备
+        
+        Args:
+            command: 要执行的命令
+            env: 额外的环境变量
+            shell: 是否使用shell执行
+        
+        Returns:
+            (命令参数, 环境变量)
+        
+        Raises:
+            CommandExecutionError: 命令为空或解析错误
+            SecurityError: 安全检查错误
+        """
+        # 检查命令是否为空
+        if not command or not command.strip():
+            raise CommandExecutionError("命令不能为空")
+        
+        # 检查命令是否危险
+        is_dangerous, warnings = self._is_dangerous_command(command)
+        if is_dangerous:
+            if self.require_confirmation:
+                raise SecurityError(f"危险命令需要确认: {', '.join(warnings)}")
+            else:
+                logger.warning(f"执行危险命令: {', '.join(warnings)}")
+        
+        # 准备环境变量
+        cmd_env = self.env.copy()
+        if env:
+            cmd_env.update(env)
+        
+        # 解析命令
+        cmd_args = command if shell else self._parse_command(command)
+        return cmd_args, cmd_env
+    
     def execute(
         self,
         command: str,
@@ -191,58 +289,30 @@ class CommandExecutor:
             SecurityError: 安全检查错误
         """
         logger.info(f"执行命令: {command}")
-        
-        # 检查命令是否为空
-        if not command or not command.strip():
-            raise CommandExecutionError("命令不能为空")
-        
-        # 检查命令是否危险
-        is_dangerous, warnings = self._is_dangerous_command(command)
-        if is_dangerous:
-            if self.require_confirmation:
-                raise SecurityError(f"危险命令需要确认: {', '.join(warnings)}")
-            else:
-                logger.warning(f"执行危险命令: {', '.join(warnings)}")
+        cmd_args, cmd_env = self._prepare(command, env, shell)
         
         try:
-            # 准备环境变量
-            cmd_env = self.env.copy()
-            if env:
-                cmd_env.update(env)
-            
-            # 解析命令
-            if shell:
-                cmd_args = command
-            else:
-                cmd_args = self._parse_command(command)
-            
             # 执行命令
             start_time = time.time()
             
-            process = subprocess.run(
-                cmd_args,
-                cwd=self.working_directory,
-                env=cmd_env,
-                timeout=timeout,
-                capture_output=capture_output,
-                text=True,
-                shell=shell,
-                check=check,
-                encoding='utf-8',
-                errors='replace'
-            )
+            if capture_output:
+                returncode, captures = self._run_captured(cmd_args, cmd_env, shell, timeout)
+            else:
+                returncode = subprocess.run(
+                    cmd_args,
+                    cwd=self.working_directory,
+                    env=cmd_env,
+                    timeout=timeout,
+                    shell=shell
+                ).returncode
+                captures = None
             
-            duration = time.time() - start_time
+            if check and returncode != 0:
+                self._discard(captures)
+                raise subprocess.CalledProcessError(returncode, cmd_args)
             
-            result = CommandResult(
-                success=(process.returncode == 0),
-                exit_code=process.returncode,
-                stdout=process.stdout if capture_output else "",
-                stderr=process.stderr if capture_output else "",
-                duration=duration
-            )
-            
-            logger.debug(f"命令执行结果: {result}")
+            result = self._make_result(returncode, captures, time.time() - start_time)
+            logger.debug("命令执行结果: %s", payload(result))
             return result
             
         except subprocess.TimeoutExpired as e:
@@ -252,6 +322,344 @@ class CommandExecutor:
         except Exception as e:
             raise CommandExecutionError(f"命令执行错误: {str(e)}")
     
+    async def execute_async(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        capture_output: bool = True,
+        check: bool = True,
+        env: Optional[Dict[str, str]] = None,
+        shell: bool = False,
+    ) -> CommandResult:
+        """在事件循环中异步执行命令，不阻塞其他请求
+        
+        命令在独立的进程组中运行；超时或调用方取消时终止整个进程组
+        （包括shell启动的子进程），先发送SIGTERM，宽限期后发送SIGKILL。
+        参数、返回值和异常与 execute() 相同。
+        
+        Args:
+            command: 要执行的命令
+            timeout: 超时时间（秒），从启动时起计算的截止时间，未指定时不限制
+            capture_output: 是否捕获输出
+            check: 是否检查返回码
+            env: 环境变量
+            shell: 是否使用shell执行
+        
+        Returns:
+            命令执行结果
+        
+        Raises:
+            CommandExecutionError: 命令执行错误或超时
+            SecurityError: 安全检查错误
+        """
+        logger.info(f"异步执行命令: {command}")
+        cmd_args, cmd_env = self._prepare(command, env, shell)
+        
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        deadline = loop.time() + timeout if timeout else None
+        process = await self._spawn(cmd_args, cmd_env, shell, capture_output)
+        
+        captures = self._new_captures() if capture_output else None
+        
+        async def collect() -> None:
+            if captures is not None:
+                await asyncio.gather(
+                    self._drain_async(process.stdout, captures["stdout"]),
+                    self._drain_async(process.stderr, captures["stderr"]),
+                )
+            await process.wait()
+        
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            await asyncio.wait_for(collect(), remaining)
+        except asyncio.TimeoutError:
+            await asyncio.shield(self._kill_process_group(process))
+            self._discard(captures)
+            raise CommandExecutionError(f"命令执行超时: '{command}' 超过 {timeout} 秒")
+        except asyncio.CancelledError:
+            await asyncio.shield(self._kill_process_group(process))
+            self._discard(captures)
+            raise
+        
+        if check and process.returncode != 0:
+            self._discard(captures)
+            raise CommandExecutionError(
+                f"命令执行失败: {str(subprocess.CalledProcessError(process.returncode, cmd_args))}"
+            )
+        
+        result = self._make_result(process.returncode, captures, time.time() - start_time)
+        logger.debug("命令执行结果: %s", payload(result))
+        return result
+    
+    def _new_captures(self) -> Dict[str, OutputCapture]:
+        """为stdout和stderr创建有界捕获"""
+        config = self.capture_config
+        return {
+            name: OutputCapture(config.max_memory, config.spill, config.spill_dir)
+            for name in ("stdout", "stderr")
+        }
+    
+    @staticmethod
+    def _discard(captures: Optional[Dict[str, OutputCapture]]) -> None:
+        """丢弃不再需要的捕获，删除临时文件"""
+        for capture in (captures or {}).values():
+            capture.close()
+    
+    def _make_result(self, returncode: int, captures: Optional[Dict[str, OutputCapture]],
+                     duration: float) -> CommandResult:
+        """根据捕获的输出生成执行结果，溢出到磁盘的输出保存到 self.outputs"""
+        if captures is None:
+            return CommandResult(
+                success=(returncode == 0),
+                exit_code=returncode,
+                stdout="",
+                stderr="",
+                duration=duration
+            )
+        for capture in captures.values():
+            capture.finish()
+        stdout, stderr = captures["stdout"], captures["stderr"]
+        return CommandResult(
+            success=(returncode == 0),
+            exit_code=returncode,
+            stdout=stdout.getvalue(),
+            stderr=stderr.getvalue(),
+            duration=duration,
+            stdout_bytes=stdout.total_bytes,
+            stderr_bytes=stderr.total_bytes,
+            truncated=stdout.truncated or stderr.truncated,
+            output_id=self.outputs.add(captures)
+        )
+    
+    def _run_captured(self, cmd_args: Union[str, List[str]], cmd_env: Dict[str, str], shell: bool,
+                      timeout: Optional[float]) -> Tuple[int, Dict[str, OutputCapture]]:
+        """同步执行命令，由两个线程把stdout和stderr读入有界捕获
+        
+        Returns:
+            (返回码, 输出捕获)
+        
+        Raises:
+            subprocess.TimeoutExpired: 执行超时，进程已被终止
+        """
+        captures = self._new_captures()
+        process = subprocess.Popen(
+            cmd_args,
+            cwd=self.working_directory,
+            env=cmd_env,
+            shell=shell,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        readers = [
+            threading.Thread(target=self._drain, args=(process.stdout, captures["stdout"]), daemon=True),
+            threading.Thread(target=self._drain, args=(process.stderr, captures["stderr"]), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            for reader in readers:
+                reader.join()
+            self._discard(captures)
+            raise
+        for reader in readers:
+            reader.join()
+        return process.returncode, captures
+    
+    @staticmethod
+    def _drain(pipe, capture: OutputCapture) -> None:
+        """在线程中读取管道直到结束"""
+        with pipe:
+            for data in iter(lambda: pipe.read1(CAPTURE_CHUNK_SIZE), b""):
+                capture.write(data)
+    
+    @staticmethod
+    async def _drain_async(reader: asyncio.StreamReader, capture: OutputCapture) -> None:
+        """读取异步管道直到结束"""
+        while True:
+            data = await reader.read(CAPTURE_CHUNK_SIZE)
+            if not data:
+                break
+            capture.write(data)
+    
+    async def stream(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        env: Optional[Dict[str, str]] = None,
+        shell: bool = False,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        max_pending: int = STREAM_MAX_PENDING,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式执行命令，按到达顺序产出交错的stdout和stderr输出块
+        
+        事件格式:
+            {"type": "stdout" | "stderr", "data": 文本, "timestamp": 读取时间}
+            {"type": "exit", "success", "exit_code", "duration", "timestamp"}（最后一个事件）
+        
+        输出不会在内存中累积：最多缓存 max_pending 个输出块，消费者跟不上时停止读取管道，
+        由管道把压力传回子进程。非零退出码通过 exit 事件返回而不抛出异常。
+        超时、消费者取消或提前关闭生成器时终止整个进程组，同 execute_async。
+        
+        Args:
+            command: 要执行的命令
+            timeout: 超时时间（秒），从启动时起计算的截止时间，未指定时不限制
+                （输出已由缓冲区上限和背压约束，长时间的构建可以一直流式输出）
+            env: 环境变量
+            shell: 是否使用shell执行
+            chunk_size: 每次从管道读取的字节数
+            max_pending: 等待消费的输出块数上限
+        
+        Returns:
+            事件异步生成器
+        
+        Raises:
+            CommandExecutionError: 命令执行错误或超时
+            SecurityError: 安全检查错误
+        """
+        logger.info(f"流式执行命令: {command}")
+        cmd_args, cmd_env = self._prepare(command, env, shell)
+        
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        deadline = loop.time() + timeout if timeout else None
+        process = await self._spawn(cmd_args, cmd_env, shell, capture_output=True)
+        
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(max_pending)
+        readers = [
+            asyncio.ensure_future(self._pump(process.stdout, "stdout", queue, chunk_size)),
+            asyncio.ensure_future(self._pump(process.stderr, "stderr", queue, chunk_size)),
+        ]
+        try:
+            open_streams = len(readers)
+            while open_streams:
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    event = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    raise CommandExecutionError(f"命令执行超时: '{command}' 超过 {timeout} 秒")
+                if event is None:
+                    open_streams -= 1
+                else:
+                    yield event
+            
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                await asyncio.wait_for(process.wait(), remaining)
+            except asyncio.TimeoutError:
+                raise CommandExecutionError(f"命令执行超时: '{command}' 超过 {timeout} 秒")
+            
+            logger.debug(f"流式命令结束: 退出代码 {process.returncode}")
+            yield {
+                "type": "exit",
+                "success": process.returncode == 0,
+                "exit_code": process.returncode,
+                "duration": time.time() - start_time,
+                "timestamp": time.time(),
+            }
+        finally:
+            # 正常结束时进程已退出，这里只在超时、取消或提前关闭时终止进程组
+            await asyncio.shield(self._kill_process_group(process))
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+    
+    @staticmethod
+    async def _pump(reader: asyncio.StreamReader, name: str,
+                    queue: "asyncio.Queue[Optional[Dict[str, Any]]]", chunk_size: int) -> None:
+        """把管道输出增量解码后放入队列，结束时放入None
+        
+        跨块拆分的多字节字符和 \r\n 会被正确拼接；队列满时等待，不再读取管道。
+        """
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True
+        )
+        while True:
+            data = await reader.read(chunk_size)
+            text = decoder.decode(data, final=not data)
+            if text:
+                await queue.put({"type": name, "data": text, "timestamp": time.time()})
+            if not data:
+                break
+        await queue.put(None)
+    
+    async def _spawn(self, cmd_args: Union[str, List[str]], cmd_env: Dict[str, str],
+                     shell: bool, capture_output: bool) -> "asyncio.subprocess.Process":
+        """在新的进程组中启动子进程，便于整体终止
+        
+        Raises:
+            CommandExecutionError: 启动失败
+        """
+        options = {
+            "cwd": self.working_directory,
+            "env": cmd_env,
+            "stdout": subprocess.PIPE if capture_output else None,
+            "stderr": subprocess.PIPE if capture_output else None,
+        }
+        if self.is_windows():
+            options["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            options["start_new_session"] = True
+        
+        try:
+            if shell:
+                return await asyncio.create_subprocess_shell(cmd_args, **options)
+            return await asyncio.create_subprocess_exec(*cmd_args, **options)
+        except Exception as e:
+            raise CommandExecutionError(f"命令执行错误: {str(e)}")
+    
+    async def _kill_process_group(self, process: "asyncio.subprocess.Process") -> None:
+        """终止进程所在的整个进程组并回收进程
+        
+        Args:
+            process: 由 execute_async 或 stream 启动的进程
+        """
+        if process.returncode is not None:
+            return
+        if self.is_windows():
+            # Windows没有进程组信号，用 taskkill /T 终止整个进程树
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/F", "/T", "/PID", str(process.pid),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            await killer.wait()
+        else:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(process.wait(), KILL_GRACE_PERIOD)
+                    return
+                except asyncio.TimeoutError:
+                    os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        await process.wait()
+    
+    def read_output(self, output_id: str, stream: str = "stdout", offset: int = 0,
+                    limit: int = 64 * 1024) -> Dict[str, Any]:
+        """分页读取溢出到磁盘的完整输出
+        
+        Args:
+            output_id: CommandResult.output_id
+            stream: 输出流名称，stdout或stderr
+            offset: 起始字节偏移
+            limit: 最多读取的字节数
+        
+        Returns:
+            包含 data、offset、next_offset、total_bytes 和 eof 的字典
+        
+        Raises:
+            CommandExecutionError: 输出不存在或已被删除
+        """
+        try:
+            return self.outputs.read(output_id, stream, offset, limit)
+        except (KeyError, ValueError):
+            raise CommandExecutionError(f"输出不存在或已被删除: {output_id}")
+    
     def execute_background(
         self,
         command: str,
@@ -272,31 +680,10 @@ class CommandExecutor:
             CommandExecutionError: 命令执行错误
             SecurityError: 安全检查错误
         """
-        # 检查命令是否为空
-        if not command or not command.strip():
-            raise CommandExecutionError("命令不能为空")
-        
-        # 检查命令是否危险
-        is_dangerous, warnings = self._is_dangerous_command(command)
-        if is_dangerous:
-            if self.require_confirmation:
-                raise SecurityError(f"危险命令需要确认: {', '.join(warnings)}")
-            else:
-                logger.warning(f"执行危险命令: {', '.join(warnings)}")
+        cmd_args, cmd_env = self._prepare(command, env, shell)
         
         try:
-            # 准备环境变量
-            cmd_env = self.env.copy()
-            if env:
-                cmd_env.update(env)
-            
-            # 解析命令
-            if shell:
-                cmd_args = command
-            else:
-                cmd_args = self._parse_command(command)
-            
-            # 执行命令
+            # 执行命令，在新的进程组中运行，terminate_process 只终止该进程组
             process = subprocess.Popen(
                 cmd_args,
                 cwd=self.working_directory,
@@ -304,7 +691,8 @@ class CommandExecutor:
                 shell=shell,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                start_new_session=not self.is_windows()
             )
             
             return process
@@ -354,6 +742,8 @@ class CommandExecutor:
         Returns:
             系统信息字典
         """
+        import psutil  # 仅在需要时加载，加快启动
+        
         try:
             info = {
                 "os": platform.system(),
@@ -364,7 +754,7 @@ class CommandExecutor:
                 "disk_usage": psutil.disk_usage('/').percent,
                 "working_directory": self.working_directory or os.getcwd()
             }
-            logger.debug(f"系统信息: {info}")
+            logger.debug("系统信息: %s", payload(info))
             return info
         except Exception as e:
             logger.error(f"获取系统信息失败: {str(e)}", exc_info=True)
@@ -48,6 +48,74 @@ class ConfigManager:
             "provider": "deepseek",  # 默认使用 deepseek
             "max_history_length": 100,
             "max_context_length": 4000,
+            "batch_concurrency": 5,  # 批量生成命令的最大并发数
+            "batch_max_inputs": 100,  # 单次批量请求的最大条目数
+            "http_pool": {
+                "limit": 100,  # 总连接数上限
+                "limit_per_host": 10,  # 单主机连接数上限
+                "keepalive_timeout": 30,  # 空闲连接回收时间（秒）
+                "ttl_dns_cache": 300,  # DNS缓存时间（秒）
+                "timeout": 30,  # 请求超时（秒）
+                "verify_ssl": False
+            },
+            "cache": {
+                "enabled": True,
+                "persistent": True,  # 是否启用SQLite持久化缓存
+                "path": "~/.ata/response_cache.db",
+                "max_entries": 256,  # 内存缓存条目上限
+                "max_disk_entries": 10000,  # 持久化缓存条目上限
+                "ttl": 86400  # 缓存有效期（秒）
+            },
+            "conversations": {
+                "max_sessions": 1000,  # 内存中保留的最大会话数（每个会话最多 max_history_length 轮）
+                "idle_ttl": 3600,  # 会话空闲超时（秒），0表示不过期
+                "persistent": False,  # 是否用SQLite持久化会话
+                "path": "~/.ata/conversations.db"
+            },
+            "fast_path": {
+                "enabled": True,  # 常见请求由本地规则直接翻译，不调用大模型
+                "builtin_rules": True,  # 是否启用内置规则
+                "rules": []  # 用户规则，同名时替换内置规则
+            },
+            "prefetch": {
+                "enabled": False,  # 命令执行成功后在后台预取可能的后续请求
+                "max_predictions": 2,  # 每次执行后预取的请求数上限
+                "max_per_minute": 6,  # 每分钟预取的上游请求数上限
+                "min_headroom": 0.5,  # 限流器剩余额度低于该比例时不预取
+                "follow_ups": {}  # 额外的后续请求，键为命令
+            },
+            "structured_output": {
+                "json_mode": True,  # 请求提供商以JSON模式返回命令
+                "repair": True  # 响应不是严格的JSON时在本地修复，避免重新请求
+            },
+            "retry": {
+                "max_retries": 3,  # 最大重试次数
+                "base_delay": 0.5,  # 指数退避基准时间（秒）
+                "max_delay": 20,  # 单次退避上限（秒）
+                "budget": 30,  # 单次调用的累计等待预算（秒）
+                "retry_statuses": [408, 429, 500, 502, 503, 504]
+            },
+            "circuit_breaker": {
+                "failure_threshold": 5,  # 打开熔断器所需的连续失败次数
+                "recovery_timeout": 30  # 熔断后进入半开状态前的等待时间（秒）
+            },
+            "rate_limit": {
+                "enabled": True,
+                "requests_per_minute": 60,  # 每个API密钥每分钟请求数上限，0表示不限制
+                "tokens_per_minute": 0  # 每个API密钥每分钟令牌数上限，0表示不限制
+            },
+            "fallback_provider": None,  # 备用提供商（可为列表），主提供商慢或失败时使用
+            "auto_fallback": True,  # 是否启用配置中的备用提供商
+            "hedging": {
+                "enabled": True,  # 主提供商超过延迟分位数未返回时向备用提供商发出对冲请求
+                "quantile": 0.95,  # 触发对冲的滚动延迟分位数
+                "min_delay": 0.5,  # 对冲延迟下限（秒）
+                "max_delay": 10,  # 对冲延迟上限（秒）
+                "initial_delay": 3,  # 样本不足时的对冲延迟（秒）
+                "min_samples": 5,
+                "window": 100,  # 滚动窗口大小（请求数）
+                "max_error_rate": 0.5  # 错误率超过该值的提供商降级到链尾
+            },
             "deepseek": {
                 "model": "deepseek-coder",
                 "temperature": 0.7,
@@ -70,6 +138,12 @@ class ConfigManager:
                     "gpt-4-turbo",
                     "gpt-3.5-turbo"
                 ]
+            },
+            "mock": {
+                # 本地模拟服务，先运行 python -m ata.mock_server
+                "model": "mock-model",
+                "temperature": 0.7,
+                "api_url": "http://127.0.0.1:8765/v1/chat/completions"
             }
         },
         "security": {
@@ -88,7 +162,8 @@ class ConfigManager:
                 "/boot",
                 "/root"
             ],
-            "require_confirmation": True
+            "require_confirmation": True,
+            "analysis_cache_size": 1024  # 缓存的命令解析结果和安全检查结论数，0表示不缓存
         },
         "ui": {
             "theme": "default",
@@ -98,12 +173,26 @@ class ConfigManager:
                 "warning": "yellow",
                 "info": "blue"
             },
-            "show_welcome": True
+            "show_welcome": True,
+            "stream_command": True,  # 流式显示生成的命令
+            "stream_output": True,  # 实时显示命令的stdout和stderr
+            "command_timeout": 30,  # Web界面执行命令的超时（秒），超时后终止整个进程组；CLI和流式执行不限制
+            "output_capture": {
+                "max_memory": 1048576,  # 每个输出流在内存中保留的字节数（开头和结尾各一半），0表示不限制
+                "spill": True,  # 超出部分写入临时文件，可通过 /api/output 分页读取
+                "spill_dir": None,  # 临时文件目录，默认使用系统临时目录
+                "max_spilled": 16  # 保留的溢出输出数
+            }
         },
         "logging": {
             "level": "INFO",
             "file": None,
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            "json": False,  # 文件日志是否输出为JSON行
+            "payload": {
+                "max_chars": 2000,  # 提示、响应等载荷的最大输出字符数，0表示不截断
+                "sample_rate": 1.0  # 输出完整载荷的比例，其余只记录长度
+            }
         }
     }
 
@@ -274,7 +363,7 @@ class ConfigManager:
         ai_config = self.config.get("ai", {})
         if "provider" not in ai_config:
             errors.append(ConfigValidationError("ai.provider", "必须指定提供商"))
-        elif ai_config["provider"] not in ["openai", "deepseek"]:
+        elif ai_config["provider"] not in ["openai", "deepseek", "mock"]:
             errors.append(ConfigValidationError("ai.provider", "不支持的提供商"))
         
         # 验证每个提供商的配置
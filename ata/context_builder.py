@@ -0,0 +1,158 @@
+"""
+上下文构建模块
+
+在令牌预算内组装发送给模型的上下文：系统提示和用户输入必须保留，
+对话历史从最近一轮开始向前填充，超出预算或轮数上限的最旧轮次被丢弃。
+"""
+
+import logging
+from functools import lru_cache
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .conversation_store import Turn
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 每条消息的固定开销（角色标记、分隔符等）
+MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """估算文本的令牌数
+
+    中日韩字符按每字一个令牌计算，其余字符按每4个字符一个令牌计算。
+    结果按文本缓存，同一条消息只计算一次。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的令牌数
+    """
+    wide = sum(1 for ch in text if ch >= "⺀")
+    narrow = len(text) - wide
+    return wide + (narrow + 3) // 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """估算一条消息的令牌数"""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def turn_to_messages(turn: Union[Turn, Dict[str, str]]) -> List[Dict[str, str]]:
+    """将一轮对话转换为消息列表
+
+    支持会话存储中的 Turn 对象、{"role", "content"} 格式的消息，
+    以及 {"user", "assistant"} 格式的对话轮次。
+    """
+    if isinstance(turn, Turn):
+        return turn.to_messages()
+    if "role" in turn:
+        return [turn]
+    messages = []
+    if turn.get("user"):
+        messages.append({"role": "user", "content": turn["user"]})
+    if turn.get("assistant"):
+        messages.append({"role": "assistant", "content": turn["assistant"]})
+    return messages
+
+
+@dataclass
+class ContextStats:
+    """上下文构建统计信息"""
+    requests: int = 0  # 构建次数
+    prompt_tokens: int = 0  # 累计提示令牌数（估算）
+    max_prompt_tokens: int = 0  # 单次最大提示令牌数（估算）
+    dropped_turns: int = 0  # 累计丢弃的历史轮次
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["avg_prompt_tokens"] = self.prompt_tokens / self.requests if self.requests else 0.0
+        return data
+
+
+class ContextBuilder:
+    """按令牌预算裁剪对话历史"""
+
+    def __init__(self, max_tokens: int = 4000, max_history: int = 100):
+        """初始化上下文构建器
+
+        Args:
+            max_tokens: 提示的令牌预算（系统提示 + 历史 + 用户输入）
+            max_history: 最多保留的历史轮次
+        """
+        self.max_tokens = max_tokens
+        self.max_history = max_history
+        self.stats = ContextStats()
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "ContextBuilder":
+        """从配置管理器读取 ai.max_context_length 和 ai.max_history_length
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            上下文构建器
+        """
+        return cls(
+            max_tokens=int(config.get("ai.max_context_length", 4000)),
+            max_history=int(config.get("ai.max_history_length", 100)),
+        )
+
+    def build(self,
+              system_prompt: str,
+              user_input: str,
+              history: Optional[List[Union[Turn, Dict[str, str]]]] = None
+              ) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """在预算内选择对话历史
+
+        Args:
+            system_prompt: 系统提示（用于计算其占用的令牌）
+            user_input: 用户输入
+            history: 完整的对话历史，按时间顺序排列
+
+        Returns:
+            (按时间顺序排列的历史消息, 构建报告)，报告包含
+            prompt_tokens、history_turns、used_turns 和 dropped_turns
+        """
+        history = history or []
+        fixed = (estimate_tokens(system_prompt) + MESSAGE_OVERHEAD
+                 + estimate_tokens(user_input) + MESSAGE_OVERHEAD)
+        remaining = self.max_tokens - fixed
+
+        selected: List[List[Dict[str, str]]] = []
+        used = 0
+        for turn in reversed(history[-self.max_history:] if self.max_history > 0 else []):
+            messages = turn_to_messages(turn)
+            cost = sum(message_tokens(message) for message in messages)
+            if cost > remaining:
+                break
+            remaining -= cost
+            used += cost
+            selected.append(messages)
+
+        trimmed = [message for messages in reversed(selected) for message in messages]
+        report = {
+            "prompt_tokens": fixed + used,
+            "history_turns": len(history),
+            "used_turns": len(selected),
+            "dropped_turns": len(history) - len(selected),
+        }
+        self.stats.requests += 1
+        self.stats.prompt_tokens += report["prompt_tokens"]
+        self.stats.max_prompt_tokens = max(self.stats.max_prompt_tokens, report["prompt_tokens"])
+        self.stats.dropped_turns += report["dropped_turns"]
+        if report["dropped_turns"]:
+            logger.debug(f"上下文超出预算，丢弃{report['dropped_turns']}轮历史")
+        return trimmed, report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return self.stats.to_dict()
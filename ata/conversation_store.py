@@ -0,0 +1,369 @@
+"""
+会话存储模块
+
+按会话保存对话历史：每个会话是一个容量为 ai.max_history_length 的环形缓冲区，
+会话之间按最近使用顺序淘汰并在空闲超时后过期，总内存占用有上限。
+服务端刚分配、客户端尚未回传ID的会话是临时会话，单独按同样的上限淘汰，
+客户端回传ID后才转为正式会话；不带Cookie的大量请求不会挤掉其他用户的会话。
+对话轮次以紧凑的 __slots__ 对象保存，只在构建提示时才转换为提供商的消息格式。
+可选使用SQLite持久化，进程重启后会话可以继续。
+"""
+
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# CLI和未指定会话的调用使用的会话ID
+DEFAULT_SESSION = "default"
+
+
+class Turn:
+    """一轮对话：用户输入和生成的命令"""
+
+    __slots__ = ("user", "assistant", "created_at")
+
+    def __init__(self, user: str, assistant: str, created_at: Optional[float] = None):
+        self.user = user
+        self.assistant = assistant
+        self.created_at = time.time() if created_at is None else created_at
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Turn":
+        """从 {"user", "assistant"} 字典创建"""
+        return cls(data.get("user", ""), data.get("assistant", ""), data.get("created_at"))
+
+    def to_messages(self) -> List[Dict[str, str]]:
+        """转换为提供商的消息格式"""
+        messages = []
+        if self.user:
+            messages.append({"role": "user", "content": self.user})
+        if self.assistant:
+            messages.append({"role": "assistant", "content": self.assistant})
+        return messages
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"user": self.user, "assistant": self.assistant, "created_at": self.created_at}
+
+    def __repr__(self) -> str:
+        return f"Turn(user={self.user!r}, assistant={self.assistant!r})"
+
+
+class _Session:
+    """内存中的一个会话"""
+
+    __slots__ = ("turns", "last_access")
+
+    def __init__(self, max_turns: int, turns: Iterable[Turn] = ()):
+        self.turns: Deque[Turn] = deque(turns, maxlen=max_turns)
+        self.last_access = time.monotonic()
+
+
+@dataclass
+class ConversationStats:
+    """会话存储统计信息"""
+    sessions_created: int = 0  # 新建的会话数
+    sessions_evicted: int = 0  # 因会话数超限被淘汰的会话数
+    sessions_expired: int = 0  # 因空闲超时被移除的会话数
+    turns_appended: int = 0  # 写入的对话轮次
+    turns_dropped: int = 0  # 因环形缓冲区已满被覆盖的轮次
+    disk_loads: int = 0  # 从持久化存储恢复的会话数
+    provisional_evicted: int = 0  # 客户端回传ID之前被淘汰的临时会话数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class SQLiteConversations:
+    """基于SQLite的会话持久化存储，每个会话只保留最近 max_turns 轮"""
+
+    def __init__(self, path: Union[str, Path], max_turns: int):
+        """初始化SQLite存储
+
+        Args:
+            path: 数据库文件路径
+            max_turns: 每个会话保留的最大轮次
+        """
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user TEXT NOT NULL,
+                assistant TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id)"
+        )
+        self._conn.commit()
+
+    def load(self, session_id: str) -> List[Turn]:
+        """读取会话最近的轮次，按时间顺序排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user, assistant, created_at FROM turns WHERE session_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_turns)
+            ).fetchall()
+        return [Turn(user, assistant, created_at) for user, assistant, created_at in reversed(rows)]
+
+    def append(self, session_id: str, turn: Turn) -> None:
+        """写入一轮对话，并删除超出容量的旧轮次"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO turns (session_id, user, assistant, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, turn.user, turn.assistant, turn.created_at)
+            )
+            self._conn.execute(
+                "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, self.max_turns)
+            )
+            self._conn.commit()
+
+    def replace(self, session_id: str, turns: List[Turn]) -> None:
+        """用给定轮次替换整个会话"""
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.executemany(
+                "INSERT INTO turns (session_id, user, assistant, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, t.user, t.assistant, t.created_at) for t in turns[-self.max_turns:]]
+            )
+            self._conn.commit()
+
+    def purge_idle(self, before: float) -> int:
+        """删除最后一轮早于 before（时间戳）的会话
+
+        Returns:
+            删除的轮次数
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM turns WHERE session_id IN "
+                "(SELECT session_id FROM turns GROUP BY session_id HAVING MAX(created_at) < ?)",
+                (before,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class ConversationStore:
+    """有界的多会话对话历史存储"""
+
+    def __init__(self, max_turns: int = 100, max_sessions: int = 1000,
+                 idle_ttl: float = 3600, path: Optional[Union[str, Path]] = None):
+        """初始化会话存储
+
+        Args:
+            max_turns: 每个会话保留的最大轮次
+            max_sessions: 内存中保留的最大会话数，超出时淘汰最久未使用的会话
+            idle_ttl: 会话空闲超过该时间（秒）后移除，0表示不过期
+            path: SQLite数据库路径，为None时仅保存在内存中
+        """
+        self.max_turns = max(1, int(max_turns))
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_ttl = idle_ttl
+        self.stats = ConversationStats()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._provisional: "OrderedDict[str, _Session]" = OrderedDict()
+        self.disk: Optional[SQLiteConversations] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if path:
+            try:
+                self.disk = SQLiteConversations(path, self.max_turns)
+                # SQLite访问放在单线程执行器中，避免阻塞事件循环
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ata-conversations")
+                if idle_ttl > 0:
+                    self.disk.purge_idle(time.time() - idle_ttl)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"无法打开会话数据库{path}，仅使用内存存储: {str(e)}")
+                self.disk = None
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "ConversationStore":
+        """读取 ai.max_history_length 和 ai.conversations 创建会话存储
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            会话存储
+        """
+        settings = config.get("ai.conversations", {}) or {}
+        path = settings.get("path", "~/.ata/conversations.db") if settings.get("persistent", False) else None
+        return cls(
+            max_turns=int(config.get("ai.max_history_length", 100)),
+            max_sessions=int(settings.get("max_sessions", 1000)),
+            idle_ttl=float(settings.get("idle_ttl", 3600)),
+            path=path,
+        )
+
+    async def _run(self, func, *args):
+        """在会话存储专用线程中执行SQLite操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _expire(self) -> None:
+        """移除空闲超时的会话，再按最近使用顺序淘汰超出数量上限的会话"""
+        if self.idle_ttl > 0:
+            deadline = time.monotonic() - self.idle_ttl
+            for sessions in (self._sessions, self._provisional):
+                while sessions:
+                    session_id, session = next(iter(sessions.items()))
+                    if session.last_access > deadline:
+                        break
+                    del sessions[session_id]
+                    self.stats.sessions_expired += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.stats.sessions_evicted += 1
+        while len(self._provisional) > self.max_sessions:
+            self._provisional.popitem(last=False)
+            self.stats.provisional_evicted += 1
+
+    def _touch(self, session_id: str) -> Optional[_Session]:
+        """获取内存中的会话并标记为最近使用"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _put(self, session_id: str, turns: Iterable[Turn] = ()) -> _Session:
+        """在内存中创建会话"""
+        session = _Session(self.max_turns, turns)
+        self._sessions[session_id] = session
+        self.stats.sessions_created += 1
+        self._expire()
+        return session
+
+    def turns(self, session_id: str = DEFAULT_SESSION) -> List[Turn]:
+        """获取内存中会话的对话轮次（不读取持久化存储）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            按时间顺序排列的轮次
+        """
+        self._expire()
+        session = self._touch(session_id) or self._provisional.get(session_id)
+        return list(session.turns) if session is not None else []
+
+    async def load(self, session_id: str = DEFAULT_SESSION) -> List[Turn]:
+        """获取会话的对话轮次，内存中没有时从持久化存储恢复
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            按时间顺序排列的轮次
+        """
+        self._expire()
+        pending = self._provisional.pop(session_id, None)
+        if pending is not None:
+            # 客户端回传了服务端分配的ID，临时会话转为正式会话
+            self._put(session_id, pending.turns)
+            if self.disk is not None:
+                await self._run(self.disk.replace, session_id, list(pending.turns))
+        session = self._touch(session_id)
+        if session is None and self.disk is not None:
+            turns = await self._run(self.disk.load, session_id)
+            # 等待期间其他请求可能已经恢复了该会话
+            session = self._touch(session_id)
+            if session is None and turns:
+                session = self._put(session_id, turns)
+                self.stats.disk_loads += 1
+        return list(session.turns) if session is not None else []
+
+    async def append(self, session_id: str, user: str, assistant: str, provisional: bool = False) -> None:
+        """追加一轮对话，会话已满时覆盖最早的轮次
+
+        Args:
+            session_id: 会话ID
+            user: 用户输入
+            assistant: 生成的命令
+            provisional: 会话ID是服务端在本次请求中分配的，保存为临时会话（不写入持久化存储）
+        """
+        if provisional and self._touch(session_id) is None:
+            session = self._provisional.get(session_id)
+            if session is None:
+                session = self._provisional[session_id] = _Session(self.max_turns)
+                self._expire()
+            session.turns.append(Turn(user, assistant))
+            self.stats.turns_appended += 1
+            return
+        if self._touch(session_id) is None:
+            # 先恢复持久化的历史，避免新轮次之前的历史丢失
+            await self.load(session_id)
+        session = self._touch(session_id) or self._put(session_id)
+        if len(session.turns) == session.turns.maxlen:
+            self.stats.turns_dropped += 1
+        turn = Turn(user, assistant)
+        session.turns.append(turn)
+        self.stats.turns_appended += 1
+        if self.disk is not None:
+            await self._run(self.disk.append, session_id, turn)
+
+    def replace(self, session_id: str, turns: Iterable[Union[Turn, Dict[str, Any]]]) -> None:
+        """用给定轮次替换内存中的会话（只保留最近 max_turns 轮）
+
+        Args:
+            session_id: 会话ID
+            turns: Turn 对象或 {"user", "assistant"} 字典
+        """
+        converted = [turn if isinstance(turn, Turn) else Turn.from_dict(turn) for turn in turns]
+        self._sessions.pop(session_id, None)
+        self._put(session_id, converted)
+
+    async def clear(self, session_id: str = DEFAULT_SESSION) -> None:
+        """删除会话的全部历史"""
+        self._sessions.pop(session_id, None)
+        self._provisional.pop(session_id, None)
+        if self.disk is not None:
+            await self._run(self.disk.replace, session_id, [])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.to_dict()
+        stats["sessions"] = len(self._sessions)
+        stats["provisional_sessions"] = len(self._provisional)
+        stats["turns"] = sum(len(session.turns) for session in self._sessions.values())
+        stats["max_sessions"] = self.max_sessions
+        stats["max_turns"] = self.max_turns
+        stats["persistent"] = self.disk is not None
+        return stats
+
+    def close(self) -> None:
+        """关闭持久化存储"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
@@ -0,0 +1,255 @@
+"""
+危险命令匹配模块
+
+把内置的危险模式、配置中的危险命令（security.dangerous_commands）和
+敏感目录（security.sensitive_directories）预编译为组合正则表达式。
+绝大多数命令是安全的，只需一次扫描即可得出结论；命中后才逐条确定匹配的规则。
+
+忽略大小写的规则不使用 re.IGNORECASE（会使正则引擎无法按首字符快速跳过），
+而是把规则改写为小写、在小写的命令上匹配。
+
+analyze() 先用 shell_parser 解析命令，再在结构上检查：
+- 危险模式和危险命令同时匹配原始文本和去掉引号后的每个管道（r''m -rf / 即 rm -rf /）；
+- 敏感目录只检查路径参数、变量赋值的值和重定向目标，echo "/etc" 之类的输出参数不算；
+- 特权命令检查每个简单命令的命令名，而不只是整行的开头；
+- 重定向规则检查重定向目标和包含敏感目录的多命令管道，而不是查找 > 和 | 字符。
+无法解析（或嵌套过深）的命令退回到 match() 的原始文本检查。
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Pattern, Set, Tuple
+
+from .shell_parser import Script, ShellSyntaxError, parse
+
+logger = logging.getLogger(__name__)
+
+# 特权命令前缀
+_PRIVILEGED_PREFIXES = ("sudo ", "su ")
+
+# 以特权身份运行其他命令的命令
+PRIVILEGED_COMMANDS = frozenset(("sudo", "su", "doas", "pkexec"))
+
+# 参数只是输出文本、不是路径的命令
+TEXT_COMMANDS = frozenset(("echo", "printf"))
+
+# 危险命令字面量的单词边界：前后不能紧跟单词字符、点或连字符
+_WORD_CHAR = re.compile(r"\w")
+_WORD_START = r"(?<![\w.-])"
+_WORD_END = r"(?![\w.-])"
+
+# 正则中的转义序列或大写字母
+_ESCAPE_OR_UPPER = re.compile(r"\\.|[A-Z]")
+
+
+@dataclass(frozen=True)
+class DangerRule:
+    """一条危险规则"""
+    id: str  # 规则ID，例如 pattern.0、command.2、sensitive_dir.1、privileged
+    regex: str  # 正则表达式
+    warning: str  # 命中时的警告信息
+    ignore_case: bool = False  # 是否忽略大小写（regex 已改写为小写，在小写的命令上匹配）
+
+
+@dataclass(frozen=True)
+class DangerVerdict:
+    """命令的安全检查结论"""
+    rule_ids: Tuple[str, ...] = ()  # 命中的规则ID，按规则顺序排列
+    warnings: Tuple[str, ...] = ()  # 对应的警告信息
+
+    @property
+    def dangerous(self) -> bool:
+        """是否危险"""
+        return bool(self.rule_ids)
+
+
+SAFE = DangerVerdict()
+
+
+@dataclass(frozen=True)
+class CommandAnalysis:
+    """命令的解析结果和安全检查结论"""
+    script: Optional[Script]  # 解析结果，无法解析时为None
+    verdict: DangerVerdict
+
+
+def _literal_regex(command: str) -> str:
+    """把字面命令转换为正则表达式，连续空白匹配任意空白
+
+    以单词字符开头或结尾的命令必须位于单词边界上：dd 不匹配 git add .，su 不匹配 result.txt。
+    """
+    parts = command.split()
+    regex = r"\s+".join(re.escape(part) for part in parts)
+    if _WORD_CHAR.match(parts[0]):
+        regex = _WORD_START + regex
+    if _WORD_CHAR.match(parts[-1][-1]):
+        regex += _WORD_END
+    return regex
+
+
+def _fold_pattern(pattern: str) -> str:
+    """把正则中的大写字母改写为小写，转义序列（如 \\S、\\A）保持不变"""
+    return _ESCAPE_OR_UPPER.sub(lambda m: m.group() if m.group()[0] == "\\" else m.group().lower(), pattern)
+
+
+class DangerMatcher:
+    """预编译的危险命令匹配器
+
+    示例:
+        matcher = DangerMatcher(CommandExecutor.DANGEROUS_PATTERNS, ["mkfs.ext4 /dev/sda"], ["/etc"])
+        verdict = matcher.match("cat /etc/passwd > /tmp/x")
+        verdict.rule_ids  # ("sensitive_dir.0", "sensitive_redirect.0")
+    """
+
+    def __init__(self, patterns: Iterable[str], dangerous_commands: Optional[Iterable[str]] = None,
+                 sensitive_dirs: Optional[Iterable[str]] = None):
+        """构建匹配器
+
+        Args:
+            patterns: 危险模式正则表达式，忽略大小写
+            dangerous_commands: 危险命令字面量，忽略大小写，空白数量不限，按单词边界匹配
+            sensitive_dirs: 敏感目录，区分大小写的子串匹配
+        """
+        self.rules: List[DangerRule] = []
+        for i, pattern in enumerate(patterns):
+            self.rules.append(DangerRule(
+                f"pattern.{i}", _fold_pattern(pattern), f"命令匹配危险模式: {pattern}", ignore_case=True
+            ))
+        for i, command in enumerate(dangerous_commands or []):
+            if command and command.strip():
+                self.rules.append(DangerRule(
+                    f"command.{i}", _literal_regex(command.lower()), f"命令匹配危险命令: {command}", ignore_case=True
+                ))
+        self.sensitive_dirs = [d for d in (sensitive_dirs or []) if d]
+        for i, dir_path in enumerate(self.sensitive_dirs):
+            self.rules.append(DangerRule(f"sensitive_dir.{i}", re.escape(dir_path), f"命令涉及敏感目录: {dir_path}"))
+        self.rules.append(DangerRule("privileged", r"\A(?:sudo|su) ", "命令需要特权访问"))
+
+        self._compiled: List[Pattern[str]] = []
+        folded: List[str] = []
+        exact: List[str] = []
+        for rule in self.rules:
+            try:
+                self._compiled.append(re.compile(rule.regex))
+            except re.error as e:
+                logger.warning(f"忽略无效的危险规则 {rule.id}: {str(e)}")
+                self._compiled.append(re.compile(r"(?!)"))
+                continue
+            if rule.ignore_case:
+                folded.append(rule.regex)
+            elif rule.id != "privileged":
+                exact.append(rule.regex)
+        # 特权命令用 startswith 检查：锚定的分支会使组合正则失去首字符优化
+        self._folded = re.compile("|".join(folded) if folded else r"(?!)")
+        self._exact = re.compile("|".join(exact) if exact else r"(?!)")
+        self._folded_rules = [
+            (rule.id, regex) for rule, regex in zip(self.rules, self._compiled) if rule.ignore_case
+        ]
+        # 路径参数以敏感目录开头（或包含该路径组成部分）
+        self._dir_paths = [
+            re.compile(re.escape(dir_path.rstrip("/\\") or dir_path) + r"(?=[/\\]|$)")
+            for dir_path in self.sensitive_dirs
+        ]
+        self._any_dir_path = re.compile("|".join(r.pattern for r in self._dir_paths) or r"(?!)")
+
+    def match(self, command: str) -> DangerVerdict:
+        """检查命令
+
+        Args:
+            command: 要检查的命令
+
+        Returns:
+            安全检查结论，安全的命令返回 SAFE
+        """
+        lowered = command.lower()
+        if (self._folded.search(lowered) is None and self._exact.search(command) is None
+                and not command.startswith(_PRIVILEGED_PREFIXES)):
+            return SAFE
+        rule_ids: List[str] = []
+        warnings: List[str] = []
+        for rule, regex in zip(self.rules, self._compiled):
+            if regex.search(lowered if rule.ignore_case else command):
+                rule_ids.append(rule.id)
+                warnings.append(rule.warning)
+        # 涉及敏感目录的命令同时包含重定向或管道
+        if ">" in command or "|" in command:
+            for i, dir_path in enumerate(self.sensitive_dirs):
+                if f"sensitive_dir.{i}" in rule_ids:
+                    rule_ids.append(f"sensitive_redirect.{i}")
+                    warnings.append(f"命令包含对敏感目录的重定向或管道操作: {dir_path}")
+        return DangerVerdict(tuple(rule_ids), tuple(warnings))
+
+    def analyze(self, command: str) -> CommandAnalysis:
+        """解析命令并在结构上检查
+
+        Args:
+            command: 要检查的命令
+
+        Returns:
+            解析结果和安全检查结论
+        """
+        try:
+            script = parse(command)
+            verdict = self.check_script(script, command)
+        except (ShellSyntaxError, RecursionError):
+            # 嵌套过深的子shell或命令替换超出递归深度，同样按无法解析处理
+            return CommandAnalysis(None, self.match(command))
+        return CommandAnalysis(script, verdict)
+
+    def check_script(self, script: Script, command: str) -> DangerVerdict:
+        """按解析结果检查命令
+
+        Args:
+            script: 命令的解析结果
+            command: 原始命令文本
+
+        Returns:
+            安全检查结论
+        """
+        hits: Set[str] = set()
+
+        # 危险模式和危险命令
+        pipelines = list(script.walk())
+        texts = [command.lower()]
+        texts.extend(pipeline.text().lower() for pipeline in pipelines)
+        if any(self._folded.search(text) for text in texts):
+            for rule_id, regex in self._folded_rules:
+                if any(regex.search(text) for text in texts):
+                    hits.add(rule_id)
+
+        for pipeline in pipelines:
+            touched: Set[int] = set()
+            for cmd in pipeline.commands:
+                if cmd.name in PRIVILEGED_COMMANDS:
+                    hits.add("privileged")
+                targets = [redirect.target.value for redirect in cmd.redirects]
+                # 变量赋值的值也是路径（VAR=/etc; cat $VAR/passwd），export VAR=/etc 的参数已包含在 argv 中
+                paths = [word.value.partition("=")[2] for word in cmd.assignments] + targets
+                if cmd.name not in TEXT_COMMANDS:
+                    paths += cmd.argv[1:]
+                if not any(self._any_dir_path.search(path) for path in paths):
+                    continue
+                for i, regex in enumerate(self._dir_paths):
+                    if any(regex.search(path) for path in paths):
+                        touched.add(i)
+                        if any(regex.search(target) for target in targets):
+                            hits.add(f"sensitive_redirect.{i}")
+            for i in touched:
+                hits.add(f"sensitive_dir.{i}")
+                if len(pipeline.commands) > 1:
+                    hits.add(f"sensitive_redirect.{i}")
+
+        if not hits:
+            return SAFE
+        rule_ids: List[str] = []
+        warnings: List[str] = []
+        for rule in self.rules:
+            if rule.id in hits:
+                rule_ids.append(rule.id)
+                warnings.append(rule.warning)
+        for i, dir_path in enumerate(self.sensitive_dirs):
+            if f"sensitive_redirect.{i}" in hits:
+                rule_ids.append(f"sensitive_redirect.{i}")
+                warnings.append(f"命令包含对敏感目录的重定向或管道操作: {dir_path}")
+        return DangerVerdict(tuple(rule_ids), tuple(warnings))
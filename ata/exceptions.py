@@ -2,6 +2,9 @@
 异常类模块
 """
 
+from typing import Optional
+
+
 class ATAError(Exception):
     """AI终端助手基础异常类"""
     pass
@@ -14,6 +17,22 @@ class AIError(ATAError):
 
 class APIError(AIError):
     """API调用错误"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """初始化异常
+        
+        Args:
+            message: 错误信息
+            status: HTTP状态码，网络错误时为None
+            retry_after: 服务端建议的重试等待时间（秒）
+        """
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(APIError):
+    """熔断器打开，请求被快速拒绝"""
     pass
 
 
@@ -0,0 +1,260 @@
+"""
+提供商故障转移模块
+
+按顺序尝试提供商链：主提供商的响应在滚动延迟分位数内仍未开始时，
+向下一个提供商发出对冲请求，先返回有效结果者胜出，其余请求被取消；
+提供商出错时立即转移到下一个提供商。
+
+提供商收到响应头时调用 mark_response_started()，滚动延迟记录的是响应开始的时间，
+不包括生成和读取响应体的时间。
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar, TYPE_CHECKING
+
+from .exceptions import AIError
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _ResponseStart:
+    """一次调用的响应开始时间"""
+
+    def __init__(self):
+        self.at: Optional[float] = None
+
+
+_response_start: contextvars.ContextVar = contextvars.ContextVar("ata_response_start", default=None)
+
+
+def mark_response_started() -> None:
+    """记录当前调用的响应已经开始（收到响应头），不在 hedged_call 中时不做任何事"""
+    start = _response_start.get()
+    if start is not None and start.at is None:
+        start.at = time.monotonic()
+
+
+class ProviderHealth:
+    """单个提供商的滚动延迟和错误率"""
+
+    def __init__(self, name: str, window: int = 100):
+        """初始化统计
+
+        Args:
+            name: 提供商名称
+            window: 滚动窗口大小（请求数）
+        """
+        self.name = name
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.served = 0  # 胜出并返回结果的次数
+        self.failures = 0  # 失败次数
+        self.cancelled = 0  # 对冲落败被取消的次数
+
+    def record_success(self, latency: float) -> None:
+        """记录一次成功及其延迟（到响应开始的时间）"""
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """记录一次失败"""
+        self.outcomes.append(False)
+        self.failures += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """滚动窗口内的延迟分位数，没有样本时返回None"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        """滚动窗口内的错误率"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "samples": len(self.latencies),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "error_rate": self.error_rate,
+            "served": self.served,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+        }
+
+
+@dataclass
+class HedgePolicy:
+    """对冲请求策略
+
+    对冲延迟取主提供商响应开始延迟的 quantile 分位数，并限制在
+    [min_delay, max_delay] 之间；样本不足 min_samples 时使用 initial_delay。
+    错误率超过 max_error_rate 的提供商会被排到链尾。
+    """
+    enabled: bool = True  # 是否启用对冲请求（关闭时仅在出错时故障转移）
+    quantile: float = 0.95  # 触发对冲的延迟分位数
+    min_delay: float = 0.5  # 对冲延迟下限（秒）
+    max_delay: float = 10.0  # 对冲延迟上限（秒）
+    initial_delay: float = 3.0  # 样本不足时的对冲延迟（秒）
+    min_samples: int = 5  # 使用分位数所需的最少样本数
+    window: int = 100  # 滚动窗口大小（请求数）
+    max_error_rate: float = 0.5  # 超过该错误率的提供商降级到链尾
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "HedgePolicy":
+        """从配置管理器读取对冲策略
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            对冲策略
+        """
+        hedge_config = config.get("ai.hedging", {}) or {}
+        defaults = cls()
+        return cls(
+            enabled=bool(hedge_config.get("enabled", defaults.enabled)),
+            quantile=float(hedge_config.get("quantile", defaults.quantile)),
+            min_delay=float(hedge_config.get("min_delay", defaults.min_delay)),
+            max_delay=float(hedge_config.get("max_delay", defaults.max_delay)),
+            initial_delay=float(hedge_config.get("initial_delay", defaults.initial_delay)),
+            min_samples=int(hedge_config.get("min_samples", defaults.min_samples)),
+            window=int(hedge_config.get("window", defaults.window)),
+            max_error_rate=float(hedge_config.get("max_error_rate", defaults.max_error_rate)),
+        )
+
+    def hedge_delay(self, health: ProviderHealth) -> float:
+        """计算向下一个提供商发出对冲请求前的等待时间"""
+        if len(health.latencies) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, health.quantile(self.quantile)))
+
+    def order(self, healths: Sequence[ProviderHealth]) -> List[int]:
+        """按错误率调整提供商顺序，返回下标列表（保持原有相对顺序）"""
+        healthy, degraded = [], []
+        for index, health in enumerate(healths):
+            unhealthy = (len(health.outcomes) >= self.min_samples
+                         and health.error_rate > self.max_error_rate)
+            (degraded if unhealthy else healthy).append(index)
+        return healthy + degraded
+
+
+@dataclass
+class FailoverStats:
+    """故障转移统计信息"""
+    requests: int = 0  # 请求数
+    hedged: int = 0  # 发出的对冲请求数
+    hedge_wins: int = 0  # 对冲请求胜出的次数
+    failovers: int = 0  # 因出错转移到下一个提供商的次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+def _discard(task: "asyncio.Task[Any]") -> None:
+    """获取被取消任务的异常，避免"异常未被获取"的警告"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def hedged_call(chain: Sequence[Tuple[ProviderHealth, Callable[[], Awaitable[T]]]],
+                      policy: HedgePolicy,
+                      stats: Optional[FailoverStats] = None) -> Tuple[str, T]:
+    """在提供商链上执行带对冲和故障转移的调用
+
+    Args:
+        chain: (提供商统计, 调用工厂) 列表，按优先级排序
+        policy: 对冲策略
+        stats: 故障转移统计
+
+    Returns:
+        (胜出的提供商名称, 结果)
+
+    Raises:
+        AIError: 所有提供商均失败时抛出最后一个错误
+    """
+    stats = stats or FailoverStats()
+    stats.requests += 1
+    order = policy.order([health for health, _ in chain])
+    pending: Dict["asyncio.Task[T]", Tuple[ProviderHealth, float, bool, _ResponseStart]] = {}
+    next_index = 0
+    last_error: Optional[BaseException] = None
+
+    def launch(hedge: bool) -> Tuple[ProviderHealth, float, _ResponseStart]:
+        nonlocal next_index
+        health, factory = chain[order[next_index]]
+        next_index += 1
+        start = _ResponseStart()
+
+        async def call() -> T:
+            # 任务有独立的上下文，提供商在其中调用 mark_response_started()
+            _response_start.set(start)
+            return await factory()
+
+        launched = time.monotonic()
+        task = asyncio.ensure_future(call())
+        pending[task] = (health, launched, hedge, start)
+        if hedge:
+            stats.hedged += 1
+            logger.info(f"发出对冲请求: {health.name}")
+        return health, launched, start
+
+    latest, launched, start = launch(hedge=False)
+    try:
+        while pending:
+            timeout = None
+            if policy.enabled and next_index < len(order) and start.at is None:
+                timeout = max(0.0, launched + policy.hedge_delay(latest) - time.monotonic())
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # 响应已经开始时只等待它完成，不再对冲
+                if start.at is None:
+                    latest, launched, start = launch(hedge=True)
+                continue
+
+            failed = False
+            for task in done:
+                health, started, hedge, response_start = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    health.record_success((response_start.at or time.monotonic()) - started)
+                    health.served += 1
+                    if hedge:
+                        stats.hedge_wins += 1
+                    return health.name, task.result()
+
+                health.record_failure()
+                if not isinstance(error, AIError):
+                    raise error
+                logger.warning(f"{health.name}调用失败: {str(error)}")
+                last_error = error
+                failed = True
+
+            if failed and next_index < len(order):
+                stats.failovers += 1
+                latest, launched, start = launch(hedge=False)
+    finally:
+        for task, (health, _, _, _) in pending.items():
+            task.cancel()
+            task.add_done_callback(_discard)
+            health.cancelled += 1
+
+    raise last_error
@@ -0,0 +1,427 @@
+"""
+本地快速通道模块
+
+在调用大模型之前，用预编译的意图规则直接翻译常见请求
+（"当前目录"、"查看磁盘使用情况"、"list files by size" 等）。
+规则先通过关键词字典树筛选候选，再用完整匹配的正则表达式确认并提取参数；
+只有完全匹配时才返回本地结果，否则交给大模型处理。
+"""
+
+import re
+import sys
+import shlex
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from .response_cache import normalize_input
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 本地结果使用的提供商名称
+LOCAL_PROVIDER = "local"
+
+# 参数只接受路径/文件名形式的ASCII文本，"查看最近修改的文件"之类的描述交给大模型
+_PATH = r"(?P<path>[A-Za-z0-9_~./-]+)"
+_NAME = r"[A-Za-z0-9_.*?-]+"
+
+# 内置规则：patterns 需完整匹配规范化后的输入（合并空白、去掉结尾标点，不区分大小写），
+# 命名分组按原样作为参数填入命令模板；commands 的 posix 同时适用于 linux 和 darwin
+BUILTIN_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "current_directory",
+        "keywords": ["directory", "where am i", "pwd", "目录", "路径", "哪个目录"],
+        "patterns": [
+            r"(?:show |print )?(?:the )?(?:current|working|present) (?:working )?directory",
+            r"print working directory|pwd|where am i",
+            r"(?:显示|查看)?当前(?:所在的?)?(?:工作)?(?:目录|路径)(?:是什么)?",
+            r"我在哪个目录",
+        ],
+        "commands": {"posix": "pwd", "windows": "cd"},
+        "explanation": "显示当前工作目录",
+    },
+    {
+        "name": "list_files_by_size",
+        "keywords": ["by size", "大小"],
+        "patterns": [
+            r"(?:list|show|sort) (?:all )?files (?:sorted )?by size(?: in " + _PATH + ")?",
+            r"(?:按|根据)(?:文件)?大小(?:排序|列出|显示)(?:" + _PATH + r" ?(?:目录)?(?:下|中)?的?)?(?:所有)?文件",
+            r"(?:列出|显示)(?:" + _PATH + r" ?(?:目录)?(?:下|中)?的?)?(?:所有)?文件并?按大小排序",
+        ],
+        "commands": {"posix": "ls -lhS {path}", "windows": "dir /O-S {path}"},
+        "defaults": {"path": "."},
+        "explanation": "按文件大小从大到小列出文件",
+    },
+    {
+        "name": "list_files",
+        "keywords": ["list", "show files", "ls", "列出", "文件"],
+        "patterns": [
+            r"(?:list|show) (?:all )?(?:the )?files(?: in " + _PATH + ")?",
+            r"ls(?: " + _PATH + ")?",
+            r"(?:列出|显示|查看)(?:当前目录|" + _PATH + r" ?(?:目录)?)?(?:下|中)?的?(?:所有)?文件",
+        ],
+        "commands": {"posix": "ls -la {path}", "windows": "dir {path}"},
+        "defaults": {"path": "."},
+        "explanation": "列出目录中的文件（包括隐藏文件）",
+    },
+    {
+        "name": "disk_usage",
+        "keywords": ["disk", "磁盘", "硬盘"],
+        "patterns": [
+            r"(?:show |check |display )?(?:the )?(?:free )?disk (?:usage|space)",
+            r"how much disk space (?:is )?(?:left|free|available)",
+            r"(?:查看|显示|检查)?(?:磁盘|硬盘)(?:的)?(?:使用情况|使用率|空间|剩余空间)",
+        ],
+        "commands": {"posix": "df -h", "windows": "wmic logicaldisk get caption,size,freespace"},
+        "explanation": "查看各文件系统的磁盘使用情况",
+    },
+    {
+        "name": "directory_size",
+        "keywords": ["size of", "大小"],
+        "patterns": [
+            r"(?:show |check )?(?:the )?size of " + _PATH,
+            r"(?:查看|显示)?" + _PATH + r" ?(?:目录|文件夹)?的?大小",
+        ],
+        "commands": {"posix": "du -sh {path}", "windows": "dir /s {path}"},
+        "explanation": "统计目录占用的磁盘空间",
+    },
+    {
+        "name": "memory_usage",
+        "keywords": ["memory", "ram", "内存"],
+        "patterns": [
+            r"(?:show |check |display )?(?:the )?(?:free )?(?:memory|ram)(?: usage)?",
+            r"(?:查看|显示|检查)?内存(?:的)?(?:使用情况|使用率|占用)?",
+        ],
+        "commands": {
+            "linux": "free -h",
+            "darwin": "vm_stat",
+            "windows": "systeminfo | findstr /C:\"Memory\"",
+        },
+        "explanation": "查看内存使用情况",
+    },
+    {
+        "name": "list_processes",
+        "keywords": ["process", "进程"],
+        "patterns": [
+            r"(?:list|show|display) (?:all )?(?:running )?processes",
+            r"(?:列出|查看|显示)(?:所有)?(?:正在运行的)?进程",
+        ],
+        "commands": {"posix": "ps aux", "windows": "tasklist"},
+        "explanation": "列出正在运行的进程",
+    },
+    {
+        "name": "ip_address",
+        "keywords": ["ip", "ip地址"],
+        "patterns": [
+            r"(?:show |what is |what's )?(?:my )?ip(?: address)?",
+            r"(?:查看|显示)?(?:本机)?(?:的)?ip(?:地址)?",
+        ],
+        "commands": {"linux": "ip addr", "darwin": "ifconfig", "windows": "ipconfig"},
+        "explanation": "查看网络接口的IP地址",
+    },
+    {
+        "name": "current_user",
+        "keywords": ["who am i", "whoami", "current user", "当前用户", "我是谁"],
+        "patterns": [
+            r"who am i|whoami|(?:show )?(?:the )?current user",
+            r"(?:查看|显示)?当前用户(?:是谁)?|我是谁",
+        ],
+        "commands": {"posix": "whoami", "windows": "whoami"},
+        "explanation": "显示当前登录的用户名",
+    },
+    {
+        "name": "current_time",
+        "keywords": ["time", "date", "时间", "日期", "几点"],
+        "patterns": [
+            r"(?:show |what is |what's )?(?:the )?(?:current )?(?:date|time|date and time)|what time is it",
+            r"(?:查看|显示)?(?:当前|现在的?)(?:时间|日期)|现在几点了?",
+        ],
+        "commands": {"posix": "date", "windows": "echo %date% %time%"},
+        "explanation": "显示当前日期和时间",
+    },
+    {
+        "name": "find_file",
+        "keywords": ["find", "查找", "搜索"],
+        "patterns": [
+            r"find (?:the )?files? (?:named |called )?(?P<name>" + _NAME + ")",
+            r"(?:查找|搜索)(?:名为)?(?P<name>" + _NAME + r") ?的?文件|(?:查找|搜索)文件 ?(?P<name2>" + _NAME + ")",
+        ],
+        "commands": {"posix": "find . -name {name}", "windows": "dir /s /b {name}"},
+        "explanation": "在当前目录下递归查找文件",
+    },
+]
+
+
+def current_os_key() -> str:
+    """获取当前操作系统在命令模板中对应的键"""
+    if sys.platform.startswith("win"):
+        return "windows"
+    if sys.platform.startswith("darwin"):
+        return "darwin"
+    return "linux"
+
+
+def quote_argument(value: str, os_key: str) -> str:
+    """按目标平台的shell规则转义参数
+
+    POSIX下保留开头的 ~ 以便shell展开家目录。
+    """
+    if os_key == "windows":
+        return f'"{value}"' if re.search(r'[\s&|<>^"]', value) else value
+    if value == "~":
+        return value
+    if value.startswith("~/"):
+        return "~/" + shlex.quote(value[2:])
+    return shlex.quote(value)
+
+
+class KeywordTrie:
+    """关键词字典树，在一次扫描中找出输入里出现的全部关键词
+
+    逐字符建树，中文等不以空格分词的文本同样适用。
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+
+    def add(self, keyword: str, value: int) -> None:
+        """添加关键词，value 为关联的规则下标"""
+        node = self._root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, set()).add(value)
+
+    def search(self, text: str) -> set:
+        """返回文本中出现的所有关键词关联的值"""
+        found: set = set()
+        root = self._root
+        for start in range(len(text)):
+            node = root
+            for ch in text[start:]:
+                node = node.get(ch)
+                if node is None:
+                    break
+                values = node.get(None)
+                if values:
+                    found |= values
+        return found
+
+
+@dataclass
+class Rule:
+    """一条预编译的意图规则"""
+    name: str
+    keywords: List[str]
+    patterns: List["re.Pattern[str]"]
+    commands: Dict[str, str]
+    explanation: str = ""
+    warnings: List[str] = field(default_factory=list)
+    defaults: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        """从配置字典创建规则
+
+        Raises:
+            ValueError: 缺少必填字段或正则表达式无效
+        """
+        name = data.get("name")
+        patterns = data.get("patterns") or []
+        commands = data.get("commands") or {}
+        if not name or not patterns or not commands:
+            raise ValueError("规则需要 name、patterns 和 commands")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        try:
+            compiled = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        except re.error as e:
+            raise ValueError(f"正则表达式无效: {e}")
+        return cls(
+            name=name,
+            keywords=[normalize_input(k) for k in data.get("keywords") or []],
+            patterns=compiled,
+            commands=dict(commands),
+            explanation=data.get("explanation", ""),
+            warnings=list(data.get("warnings") or []),
+            defaults=dict(data.get("defaults") or {}),
+        )
+
+    def command_template(self, os_key: str) -> Optional[str]:
+        """获取指定平台的命令模板"""
+        template = self.commands.get(os_key)
+        if template is None and os_key != "windows":
+            template = self.commands.get("posix")
+        return template
+
+    def match(self, text: str) -> Optional[Dict[str, str]]:
+        """完整匹配规范化后（保留大小写）的输入，返回提取到的参数"""
+        for pattern in self.patterns:
+            m = pattern.fullmatch(text)
+            if m is None:
+                continue
+            params = dict(self.defaults)
+            for key, value in m.groupdict().items():
+                if value:
+                    # name2 这类带数字后缀的分组是同一参数的备选写法
+                    params[key.rstrip("0123456789")] = value
+            return params
+        return None
+
+
+@dataclass
+class FastPathStats:
+    """本地快速通道统计信息"""
+    lookups: int = 0  # 查询次数
+    hits: int = 0  # 本地直接返回的次数
+    misses: int = 0  # 交给大模型的次数
+    candidates: int = 0  # 关键词筛选出的候选规则总数
+    by_rule: Dict[str, int] = field(default_factory=dict)  # 各规则命中次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "avg_candidates": self.candidates / self.lookups if self.lookups else 0.0,
+            "by_rule": dict(self.by_rule),
+        }
+
+
+class FastPath:
+    """本地规则引擎
+
+    规则按顺序匹配，先出现的规则优先；用户规则排在内置规则之前，
+    与内置规则同名时替换内置规则。
+    """
+
+    def __init__(self, rules: Optional[Iterable[Dict[str, Any]]] = None,
+                 include_builtin: bool = True,
+                 os_key: Optional[str] = None):
+        """初始化规则引擎
+
+        Args:
+            rules: 用户规则（配置字典）
+            include_builtin: 是否包含内置规则
+            os_key: 目标平台（linux/darwin/windows），默认为当前平台
+        """
+        self.os_key = os_key or current_os_key()
+        self.rules: List[Rule] = []
+        user_rules = [self._compile(data) for data in rules or []]
+        user_rules = [rule for rule in user_rules if rule is not None]
+        overridden = {rule.name for rule in user_rules}
+        self.rules.extend(user_rules)
+        if include_builtin:
+            self.rules.extend(
+                Rule.from_dict(data) for data in BUILTIN_RULES if data["name"] not in overridden
+            )
+        self._trie = KeywordTrie()
+        self._unindexed: List[int] = []
+        for index, rule in enumerate(self.rules):
+            if not rule.keywords:
+                # 没有关键词的规则每次都要尝试
+                self._unindexed.append(index)
+            for keyword in rule.keywords:
+                self._trie.add(keyword, index)
+        self.stats = FastPathStats()
+
+    @staticmethod
+    def _compile(data: Dict[str, Any]) -> Optional[Rule]:
+        """编译用户规则，无效规则记录警告后忽略"""
+        try:
+            return Rule.from_dict(data)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"忽略无效的快速通道规则 {data!r}: {str(e)}")
+            return None
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> Optional["FastPath"]:
+        """读取 ai.fast_path 创建规则引擎
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            规则引擎，配置禁用时返回None
+        """
+        settings = config.get("ai.fast_path", {}) or {}
+        if not settings.get("enabled", True):
+            return None
+        return cls(
+            rules=settings.get("rules") or [],
+            include_builtin=bool(settings.get("builtin_rules", True)),
+        )
+
+    def candidates(self, text: str) -> List[Rule]:
+        """按规则顺序返回关键词命中的候选规则"""
+        indexes = self._trie.search(text)
+        indexes.update(self._unindexed)
+        return [self.rules[index] for index in sorted(indexes)]
+
+    def match(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """尝试在本地翻译请求
+
+        Args:
+            user_input: 用户输入
+
+        Returns:
+            与大模型结果格式相同的字典（provider 为 "local"，rule 为命中的规则名），
+            没有把握时返回None
+        """
+        self.stats.lookups += 1
+        result, candidates = self._translate(user_input)
+        self.stats.candidates += candidates
+        if result is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.by_rule[result["rule"]] = self.stats.by_rule.get(result["rule"], 0) + 1
+        logger.debug(f"快速通道命中规则{result['rule']}: {result['command']}")
+        return result
+
+    def answers(self, user_input: str) -> bool:
+        """判断请求能否在本地翻译，不计入统计（供预取等后台任务使用）"""
+        return self._translate(user_input)[0] is not None
+
+    def _translate(self, user_input: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """按候选规则翻译请求
+
+        Returns:
+            (翻译结果，没有把握时为None, 候选规则数)
+        """
+        text = normalize_input(user_input, lower=False)
+        candidates = self.candidates(text.lower())
+        for rule in candidates:
+            template = rule.command_template(self.os_key)
+            if template is None:
+                continue
+            params = rule.match(text)
+            if params is None:
+                continue
+            try:
+                command = template.format(**{
+                    key: quote_argument(value, self.os_key) for key, value in params.items()
+                })
+            except (KeyError, IndexError, ValueError) as e:
+                logger.warning(f"快速通道规则{rule.name}的命令模板无法填充: {str(e)}")
+                continue
+            return {
+                "command": command,
+                "explanation": rule.explanation,
+                "warnings": list(rule.warnings),
+                "provider": LOCAL_PROVIDER,
+                "rule": rule.name,
+            }, len(candidates)
+        return None, len(candidates)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.to_dict()
+        stats["rules"] = len(self.rules)
+        return stats
@@ -0,0 +1,248 @@
+"""
+HTTP连接池模块
+
+为所有AI提供商提供进程级共享的keep-alive连接池，
+支持连接数限制、空闲连接回收以及连接复用统计。
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+import aiohttp
+from aiohttp import ClientTimeout, TCPConnector, TraceConfig
+
+from .timing import current_timing
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 默认超时时间（秒）
+DEFAULT_TIMEOUT = 30
+
+
+@dataclass
+class PoolConfig:
+    """连接池配置"""
+    limit: int = 100  # 总连接数上限
+    limit_per_host: int = 10  # 单个主机的连接数上限
+    keepalive_timeout: float = 30.0  # 空闲连接保活时间（秒），超时后被回收
+    ttl_dns_cache: int = 300  # DNS缓存时间（秒）
+    timeout: float = DEFAULT_TIMEOUT  # 单次请求总超时（秒）
+    verify_ssl: bool = False  # 是否校验SSL证书
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "PoolConfig":
+        """从配置管理器读取连接池配置
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            连接池配置
+        """
+        pool_config = config.get("ai.http_pool", {}) or {}
+        defaults = cls()
+        return cls(
+            limit=int(pool_config.get("limit", defaults.limit)),
+            limit_per_host=int(pool_config.get("limit_per_host", defaults.limit_per_host)),
+            keepalive_timeout=float(pool_config.get("keepalive_timeout", defaults.keepalive_timeout)),
+            ttl_dns_cache=int(pool_config.get("ttl_dns_cache", defaults.ttl_dns_cache)),
+            timeout=float(pool_config.get("timeout", defaults.timeout)),
+            verify_ssl=bool(pool_config.get("verify_ssl", defaults.verify_ssl)),
+        )
+
+
+@dataclass
+class PoolStats:
+    """连接池统计信息"""
+    requests: int = 0  # 发出的请求数
+    connections_created: int = 0  # 新建连接数
+    connections_reused: int = 0  # 复用连接数
+    queued: int = 0  # 等待空闲连接的次数
+    total_wait_time: float = 0.0  # 等待空闲连接的总时间（秒）
+    max_wait_time: float = 0.0  # 单次等待空闲连接的最长时间（秒）
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        acquired = self.connections_created + self.connections_reused
+        data["reuse_ratio"] = self.connections_reused / acquired if acquired else 0.0
+        data["avg_wait_time"] = self.total_wait_time / self.queued if self.queued else 0.0
+        return data
+
+
+class HTTPConnectionPool:
+    """基于aiohttp的共享HTTP连接池
+
+    会话在首次使用时按事件循环懒加载创建，
+    由持有者通过 acquire/release 进行引用计数管理。
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        """初始化连接池
+
+        Args:
+            config: 连接池配置，未指定时使用默认配置
+        """
+        self.config = config or PoolConfig()
+        self.stats = PoolStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._users = 0
+
+    def _create_trace_config(self) -> TraceConfig:
+        """创建用于统计连接复用、等待时间以及单次请求DNS和连接耗时的追踪配置"""
+        trace_config = TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.stats.requests += 1
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_started = time.monotonic()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.stats.connections_created += 1
+            timing = current_timing()
+            if timing is not None:
+                timing.connect += time.monotonic() - getattr(ctx, "connect_started", time.monotonic())
+
+        async def on_dns_resolvehost_start(session, ctx, params):
+            ctx.dns_started = time.monotonic()
+
+        async def on_dns_resolvehost_end(session, ctx, params):
+            timing = current_timing()
+            if timing is not None:
+                timing.dns += time.monotonic() - getattr(ctx, "dns_started", time.monotonic())
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.stats.connections_reused += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(session, ctx, params):
+            wait_time = time.monotonic() - getattr(ctx, "queued_at", time.monotonic())
+            self.stats.queued += 1
+            self.stats.total_wait_time += wait_time
+            self.stats.max_wait_time = max(self.stats.max_wait_time, wait_time)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """创建新的aiohttp会话"""
+        connector = TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            keepalive_timeout=self.config.keepalive_timeout,
+            ttl_dns_cache=self.config.ttl_dns_cache,
+            ssl=None if self.config.verify_ssl else False,
+        )
+        logger.debug(
+            "创建HTTP连接池: limit=%s, limit_per_host=%s, keepalive=%ss",
+            self.config.limit, self.config.limit_per_host, self.config.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            timeout=ClientTimeout(total=self.config.timeout),
+            connector=connector,
+            trace_configs=[self._create_trace_config()],
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环下的共享会话
+
+        Returns:
+            aiohttp会话
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is not loop:
+            # 会话绑定在其他（通常已结束的）事件循环上，无法继续使用
+            logger.debug("事件循环已变化，重新创建HTTP会话")
+            self._session = None
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    def acquire(self) -> "HTTPConnectionPool":
+        """登记一个连接池使用者
+
+        Returns:
+            连接池自身
+        """
+        self._users += 1
+        return self
+
+    async def release(self) -> None:
+        """注销一个连接池使用者，最后一个使用者注销时关闭会话"""
+        self._users = max(0, self._users - 1)
+        if self._users == 0:
+            await self.close()
+
+    async def close(self) -> None:
+        """关闭会话及其全部连接"""
+        if self._session is not None and not self._session.closed:
+            if self._loop is None or self._loop is asyncio.get_running_loop():
+                await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息
+
+        Returns:
+            统计信息字典
+        """
+        stats = self.stats.to_dict()
+        stats["limit"] = self.config.limit
+        stats["limit_per_host"] = self.config.limit_per_host
+        stats["keepalive_timeout"] = self.config.keepalive_timeout
+        stats["users"] = self._users
+        stats["open"] = self._session is not None and not self._session.closed
+        return stats
+
+
+_shared_pool: Optional[HTTPConnectionPool] = None
+
+
+def get_shared_pool(config: Optional[PoolConfig] = None) -> HTTPConnectionPool:
+    """获取进程级共享连接池
+
+    首次调用时使用传入的配置创建连接池；之后的调用返回同一实例，
+    若会话尚未创建则以新配置为准。
+
+    Args:
+        config: 连接池配置
+
+    Returns:
+        共享连接池
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = HTTPConnectionPool(config)
+    elif config is not None and config != _shared_pool.config:
+        if _shared_pool._session is None:
+            _shared_pool.config = config
+        else:
+            logger.debug("共享连接池已在使用中，忽略新的连接池配置")
+    return _shared_pool
+
+
+async def close_shared_pool() -> None:
+    """关闭并丢弃进程级共享连接池"""
+    global _shared_pool
+    if _shared_pool is not None:
+        await _shared_pool.close()
+        _shared_pool = None
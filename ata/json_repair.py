@@ -0,0 +1,222 @@
+"""
+结构化输出模块
+
+向提供商请求JSON模式的输出，并在本地修复不严格的JSON：
+- 代码块前后夹带说明文字，或代码块不在消息首尾；
+- 单引号字符串、未加引号的键、Python风格的 True/False/None；
+- 尾随逗号、// 和 /* */ 注释、字符串中未转义的换行；
+- 输出被截断，缺少结尾的引号和括号。
+
+修复成功时无需重新请求，统计修复挽回的请求数。
+"""
+
+import re
+import json
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 消息中任意位置的Markdown代码块
+_FENCE = re.compile(r"```[A-Za-z0-9_-]*\s*\n?(.*?)```", re.DOTALL)
+# 与 str.isalpha() 一致，包括中文等非ASCII字母（模型可能输出未加引号的中文键）
+_IDENTIFIER = re.compile(r"[^\W\d]\w*")
+_NON_SPACE = re.compile(r"\S")
+_LITERALS = {"True": "true", "False": "false", "None": "null",
+             "true": "true", "false": "false", "null": "null"}
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+@dataclass
+class StructuredOutputConfig:
+    """结构化输出配置"""
+    json_mode: bool = True  # 请求时附带 response_format={"type": "json_object"}
+    repair: bool = True  # 严格解析失败时尝试本地修复
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "StructuredOutputConfig":
+        """读取 ai.structured_output"""
+        settings = config.get("ai.structured_output", {}) or {}
+        defaults = cls()
+        return cls(
+            json_mode=bool(settings.get("json_mode", defaults.json_mode)),
+            repair=bool(settings.get("repair", defaults.repair)),
+        )
+
+
+@dataclass
+class StructuredOutputStats:
+    """命令响应的解析统计"""
+    responses: int = 0  # 解析过的响应数
+    strict: int = 0  # 严格解析成功的响应数
+    repaired: int = 0  # 经本地修复后解析成功的响应数，即省下的重试次数
+    failed: int = 0  # 修复后仍无法解析的响应数
+
+    def record(self, repaired: Optional[bool]) -> None:
+        """记录一次解析结果，None表示解析失败"""
+        self.responses += 1
+        if repaired is None:
+            self.failed += 1
+        elif repaired:
+            self.repaired += 1
+        else:
+            self.strict += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["repair_rate"] = self.repaired / self.responses if self.responses else 0.0
+        return data
+
+
+def _read_string(text: str, start: int) -> Tuple[str, int]:
+    """读取从 start 开始的字符串，返回双引号形式的JSON字符串和结束位置
+
+    支持单引号字符串，转义字符串中的换行和制表符；字符串未闭合时读到文本末尾。
+    """
+    quote = text[start]
+    out = ['"']
+    i = start + 1
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            if i + 1 >= n:
+                break
+            nxt = text[i + 1]
+            out.append("'" if nxt == "'" else ch + nxt)
+            i += 2
+            continue
+        if ch == quote:
+            out.append('"')
+            return "".join(out), i + 1
+        if ch == '"':
+            out.append('\\"')
+        else:
+            out.append(_STRING_ESCAPES.get(ch, ch))
+        i += 1
+    out.append('"')
+    return "".join(out), n
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    """移除输出末尾（空白之前）的逗号"""
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def _next_significant(text: str, start: int) -> str:
+    """返回 start 之后第一个非空白字符"""
+    match = _NON_SPACE.search(text, start)
+    return match.group() if match else ""
+
+
+def _normalize(text: str) -> str:
+    """把从根对象开始的宽松JSON改写为严格JSON
+
+    根对象闭合后的内容被忽略；文本结束时仍未闭合的字符串和括号会被补齐。
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            string, i = _read_string(text, i)
+            out.append(string)
+            continue
+        if ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = n if newline < 0 else newline
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        elif ch.isalpha() or ch == "_":
+            word = _IDENTIFIER.match(text, i).group()
+            i += len(word)
+            if _next_significant(text, i) == ":":
+                out.append(json.dumps(word))
+            else:
+                out.append(_LITERALS.get(word, word))
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # 输出被截断：去掉悬空的逗号和冒号，补齐括号
+    _drop_trailing_comma(out)
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ":":
+        out.append("null")
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def repair_json(text: str) -> Optional[str]:
+    """从模型输出中提取并修复JSON对象
+
+    Args:
+        text: 模型输出
+
+    Returns:
+        修复后的JSON文本，找不到对象时返回None
+    """
+    for match in _FENCE.finditer(text):
+        if "{" in match.group(1):
+            text = match.group(1)
+            break
+    start = text.find("{")
+    if start < 0:
+        return None
+    return _normalize(text[start:])
+
+
+def loads_lenient(text: str, repair: bool = True) -> Tuple[Any, bool]:
+    """解析JSON，严格解析失败时尝试修复
+
+    Args:
+        text: JSON文本
+        repair: 是否尝试修复
+
+    Returns:
+        (解析结果, 是否经过修复)
+
+    Raises:
+        json.JSONDecodeError: 修复后仍无法解析，异常对应严格解析的错误
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError as e:
+        if not repair:
+            raise
+        error = e
+    repaired = repair_json(text)
+    if repaired is not None:
+        try:
+            result = json.loads(repaired)
+        except json.JSONDecodeError:
+            pass
+        else:
+            logger.debug("已在本地修复JSON响应")
+            return result, True
+    raise error
@@ -0,0 +1,173 @@
+"""
+增量JSON解析模块
+
+在流式响应到达的过程中逐字符扫描JSON文本，
+一旦被关注路径上的值完整出现就立即解析并返回，无需等待整个文档结束。
+文本不是严格的JSON（例如尾随逗号、单引号）时停止扫描，由调用方对完整文本做修复解析。
+"""
+
+import json
+import logging
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PathKey = Union[str, int]
+Path = Tuple[PathKey, ...]
+
+# 路径通配符，匹配任意数组下标或对象键
+WILDCARD = "*"
+
+
+class _Frame:
+    """一个尚未闭合的对象或数组"""
+
+    __slots__ = ("is_object", "path", "start", "key", "expect_key")
+
+    def __init__(self, is_object: bool, path: Path, start: int):
+        self.is_object = is_object
+        self.path = path
+        self.start = start
+        self.key: Optional[PathKey] = None if is_object else 0
+        self.expect_key = is_object
+
+
+class IncrementalJSONParser:
+    """增量JSON解析器
+
+    只扫描新到达的文本，维护对象/数组栈和字符串状态。
+    根对象之前的内容（例如Markdown代码块标记）会被忽略。
+
+    示例:
+        parser = IncrementalJSONParser(watch=[("commands", "*")])
+        for chunk in stream:
+            for path, value in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self, watch: Sequence[Path] = ()):
+        """初始化解析器
+
+        Args:
+            watch: 关注的路径列表，路径中可使用"*"匹配任意键或下标；
+                根文档（路径为空元组）完成时总会返回
+        """
+        self.watch = [tuple(pattern) for pattern in watch]
+        self.buffer = ""
+        self.document: Any = None
+        self.failed = False  # 遇到无法严格解析的值后不再扫描
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+
+    @property
+    def done(self) -> bool:
+        """根文档是否已完整解析"""
+        return self.document is not None
+
+    def _matches(self, path: Path) -> bool:
+        """判断路径是否被关注"""
+        for pattern in self.watch:
+            if len(pattern) != len(path):
+                continue
+            if all(p == WILDCARD or p == k for p, k in zip(pattern, path)):
+                return True
+        return False
+
+    def _child_path(self) -> Path:
+        """当前位置上即将出现的值的路径"""
+        if not self._stack:
+            return ()
+        top = self._stack[-1]
+        return top.path + (top.key,)
+
+    def feed(self, text: str) -> List[Tuple[Path, Any]]:
+        """输入新到达的文本
+
+        Args:
+            text: 新的文本片段
+
+        Returns:
+            本次完成的 (路径, 值) 列表，根文档完成时路径为空元组；
+            文本不是严格的JSON时只返回出错之前完成的值，之后不再返回
+        """
+        events: List[Tuple[Path, Any]] = []
+        self.buffer += text
+        if self.done or self.failed or not text:
+            return events
+
+        try:
+            self._scan(events)
+        except json.JSONDecodeError as e:
+            logger.debug(f"流式响应不是严格的JSON，停止增量解析: {str(e)}")
+            self.failed = True
+        return events
+
+    def _scan(self, events: List[Tuple[Path, Any]]) -> None:
+        """从上次停止的位置扫描缓冲区，把完成的值追加到 events"""
+        buffer = self.buffer
+        stack = self._stack
+        i = self._pos
+        end = len(buffer)
+
+        while i < end:
+            ch = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    literal = buffer[self._string_start:i + 1]
+                    top = stack[-1]
+                    if self._string_is_key:
+                        top.key = json.loads(literal)
+                    else:
+                        path = top.path + (top.key,)
+                        if self._matches(path):
+                            events.append((path, json.loads(literal)))
+                i += 1
+                continue
+
+            if not self._started:
+                # 跳过根对象之前的内容
+                if ch == "{" or ch == "[":
+                    self._started = True
+                else:
+                    i += 1
+                    continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = bool(stack) and stack[-1].is_object and stack[-1].expect_key
+            elif ch == "{" or ch == "[":
+                stack.append(_Frame(ch == "{", self._child_path(), i))
+            elif ch == "}" or ch == "]":
+                frame = stack.pop()
+                if frame.path == () or self._matches(frame.path):
+                    value = json.loads(buffer[frame.start:i + 1])
+                    events.append((frame.path, value))
+                    if not stack:
+                        self.document = value
+                        self._pos = i + 1
+                        return
+            elif ch == ":":
+                if stack and stack[-1].is_object:
+                    stack[-1].expect_key = False
+            elif ch == ",":
+                if stack:
+                    top = stack[-1]
+                    if top.is_object:
+                        top.expect_key = True
+                    else:
+                        top.key += 1
+            i += 1
+
+        self._pos = i
@@ -0,0 +1,302 @@
+"""
+结构化日志模块
+
+热路径上的日志只在记录真正被输出时才序列化：
+- payload() 包装提示、响应等大对象，输出时才转换为JSON，并按配置截断和采样；
+- fields() 生成结构化字段，由 StructuredFormatter 在格式化时追加到消息末尾；
+- 文件处理器放在后台线程中，由 QueueListener 写入，事件循环线程只负责入队；
+- 所有输出都会经过脱敏，API密钥等敏感值被替换为掩码。
+"""
+
+import re
+import json
+import atexit
+import queue
+import random
+import logging
+import logging.handlers
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+# 常见密钥格式：OpenAI/DeepSeek风格的sk-密钥、Bearer令牌、JSON或YAML中的api_key字段。
+# 每项附带小写的关键字，文本中不含关键字时跳过对应的正则，长载荷大多无需扫描
+_SECRET_PATTERNS = [
+    (("sk-",), re.compile(r"\bsk-[A-Za-z0-9_\-]{8,}"), "sk-***"),
+    (("bearer",), re.compile(r"(Bearer\s+)[A-Za-z0-9._\-]+", re.IGNORECASE), r"\1***"),
+    (("key", "authorization", "token"),
+     re.compile(r"""((?:api[_-]?key|authorization|token)["']?\s*[:=]\s*["']?)[^"'\s,}]+""", re.IGNORECASE),
+     r"\1***"),
+]
+
+# 通过 register_secret() 登记的明文密钥（例如配置文件中的API密钥）
+_secrets: set = set()
+_secrets_pattern: Optional["re.Pattern[str]"] = None
+
+
+def register_secret(value: Optional[str]) -> None:
+    """登记需要在日志中屏蔽的明文值"""
+    global _secrets_pattern
+    if not value or len(value) < 6 or value in _secrets:
+        return
+    _secrets.add(value)
+    _secrets_pattern = re.compile("|".join(re.escape(s) for s in sorted(_secrets, key=len, reverse=True)))
+
+
+def redact(text: str) -> str:
+    """屏蔽文本中的密钥"""
+    if _secrets_pattern is not None:
+        text = _secrets_pattern.sub("***", text)
+    lowered = text.lower()
+    for keywords, pattern, replacement in _SECRET_PATTERNS:
+        if any(keyword in lowered for keyword in keywords):
+            text = pattern.sub(replacement, text)
+    return text
+
+
+class PayloadPolicy:
+    """载荷的截断和采样策略"""
+
+    def __init__(self, max_chars: int = 2000, sample_rate: float = 1.0):
+        """初始化策略
+
+        Args:
+            max_chars: 单个载荷输出的最大字符数，0表示不截断
+            sample_rate: 输出完整载荷的比例（0~1），未被采样的载荷只输出长度
+        """
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "PayloadPolicy":
+        """读取 logging.payload"""
+        settings = config.get("logging.payload", {}) or {}
+        return cls(
+            max_chars=int(settings.get("max_chars", 2000)),
+            sample_rate=float(settings.get("sample_rate", 1.0)),
+        )
+
+
+# 进程级的载荷策略，由 configure_logging() 设置
+_policy = PayloadPolicy()
+
+
+class Payload:
+    """延迟序列化的日志载荷
+
+    只保存对象引用，记录被输出时才调用 __str__ 进行序列化、采样和截断。
+    记录进入后台队列后才格式化，被记录的对象可能在序列化时仍被事件循环修改，
+    此时退回到 repr，不会使后台写入线程出错。
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, str):
+            text = value
+        else:
+            try:
+                text = json.dumps(value, ensure_ascii=False, default=str)
+            except Exception:
+                # 不可序列化，或在遍历时被修改（RuntimeError: changed size during iteration）
+                try:
+                    text = repr(value)
+                except Exception:
+                    text = f"<无法序列化的 {type(value).__name__}>"
+        policy = _policy
+        if policy.sample_rate < 1.0 and random.random() >= policy.sample_rate:
+            return f"<未采样 {len(text)} 字符>"
+        if policy.max_chars and len(text) > policy.max_chars:
+            return f"{text[:policy.max_chars]}...<已截断 {len(text) - policy.max_chars} 字符>"
+        return text
+
+
+def payload(value: Any) -> Payload:
+    """包装大对象，作为 %s 参数或结构化字段延迟输出
+
+    示例:
+        logger.debug("API请求数据: %s", payload(data))
+    """
+    return Payload(value)
+
+
+def fields(**values: Any) -> Dict[str, Dict[str, Any]]:
+    """生成 extra 参数中的结构化字段
+
+    示例:
+        logger.info("命令已生成", extra=fields(provider=name, elapsed=0.12))
+    """
+    return {"fields": values}
+
+
+class StructuredFormatter(logging.Formatter):
+    """在消息后追加结构化字段并脱敏"""
+
+    def __init__(self, fmt: Optional[str] = None, datefmt: Optional[str] = None, as_json: bool = False):
+        """初始化格式化器
+
+        Args:
+            fmt: 日志格式
+            datefmt: 日期格式
+            as_json: 为True时每条记录输出一行JSON
+        """
+        super().__init__(fmt, datefmt)
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        extra = getattr(record, "fields", None)
+        if self.as_json:
+            data = {
+                "time": self.formatTime(record, self.datefmt),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+            }
+            if extra:
+                data.update({key: str(value) if isinstance(value, Payload) else value
+                             for key, value in extra.items()})
+            if record.exc_info:
+                data["exc_info"] = self.formatException(record.exc_info)
+            return redact(json.dumps(data, ensure_ascii=False, default=str))
+        text = super().format(record)
+        if extra:
+            text += " | " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return redact(text)
+
+
+class RedactingFilter(logging.Filter):
+    """为不使用 StructuredFormatter 的处理器（例如Rich控制台）脱敏"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = redact(message)
+        if redacted != message:
+            record.msg = redacted
+            record.args = None
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """只负责入队的处理器
+
+    标准 QueueHandler 在入队前就在调用线程中格式化消息；这里保留原始参数，
+    由后台线程的处理器完成格式化，使载荷序列化也离开事件循环线程。
+    队列已满时丢弃记录而不是阻塞调用方。
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """后台写日志的管道：记录在调用线程入队，由监听线程交给实际的处理器"""
+
+    def __init__(self, handlers: Iterable[logging.Handler], max_queue: int = 10000):
+        """初始化并启动后台监听线程
+
+        Args:
+            handlers: 在后台线程中执行的处理器
+            max_queue: 队列容量，队列已满时丢弃新记录，不阻塞调用方
+        """
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(max_queue)
+        self.handler = DeferredQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        self._stopped = False
+
+    @property
+    def dropped(self) -> int:
+        """因队列已满被丢弃的记录数"""
+        return self.handler.dropped
+
+    def stop(self) -> None:
+        """写完队列中的记录并停止后台线程"""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+
+
+# 当前生效的管道，重新配置时先停止旧管道
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure_logging(level: str = "INFO",
+                      console_handler: Optional[logging.Handler] = None,
+                      file_handlers: Optional[List[logging.Handler]] = None,
+                      fmt: Optional[str] = None,
+                      datefmt: Optional[str] = None,
+                      as_json: bool = False,
+                      policy: Optional[PayloadPolicy] = None) -> Optional[LogPipeline]:
+    """配置根日志记录器
+
+    控制台处理器保持同步，保证与交互提示的输出顺序一致；文件处理器在后台线程中写入。
+
+    Args:
+        level: 日志级别
+        console_handler: 控制台处理器
+        file_handlers: 文件处理器列表
+        fmt: 文件日志格式
+        datefmt: 日期格式
+        as_json: 文件日志是否输出为JSON行
+        policy: 载荷截断和采样策略
+
+    Returns:
+        后台日志管道，没有文件处理器时返回None
+    """
+    global _pipeline, _policy
+    if policy is not None:
+        _policy = policy
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+
+    handlers: List[logging.Handler] = []
+    if console_handler is not None:
+        if console_handler.formatter is None:
+            console_handler.setFormatter(logging.Formatter(fmt, datefmt))
+        if not any(isinstance(f, RedactingFilter) for f in console_handler.filters):
+            console_handler.addFilter(RedactingFilter())
+        handlers.append(console_handler)
+    if file_handlers:
+        formatter = StructuredFormatter(fmt, datefmt, as_json=as_json)
+        for handler in file_handlers:
+            handler.setFormatter(formatter)
+        _pipeline = LogPipeline(file_handlers)
+        handlers.append(_pipeline.handler)
+
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO),
+        handlers=handlers,
+        force=True
+    )
+    return _pipeline
+
+
+def shutdown_logging() -> None:
+    """停止后台日志管道，写完队列中剩余的记录"""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+
+
+atexit.register(shutdown_logging)
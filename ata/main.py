@@ -12,7 +12,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from .api import execute, ai, settings, os_info
 
 from .config_manager import ConfigManager
-from .web_server import WebServer
 
 # 配置日志
 def setup_logging():
@@ -69,7 +68,9 @@ def main():
         # 初始化配置管理器（使用默认配置文件路径）
         config = ConfigManager()
         
-        # 创建并启动Web服务器
+        # 创建并启动Web服务器（Quart仅在此时加载）
+        from .web_server import WebServer
+        
         server = WebServer(config)
         server.start()
         
@@ -0,0 +1,263 @@
+"""
+本地模拟AI服务模块
+
+提供兼容OpenAI/DeepSeek Chat Completions协议的本地服务，支持流式和非流式响应，
+可配置延迟分布、首令牌时间、生成速度以及错误注入（429、500、截断的流），
+用于在无网络环境下对完整链路进行压力和延迟测试。
+
+用法:
+    python -m ata.mock_server --port 8765 --latency 0.3 --jitter 0.1 --error-429 0.05
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+# 内置的命令响应：关键字 -> (命令, 解释)
+DEFAULT_RESPONSES: Dict[str, List[str]] = {
+    "磁盘": ["df -h", "查看磁盘使用情况"],
+    "disk": ["df -h", "查看磁盘使用情况"],
+    "内存": ["free -h", "查看内存使用情况"],
+    "memory": ["free -h", "查看内存使用情况"],
+    "进程": ["ps aux", "列出所有进程"],
+    "process": ["ps aux", "列出所有进程"],
+    "文件": ["ls -la", "列出当前目录的所有文件"],
+    "file": ["ls -la", "列出当前目录的所有文件"],
+}
+DEFAULT_COMMAND = ["echo 'mock'", "模拟服务的默认命令"]
+
+
+@dataclass
+class MockServerConfig:
+    """模拟服务配置"""
+    latency: float = 0.2  # 非流式响应的平均延迟（秒）
+    jitter: float = 0.0  # 延迟抖动（秒）
+    distribution: str = "uniform"  # 延迟分布：fixed、uniform、lognormal
+    time_to_first_token: float = 0.1  # 流式响应的首令牌时间（秒）
+    tokens_per_second: float = 0.0  # 流式生成速度，0表示不限速
+    error_429_rate: float = 0.0  # 返回429的概率
+    error_500_rate: float = 0.0  # 返回500的概率
+    truncate_rate: float = 0.0  # 流式响应中途截断的概率
+    retry_after: float = 1.0  # 429响应的Retry-After（秒）
+    seed: Optional[int] = None  # 随机种子
+    responses: Dict[str, List[str]] = field(default_factory=lambda: dict(DEFAULT_RESPONSES))
+
+
+class MockServer:
+    """兼容OpenAI协议的本地模拟服务"""
+
+    def __init__(self, config: Optional[MockServerConfig] = None):
+        """初始化模拟服务
+
+        Args:
+            config: 模拟服务配置
+        """
+        self.config = config or MockServerConfig()
+        self.random = random.Random(self.config.seed)
+        self.stats: Dict[str, int] = {"requests": 0, "streams": 0, "errors_429": 0,
+                                      "errors_500": 0, "truncated": 0}
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+    def create_app(self) -> web.Application:
+        """创建aiohttp应用"""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle_chat)
+        app.router.add_post("/chat/completions", self.handle_chat)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> str:
+        """启动服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+
+        Returns:
+            chat completions端点URL
+        """
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        actual_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{actual_port}/v1/chat/completions"
+        logger.info(f"模拟AI服务已启动: {self.url}")
+        return self.url
+
+    async def stop(self) -> None:
+        """停止服务"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _sample_latency(self, mean: float) -> float:
+        """按配置的分布采样延迟"""
+        config = self.config
+        if config.distribution == "fixed" or config.jitter <= 0:
+            return mean
+        if config.distribution == "lognormal":
+            return self.random.lognormvariate(0, config.jitter / max(mean, 1e-6)) * mean
+        return max(0.0, self.random.uniform(mean - config.jitter, mean + config.jitter))
+
+    def _content_for(self, messages: List[Dict[str, str]]) -> str:
+        """根据系统提示的格式和用户输入生成响应内容"""
+        user_input = next(
+            (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), ""
+        ).lower()
+        command, explanation = next(
+            (value for key, value in self.config.responses.items() if key.lower() in user_input),
+            DEFAULT_COMMAND
+        )
+        system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        if '"commands"' in system_prompt:
+            # DeepSeek的多平台格式
+            body = {
+                "commands": [{"os": os_name, "command": command, "explanation": explanation}
+                             for os_name in ("linux", "darwin", "windows")],
+                "warnings": []
+            }
+        else:
+            body = {"command": command, "explanation": explanation, "warnings": []}
+        return json.dumps(body, ensure_ascii=False)
+
+    def _inject_error(self) -> Optional[web.Response]:
+        """按概率返回429或500错误"""
+        roll = self.random.random()
+        if roll < self.config.error_429_rate:
+            self.stats["errors_429"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                status=429, headers={"Retry-After": str(self.config.retry_after)}
+            )
+        if roll < self.config.error_429_rate + self.config.error_500_rate:
+            self.stats["errors_500"] += 1
+            return web.json_response(
+                {"error": {"message": "Internal server error", "type": "server_error"}}, status=500
+            )
+        return None
+
+    @staticmethod
+    def _usage(messages: List[Dict[str, str]], content: str) -> Dict[str, int]:
+        """按字符数粗略估算令牌用量"""
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        """处理chat completions请求"""
+        self.stats["requests"] += 1
+        payload = await request.json()
+        messages = payload.get("messages", [])
+        model = payload.get("model", "mock-model")
+
+        error = self._inject_error()
+        if error is not None:
+            await asyncio.sleep(self._sample_latency(self.config.time_to_first_token))
+            return error
+
+        content = self._content_for(messages)
+        if payload.get("stream"):
+            return await self._stream(request, model, content)
+
+        await asyncio.sleep(self._sample_latency(self.config.latency))
+        return web.json_response({
+            "id": f"chatcmpl-mock-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": self._usage(messages, content),
+        })
+
+    async def _stream(self, request: web.Request, model: str, content: str) -> web.StreamResponse:
+        """以SSE流式返回内容，每个片段约为一个令牌（4个字符）"""
+        self.stats["streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream",
+                                               "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await asyncio.sleep(self._sample_latency(self.config.time_to_first_token))
+
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        truncate_at = None
+        if self.random.random() < self.config.truncate_rate:
+            truncate_at = self.random.randrange(1, max(2, len(pieces)))
+            self.stats["truncated"] += 1
+
+        delay = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        for index, piece in enumerate(pieces):
+            if truncate_at is not None and index >= truncate_at:
+                # 模拟连接中途断开：不发送结束标记直接关闭
+                request.transport.close()
+                return response
+            event = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            if delay:
+                await asyncio.sleep(delay)
+
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """返回模拟服务的请求统计"""
+        return web.json_response(self.stats)
+
+
+def main() -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地模拟AI服务（兼容OpenAI协议）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.2, help="平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动（秒）")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="uniform",
+                        help="延迟分布")
+    parser.add_argument("--ttft", type=float, default=0.1, help="流式响应首令牌时间（秒）")
+    parser.add_argument("--tps", type=float, default=0.0, help="流式生成速度（令牌/秒），0表示不限速")
+    parser.add_argument("--error-429", type=float, default=0.0, help="返回429的概率")
+    parser.add_argument("--error-500", type=float, default=0.0, help="返回500的概率")
+    parser.add_argument("--truncate", type=float, default=0.0, help="流式响应截断的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockServer(MockServerConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        distribution=args.distribution,
+        time_to_first_token=args.ttft,
+        tokens_per_second=args.tps,
+        error_429_rate=args.error_429,
+        error_500_rate=args.error_500,
+        truncate_rate=args.truncate,
+        seed=args.seed,
+    ))
+
+    async def serve() -> None:
+        await server.start(args.host, args.port)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
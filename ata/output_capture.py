@@ -0,0 +1,277 @@
+"""
+输出捕获模块
+
+限制命令输出占用的内存：每个输出流在内存中只保留开头和结尾各一部分，
+超出上限时省略中间部分。超出上限的完整输出写入临时文件，
+由 OutputStore 保存，可按字节偏移分页读取（通过mmap，不把整个文件读入内存）。
+"""
+
+import mmap
+import uuid
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 每个输出流在内存中保留的默认字节数
+DEFAULT_MAX_MEMORY = 1024 * 1024
+
+# 分页读取时每页的默认字节数
+DEFAULT_PAGE_SIZE = 64 * 1024
+
+
+@dataclass
+class CaptureConfig:
+    """输出捕获配置"""
+    max_memory: int = DEFAULT_MAX_MEMORY  # 每个输出流在内存中保留的字节数上限，0表示不限制
+    spill: bool = True  # 超出上限时把完整输出写入临时文件
+    spill_dir: Optional[str] = None  # 临时文件目录，默认使用系统临时目录
+    max_spilled: int = 16  # 保留的溢出输出数，超出时删除最早的
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "CaptureConfig":
+        """读取 ui.output_capture"""
+        settings = config.get("ui.output_capture", {}) or {}
+        defaults = cls()
+        return cls(
+            max_memory=int(settings.get("max_memory", defaults.max_memory)),
+            spill=bool(settings.get("spill", defaults.spill)),
+            spill_dir=settings.get("spill_dir") or None,
+            max_spilled=int(settings.get("max_spilled", defaults.max_spilled)),
+        )
+
+
+def _utf8_boundary(data: bytes) -> int:
+    """返回不截断末尾多字节字符的最大长度"""
+    n = len(data)
+    for back in range(1, min(4, n) + 1):
+        byte = data[n - back]
+        if byte & 0xC0 == 0x80:
+            continue  # 续字节
+        if byte >= 0xF0:
+            size = 4
+        elif byte >= 0xE0:
+            size = 3
+        elif byte >= 0xC0:
+            size = 2
+        else:
+            size = 1
+        return n if size <= back else n - back
+    return n
+
+
+def _decode(data: bytes) -> str:
+    """按UTF-8解码并统一换行符"""
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class OutputCapture:
+    """单个输出流的有界捕获
+
+    内存中保留前 max_memory/2 字节和最后 max_memory/2 字节（环形缓冲区）；
+    总量超过 max_memory 时，已写入和后续写入的全部字节同时写入临时文件。
+    """
+
+    def __init__(self, max_memory: int = DEFAULT_MAX_MEMORY, spill: bool = True,
+                 spill_dir: Optional[str] = None):
+        """初始化捕获
+
+        Args:
+            max_memory: 内存中保留的字节数上限，0表示不限制
+            spill: 超出上限时是否写入临时文件
+            spill_dir: 临时文件目录
+        """
+        self.max_memory = max_memory
+        self.head_limit = max_memory // 2
+        self.tail_limit = max_memory - self.head_limit
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def write(self, data: bytes) -> None:
+        """追加输出"""
+        if not data:
+            return
+        self.total_bytes += len(data)
+        if not self.max_memory:
+            self.head += data
+            return
+
+        if self._file is not None:
+            self._file.write(data)
+        elif self.spill and self.total_bytes > self.max_memory:
+            # 此前的输出都还在内存中，先写入它们
+            self._file = tempfile.TemporaryFile(prefix="ata-output-", dir=self.spill_dir)
+            self._file.write(self.head)
+            self._file.write(self.tail)
+            self._file.write(data)
+
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if len(data) >= self.tail_limit:
+            self.tail = bytearray(data[len(data) - self.tail_limit:])
+        elif data:
+            self.tail += data
+            excess = len(self.tail) - self.tail_limit
+            if excess > 0:
+                del self.tail[:excess]
+
+    @property
+    def omitted_bytes(self) -> int:
+        """内存中省略的字节数"""
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    @property
+    def truncated(self) -> bool:
+        """内存中的输出是否被截断"""
+        return self.omitted_bytes > 0
+
+    @property
+    def spilled(self) -> bool:
+        """完整输出是否已写入临时文件"""
+        return self._file is not None
+
+    def getvalue(self) -> str:
+        """返回内存中的输出文本，被截断时在开头和结尾之间插入省略标记"""
+        if not self.truncated:
+            return _decode(bytes(self.head + self.tail))
+        head = bytes(self.head[:_utf8_boundary(self.head)])
+        start = 0
+        while start < min(3, len(self.tail)) and self.tail[start] & 0xC0 == 0x80:
+            start += 1
+        tail = bytes(self.tail[start:])
+        marker = f"\n... [输出过长，已省略 {self.omitted_bytes} 字节] ...\n"
+        return _decode(head) + marker + _decode(tail)
+
+    def finish(self) -> None:
+        """输出结束，刷新临时文件以便读取"""
+        if self._file is not None:
+            self._file.flush()
+
+    def read(self, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> bytes:
+        """按字节偏移读取完整输出
+
+        Args:
+            offset: 起始字节偏移
+            limit: 最多读取的字节数
+
+        Returns:
+            读取的字节
+
+        Raises:
+            ValueError: 输出已截断且没有写入临时文件
+        """
+        offset = max(0, offset)
+        end = offset + max(0, limit)
+        if self._file is not None:
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                return view[offset:end]
+        if self.truncated:
+            raise ValueError("输出已截断，完整输出未保存")
+        return bytes((self.head + self.tail)[offset:end])
+
+    def close(self) -> None:
+        """关闭并删除临时文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OutputStore:
+    """保存溢出到磁盘的命令输出，供分页读取
+
+    只保存最近 max_outputs 次溢出的输出，超出时关闭并删除最早的临时文件。
+    """
+
+    def __init__(self, max_outputs: int = 16):
+        """初始化存储
+
+        Args:
+            max_outputs: 保存的输出数上限
+        """
+        self.max_outputs = max_outputs
+        self._outputs: "OrderedDict[str, Dict[str, OutputCapture]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, captures: Dict[str, OutputCapture]) -> Optional[str]:
+        """保存一次命令的输出
+
+        Args:
+            captures: 输出流名称到捕获的映射
+
+        Returns:
+            输出ID，没有输出溢出到磁盘时返回None
+        """
+        if not any(capture.spilled for capture in captures.values()):
+            return None
+        output_id = uuid.uuid4().hex
+        evicted = []
+        with self._lock:
+            self._outputs[output_id] = captures
+            while len(self._outputs) > self.max_outputs:
+                evicted.append(self._outputs.popitem(last=False)[1])
+        for old in evicted:
+            for capture in old.values():
+                capture.close()
+        return output_id
+
+    def read(self, output_id: str, stream: str = "stdout", offset: int = 0,
+             limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """分页读取保存的输出
+
+        返回的文本不会截断多字节字符，保留原始换行符，下一页从 next_offset 开始读取。
+
+        Args:
+            output_id: 输出ID
+            stream: 输出流名称，stdout或stderr
+            offset: 起始字节偏移
+            limit: 最多读取的字节数
+
+        Returns:
+            包含 data、offset、next_offset、total_bytes 和 eof 的字典
+
+        Raises:
+            KeyError: 输出不存在或已被删除
+        """
+        with self._lock:
+            captures = self._outputs.get(output_id)
+            if captures is None or stream not in captures:
+                raise KeyError(output_id)
+            self._outputs.move_to_end(output_id)
+        capture = captures[stream]
+        data = capture.read(offset, limit)
+        eof = offset + len(data) >= capture.total_bytes
+        if not eof:
+            data = data[:_utf8_boundary(data)] or data
+        return {
+            "data": data.decode("utf-8", errors="replace"),
+            "offset": offset,
+            "next_offset": offset + len(data),
+            "total_bytes": capture.total_bytes,
+            "eof": offset + len(data) >= capture.total_bytes,
+        }
+
+    def __len__(self) -> int:
+        """保存的输出数"""
+        return len(self._outputs)
+
+    def close(self) -> None:
+        """删除所有保存的输出"""
+        with self._lock:
+            outputs = list(self._outputs.values())
+            self._outputs.clear()
+        for captures in outputs:
+            for capture in captures.values():
+                capture.close()
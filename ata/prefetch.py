@@ -0,0 +1,299 @@
+"""
+预取模块
+
+命令执行成功后，根据历史统计预测用户接下来可能提出的请求
+（例如 git status 之后的“提交所有更改”、df -h 之后的“查找大文件”），
+在后台预先生成命令并写入响应缓存，后续请求即可直接命中缓存。
+
+预取不与交互式请求争用限流额度：
+- 请求以 PRIORITY_BACKGROUND 排队，限流器总是先放行交互式请求；
+- 有上游调用进行中、限流器有请求排队或剩余额度低于 min_headroom 时跳过；
+- 预取自身的上游请求数受 max_per_minute 限制，同一时间只运行一个预取任务。
+"""
+
+import os
+import shlex
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from .conversation_store import DEFAULT_SESSION
+from .rate_limiter import PRIORITY_BACKGROUND, TokenBucket, request_priority
+from .response_cache import normalize_input
+
+if TYPE_CHECKING:
+    from .ai_interface import AIInterface
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 内置的后续请求，键为命令特征（见 command_key）
+DEFAULT_FOLLOW_UPS: Dict[str, List[str]] = {
+    "git status": ["commit all changes", "show git diff"],
+    "git diff": ["commit all changes"],
+    "git add": ["commit all changes"],
+    "git commit": ["push to remote"],
+    "git pull": ["show recent git log"],
+    "df": ["find large files"],
+    "du": ["find large files"],
+    "free": ["show processes using the most memory"],
+}
+
+# 这些工具的子命令也计入命令特征
+_SUBCOMMAND_TOOLS = {"git", "docker", "kubectl", "npm", "pip", "pip3", "systemctl", "brew", "apt", "cargo"}
+
+# 记录最近执行命令的会话数上限
+MAX_TRACKED_SESSIONS = 1000
+
+
+def command_key(command: str) -> str:
+    """提取命令特征：命令名，git 等工具再加上子命令
+
+    示例:
+        command_key("sudo git status -s") == "git status"
+        command_key("df -h | sort") == "df"
+    """
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        words = command.split()
+    while words and (words[0] == "sudo" or ("=" in words[0] and not words[0].startswith("="))):
+        words = words[1:]
+    if not words:
+        return ""
+    name = os.path.basename(words[0]).lower()
+    if name in _SUBCOMMAND_TOOLS:
+        for word in words[1:]:
+            if word in ("|", "&&", ";"):
+                break
+            if not word.startswith("-"):
+                return f"{name} {word.lower()}"
+    return name
+
+
+class FollowUpPredictor:
+    """根据历史统计预测后续请求
+
+    统计每种命令执行后用户提出的下一个请求，按出现次数排序；
+    没有足够历史时使用内置或配置的后续请求。
+    """
+
+    def __init__(self, follow_ups: Optional[Dict[str, List[str]]] = None,
+                 max_keys: int = 256, max_follow_ups: int = 8):
+        """初始化预测器
+
+        Args:
+            follow_ups: 额外的后续请求，键为命令（会被转换为命令特征），排在内置请求之前
+            max_keys: 统计的命令特征数上限，超出时淘汰最久未出现的
+            max_follow_ups: 每种命令保留的后续请求数上限
+        """
+        self.seeds: Dict[str, List[str]] = {key: list(values) for key, values in DEFAULT_FOLLOW_UPS.items()}
+        for command, values in (follow_ups or {}).items():
+            key = command_key(command)
+            if key:
+                self.seeds[key] = list(values) + [v for v in self.seeds.get(key, []) if v not in values]
+        self.max_keys = max_keys
+        self.max_follow_ups = max_follow_ups
+        self._counts: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def observe(self, previous_command: str, user_input: str) -> None:
+        """记录一次“执行 previous_command 之后提出 user_input”"""
+        key = command_key(previous_command)
+        text = normalize_input(user_input)
+        if not key or not text:
+            return
+        counts = self._counts.pop(key, {})
+        counts[text] = counts.get(text, 0) + 1
+        if len(counts) > self.max_follow_ups:
+            del counts[min(counts, key=counts.get)]
+        self._counts[key] = counts
+        while len(self._counts) > self.max_keys:
+            self._counts.popitem(last=False)
+
+    def learn(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """从按时间排列的历史记录（包含 input 和 command 字段）中学习"""
+        previous = None
+        for entry in entries:
+            user_input = entry.get("input")
+            if previous and user_input:
+                self.observe(previous, user_input)
+            previous = entry.get("command")
+
+    def __len__(self) -> int:
+        """已统计的命令特征数"""
+        return len(self._counts)
+
+    def predict(self, command: str, limit: int = 2) -> List[str]:
+        """预测执行 command 之后最可能的请求
+
+        Args:
+            command: 刚执行成功的命令
+            limit: 返回的请求数上限
+
+        Returns:
+            按可能性排列的请求
+        """
+        key = command_key(command)
+        counts = self._counts.get(key, {})
+        learned = sorted(counts, key=counts.get, reverse=True)
+        predictions: List[str] = []
+        seen = set()
+        for text in learned + self.seeds.get(key, []):
+            normalized = normalize_input(text)
+            if normalized not in seen:
+                seen.add(normalized)
+                predictions.append(text)
+            if len(predictions) >= limit:
+                break
+        return predictions
+
+
+@dataclass
+class PrefetchStats:
+    """预取统计信息"""
+    predicted: int = 0  # 预测出的后续请求数
+    generated: int = 0  # 预先生成并写入缓存的请求数
+    skipped: int = 0  # 已有缓存或可由本地快速通道翻译而跳过的请求数
+    throttled: int = 0  # 因交互式请求进行中或额度不足而放弃的请求数
+    failed: int = 0  # 预取失败的请求数
+    served: int = 0  # 由预取的缓存直接返回的请求数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["hit_rate"] = min(1.0, self.served / self.generated) if self.generated else 0.0
+        return data
+
+
+class Prefetcher:
+    """后台预取后续请求"""
+
+    def __init__(self, ai: "AIInterface", predictor: Optional[FollowUpPredictor] = None,
+                 max_predictions: int = 2, max_per_minute: float = 6, min_headroom: float = 0.5):
+        """初始化预取器
+
+        Args:
+            ai: AI接口
+            predictor: 后续请求预测器
+            max_predictions: 每次执行后预取的请求数上限
+            max_per_minute: 每分钟预取的上游请求数上限，0表示不限制
+            min_headroom: 限流器剩余额度低于容量的该比例时不预取
+        """
+        self.ai = ai
+        self.predictor = predictor or FollowUpPredictor()
+        self.max_predictions = max_predictions
+        self.budget = TokenBucket(max_per_minute) if max_per_minute > 0 else None
+        self.min_headroom = min_headroom
+        self.stats = PrefetchStats()
+        self._last_command: "OrderedDict[str, str]" = OrderedDict()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager", ai: "AIInterface") -> Optional["Prefetcher"]:
+        """读取 ai.prefetch 创建预取器
+
+        Args:
+            config: 配置管理器实例
+            ai: AI接口
+
+        Returns:
+            预取器，配置禁用时返回None
+        """
+        settings = config.get("ai.prefetch", {}) or {}
+        if not settings.get("enabled", False):
+            return None
+        return cls(
+            ai,
+            predictor=FollowUpPredictor(settings.get("follow_ups") or {}),
+            max_predictions=int(settings.get("max_predictions", 2)),
+            max_per_minute=float(settings.get("max_per_minute", 6)),
+            min_headroom=float(settings.get("min_headroom", 0.5)),
+        )
+
+    def on_executed(self, user_input: str, command: str, session_id: str = DEFAULT_SESSION,
+                    system_info: Optional[Dict[str, Any]] = None) -> Optional["asyncio.Task[None]"]:
+        """命令执行成功后调用：更新统计并在后台预取后续请求
+
+        Args:
+            user_input: 生成该命令的用户输入
+            command: 执行成功的命令
+            session_id: 会话ID
+            system_info: 生成命令时使用的系统信息
+
+        Returns:
+            预取任务，没有可预取的请求或已有预取任务在运行时返回None
+        """
+        previous = self._last_command.pop(session_id, None)
+        if previous:
+            self.predictor.observe(previous, user_input)
+        self._last_command[session_id] = command
+        while len(self._last_command) > MAX_TRACKED_SESSIONS:
+            self._last_command.popitem(last=False)
+
+        predictions = self.predictor.predict(command, self.max_predictions)
+        self.stats.predicted += len(predictions)
+        if not predictions:
+            return None
+        if self._task is not None and not self._task.done():
+            self.stats.throttled += len(predictions)
+            return None
+        self._task = asyncio.ensure_future(self._run(predictions, system_info or {}))
+        return self._task
+
+    def has_headroom(self) -> bool:
+        """判断当前能否预取：没有进行中的上游调用，限流器无人排队且额度充足"""
+        if self.ai.singleflight.in_flight():
+            return False
+        if self.budget is not None and self.budget.available() < 1:
+            return False
+        limiter = self.ai.provider.rate_limiter
+        if limiter is not None:
+            if limiter.queue_depth:
+                return False
+            for bucket in (limiter.requests, limiter.tokens):
+                if bucket is not None and bucket.available() < bucket.capacity * self.min_headroom:
+                    return False
+        return True
+
+    async def _run(self, predictions: List[str], system_info: Dict[str, Any]) -> None:
+        """依次预取，每个请求前重新检查额度"""
+        with request_priority(PRIORITY_BACKGROUND):
+            for user_input in predictions:
+                if not self.has_headroom():
+                    self.stats.throttled += 1
+                    continue
+                try:
+                    generated = await self.ai.prefetch(user_input, system_info)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats.failed += 1
+                    logger.debug(f"预取失败: {user_input}: {str(e)}")
+                    continue
+                if generated:
+                    self.stats.generated += 1
+                    if self.budget is not None:
+                        self.budget.consume(1)
+                    logger.debug(f"已预取: {user_input}")
+                else:
+                    self.stats.skipped += 1
+
+    async def wait(self) -> None:
+        """等待当前预取任务完成"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """取消进行中的预取任务"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.to_dict()
+        stats["learned_commands"] = len(self.predictor)
+        return stats
@@ -0,0 +1,303 @@
+"""
+客户端限流模块
+
+按提供商和API密钥共享的令牌桶限流器：请求桶限制每分钟请求数，
+令牌桶按估算的提示令牌限制每分钟令牌数，并在响应返回实际用量后校正。
+等待中的请求进入优先级队列，交互式请求优先于批量和后台任务。
+"""
+
+import time
+import heapq
+import asyncio
+import hashlib
+import logging
+import itertools
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, TYPE_CHECKING
+
+from .timing import current_timing
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 请求优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0  # CLI和Web的交互式请求
+PRIORITY_BATCH = 10  # 批量生成
+PRIORITY_BACKGROUND = 20  # 预取等后台任务
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "ata_request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+def current_priority() -> int:
+    """获取当前上下文的请求优先级"""
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """在上下文中设置请求优先级
+
+    示例:
+        with request_priority(PRIORITY_BATCH):
+            await ai.generate_command(...)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """令牌桶，容量为每分钟配额，按时间连续补充"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """初始化令牌桶
+
+        Args:
+            per_minute: 每分钟补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于每分钟配额
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """当前可用的令牌数"""
+        self._refill()
+        return self.tokens
+
+    def wait_time(self, amount: float) -> float:
+        """获得指定数量令牌需要等待的时间（秒）"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float) -> None:
+        """消耗令牌，允许透支（透支部分由后续补充偿还）"""
+        self._refill()
+        self.tokens -= amount
+
+
+@dataclass
+class RateLimitStats:
+    """限流统计信息"""
+    acquired: int = 0  # 放行的请求数
+    queued: int = 0  # 需要排队等待的请求数
+    total_wait_time: float = 0.0  # 累计排队时间（秒）
+    max_wait_time: float = 0.0  # 单次最长排队时间（秒）
+    max_queue_depth: int = 0  # 最大队列深度
+    token_corrections: int = 0  # 按实际用量校正的次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["avg_wait_time"] = self.total_wait_time / self.queued if self.queued else 0.0
+        return data
+
+
+class RateLimiter:
+    """请求桶 + 令牌桶限流器，等待者按优先级排队"""
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """初始化限流器
+
+        Args:
+            name: 限流器名称
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            tokens_per_minute: 每分钟令牌数上限，0表示不限制
+        """
+        self.name = name
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.configure(requests_per_minute, tokens_per_minute)
+        self.stats = RateLimitStats()
+        self._waiters: List[list] = []  # [优先级, 序号, future, 令牌数]
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def configure(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """更新限额，0表示不限制"""
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中的请求数"""
+        return sum(1 for waiter in self._waiters if not waiter[2].done())
+
+    def _wait_time(self, amount: float) -> float:
+        """放行一个需要 amount 令牌的请求还需等待的时间"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(amount))
+        return wait
+
+    def _grant(self, amount: float) -> None:
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(amount)
+        self.stats.acquired += 1
+
+    def _dispatch(self) -> None:
+        """按优先级放行等待者，额度不足时安排定时器"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, future, amount = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._wait_time(amount)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._grant(amount)
+            future.set_result(None)
+
+    async def acquire(self, tokens: float = 0, priority: Optional[int] = None) -> None:
+        """获取一次请求的额度，额度不足时按优先级排队
+
+        Args:
+            tokens: 估算的令牌数
+            priority: 优先级，未指定时使用当前上下文的优先级
+        """
+        if priority is None:
+            priority = current_priority()
+
+        # 无人排队且额度充足时直接放行
+        if not self.queue_depth and self._wait_time(tokens) == 0:
+            self._grant(tokens)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._counter), future, tokens])
+        depth = self.queue_depth
+        self.stats.queued += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+        logger.debug(f"{self.name}限流排队，优先级{priority}，队列深度{depth}")
+
+        start = time.monotonic()
+        try:
+            self._dispatch()
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            self._dispatch()
+            raise
+        finally:
+            waited = time.monotonic() - start
+            self.stats.total_wait_time += waited
+            self.stats.max_wait_time = max(self.stats.max_wait_time, waited)
+            timing = current_timing()
+            if timing is not None:
+                timing.queue_wait += waited
+
+    def correct(self, estimated: float, actual: float) -> None:
+        """根据响应中的实际用量校正令牌桶
+
+        Args:
+            estimated: 请求时估算的令牌数
+            actual: 响应返回的实际令牌数
+        """
+        if self.tokens is None or actual == estimated:
+            return
+        self.tokens.consume(actual - estimated)
+        self.stats.token_corrections += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.to_dict()
+        stats["name"] = self.name
+        stats["queue_depth"] = self.queue_depth
+        stats["requests_available"] = self.requests.available() if self.requests is not None else None
+        stats["tokens_available"] = self.tokens.available() if self.tokens is not None else None
+        return stats
+
+
+# 默认不限流的提供商：本地模拟服务用于离线测试和压测，可用 ai.<provider>.rate_limit 重新启用
+UNLIMITED_PROVIDERS = frozenset(("mock",))
+
+
+@dataclass
+class RateLimitConfig:
+    """限流配置"""
+    enabled: bool = True
+    requests_per_minute: float = 60  # 每分钟请求数上限，0表示不限制
+    tokens_per_minute: float = 0  # 每分钟令牌数上限，0表示不限制
+
+    @classmethod
+    def default(cls, provider: str) -> "RateLimitConfig":
+        """没有配置时提供商的默认限流配置"""
+        return cls(enabled=provider not in UNLIMITED_PROVIDERS)
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager", provider: str) -> "RateLimitConfig":
+        """读取 ai.rate_limit，并用 ai.<provider>.rate_limit 覆盖
+
+        Args:
+            config: 配置管理器实例
+            provider: 提供商名称
+
+        Returns:
+            限流配置
+        """
+        defaults = cls.default(provider)
+        settings = dict(config.get("ai.rate_limit", {}) or {})
+        if not defaults.enabled:
+            # 全局的 ai.rate_limit.enabled 不作用于默认不限流的提供商
+            settings.pop("enabled", None)
+        settings.update(config.get(f"ai.{provider}.rate_limit", {}) or {})
+        return cls(
+            enabled=bool(settings.get("enabled", defaults.enabled)),
+            requests_per_minute=float(settings.get("requests_per_minute", defaults.requests_per_minute)),
+            tokens_per_minute=float(settings.get("tokens_per_minute", defaults.tokens_per_minute)),
+        )
+
+
+# 进程内按提供商和API密钥共享的限流器
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def limiter_name(provider: str, api_key: str) -> str:
+    """生成限流器名称，API密钥只保留摘要"""
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return f"{provider}:{digest}"
+
+
+def get_rate_limiter(name: str, requests_per_minute: float, tokens_per_minute: float) -> RateLimiter:
+    """获取共享限流器，不存在时创建，限额变化时更新
+
+    Args:
+        name: 限流器名称
+        requests_per_minute: 每分钟请求数上限
+        tokens_per_minute: 每分钟令牌数上限
+
+    Returns:
+        限流器
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = RateLimiter(name, requests_per_minute, tokens_per_minute)
+        _limiters[name] = limiter
+    elif (limiter.requests.capacity if limiter.requests else 0) != requests_per_minute or \
+            (limiter.tokens.capacity if limiter.tokens else 0) != tokens_per_minute:
+        limiter.configure(requests_per_minute, tokens_per_minute)
+    return limiter
@@ -0,0 +1,423 @@
+"""
+响应缓存模块
+
+为 generate_command 提供两级缓存：
+第一级为带TTL的内存LRU，第二级为基于SQLite的持久化存储，
+可在CLI与Web服务器重启后继续命中。
+"""
+
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# 用户输入末尾可忽略的标点
+_TRAILING_PUNCTUATION = "。.？?！!；;，,"
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(user_input: str, lower: bool = True) -> str:
+    """规范化用户输入，使语义相同的请求得到相同的键
+
+    Args:
+        user_input: 用户输入
+        lower: 是否转换为小写，需要保留路径等参数原样时传False
+
+    Returns:
+        规范化后的文本
+    """
+    text = user_input.strip()
+    if lower:
+        text = text.lower()
+    text = _WHITESPACE.sub(" ", text)
+    return text.rstrip(_TRAILING_PUNCTUATION).strip()
+
+
+def fingerprint(data: Any) -> str:
+    """计算任意可序列化数据的稳定指纹
+
+    Args:
+        data: 要计算指纹的数据
+
+    Returns:
+        16位十六进制指纹
+    """
+    serialized = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(user_input: str, system_info: Dict[str, Any], provider: str,
+                   model: str, temperature: float, prompt_version: str,
+                   history: Optional[List[Dict[str, str]]] = None) -> str:
+    """生成缓存键
+
+    Args:
+        user_input: 用户输入
+        system_info: 系统信息
+        provider: 提供商名称
+        model: 模型名称
+        temperature: 温度参数
+        prompt_version: 提示模板指纹
+        history: 发送给模型的历史消息，依赖上下文的追问（"对 /tmp 也这样做"）不能共用无历史的结果
+
+    Returns:
+        缓存键
+    """
+    parts = [
+        normalize_input(user_input),
+        fingerprint(system_info),
+        provider,
+        model,
+        f"{temperature:.3f}",
+        prompt_version,
+    ]
+    if history:
+        # 无历史时不追加，键与之前保持一致
+        parts.append(fingerprint(history))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """缓存统计信息"""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    bypassed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        data["hit_ratio"] = (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        return data
+
+
+class MemoryLRU:
+    """带TTL的有界内存LRU"""
+
+    def __init__(self, max_entries: int, stats: CacheStats):
+        """初始化内存LRU
+
+        Args:
+            max_entries: 最大条目数
+            stats: 共享的统计信息
+        """
+        self.max_entries = max_entries
+        self.stats = stats
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取条目，过期条目会被移除"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.time():
+            del self._data[key]
+            self.stats.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        """写入条目，超出容量时淘汰最久未使用的条目"""
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """基于SQLite的持久化缓存存储"""
+
+    def __init__(self, path: Union[str, Path], max_entries: int, stats: CacheStats):
+        """初始化SQLite存储
+
+        Args:
+            path: 数据库文件路径
+            max_entries: 最大条目数
+            stats: 共享的统计信息
+        """
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """读取条目
+
+        Returns:
+            (过期时间, 值)，不存在或已过期时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= time.time():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expirations += 1
+                return None
+        return expires_at, json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float,
+            provider: str, model: str, prompt_version: str) -> None:
+        """写入条目，超出容量时删除最早写入的条目"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, provider, model, prompt_version, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, prompt_version,
+                 json.dumps(value, ensure_ascii=False), time.time(), expires_at)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.stats.evictions += overflow
+            self._conn.commit()
+
+    def purge(self, provider: Optional[str] = None, model: Optional[str] = None,
+              keep_prompt_version: Optional[str] = None) -> int:
+        """按条件删除条目
+
+        Args:
+            provider: 仅删除该提供商的条目
+            model: 仅删除该模型的条目
+            keep_prompt_version: 保留该提示模板版本，删除其余版本
+
+        Returns:
+            删除的条目数
+        """
+        clauses = []
+        params = []
+        if provider is not None:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if keep_prompt_version is not None:
+            clauses.append("prompt_version != ?")
+            params.append(keep_prompt_version)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM responses{where}", params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """两级响应缓存"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 86400,
+                 path: Optional[Union[str, Path]] = None, max_disk_entries: int = 10000):
+        """初始化响应缓存
+
+        Args:
+            max_entries: 内存缓存的最大条目数
+            ttl: 条目有效期（秒）
+            path: SQLite数据库路径，为None时仅使用内存缓存
+            max_disk_entries: 持久化缓存的最大条目数
+        """
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.memory = MemoryLRU(max_entries, self.stats)
+        self.disk: Optional[SQLiteStore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if path:
+            try:
+                self.disk = SQLiteStore(path, max_disk_entries, self.stats)
+                # SQLite访问放在单线程执行器中，避免阻塞事件循环
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ata-cache")
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"无法打开持久化缓存，仅使用内存缓存: {str(e)}")
+                self.disk = None
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> Optional["ResponseCache"]:
+        """根据配置创建响应缓存
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            响应缓存，配置禁用时返回None
+        """
+        cache_config = config.get("ai.cache", {}) or {}
+        if not cache_config.get("enabled", True):
+            return None
+        path = cache_config.get("path", "~/.ata/response_cache.db")
+        if not cache_config.get("persistent", True):
+            path = None
+        return cls(
+            max_entries=int(cache_config.get("max_entries", 256)),
+            ttl=float(cache_config.get("ttl", 86400)),
+            path=path,
+            max_disk_entries=int(cache_config.get("max_disk_entries", 10000)),
+        )
+
+    async def _run(self, func, *args):
+        """在缓存专用线程中执行SQLite操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应，未命中时返回None
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats.memory_hits += 1
+            return dict(value)
+
+        if self.disk is not None:
+            try:
+                item = await self._run(self.disk.get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"读取持久化缓存失败: {str(e)}")
+                item = None
+            if item is not None:
+                expires_at, value = item
+                self.stats.disk_hits += 1
+                self.memory.set(key, value, expires_at)
+                return dict(value)
+
+        self.stats.misses += 1
+        return None
+
+    async def contains(self, key: str) -> bool:
+        """检查是否存在未过期的条目，不计入命中统计（供预取等后台任务使用）"""
+        if self.memory.get(key) is not None:
+            return True
+        if self.disk is not None:
+            try:
+                return await self._run(self.disk.get, key) is not None
+            except sqlite3.Error as e:
+                logger.warning(f"读取持久化缓存失败: {str(e)}")
+        return False
+
+    async def set(self, key: str, value: Dict[str, Any], provider: str,
+                  model: str, prompt_version: str) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 响应数据
+            provider: 提供商名称
+            model: 模型名称
+            prompt_version: 提示模板指纹
+        """
+        expires_at = time.time() + self.ttl
+        self.memory.set(key, dict(value), expires_at)
+        self.stats.writes += 1
+        if self.disk is not None:
+            try:
+                await self._run(self.disk.set, key, value, expires_at,
+                                provider, model, prompt_version)
+            except sqlite3.Error as e:
+                logger.warning(f"写入持久化缓存失败: {str(e)}")
+
+    def record_bypass(self) -> None:
+        """记录一次绕过缓存的请求"""
+        self.stats.bypassed += 1
+
+    async def invalidate(self, provider: Optional[str] = None, model: Optional[str] = None,
+                         keep_prompt_version: Optional[str] = None) -> int:
+        """使缓存失效
+
+        内存缓存会被整体清空；持久化缓存按条件删除。
+
+        Args:
+            provider: 仅删除该提供商的条目
+            model: 仅删除该模型的条目
+            keep_prompt_version: 保留该提示模板版本，删除其余版本
+
+        Returns:
+            持久化缓存中删除的条目数
+        """
+        self.memory.clear()
+        if self.disk is None:
+            return 0
+        removed = await self._run(self.disk.purge, provider, model, keep_prompt_version)
+        if removed:
+            logger.info(f"已清除{removed}条过期的持久化缓存")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        stats = self.stats.to_dict()
+        stats["memory_entries"] = len(self.memory)
+        stats["persistent"] = self.disk is not None
+        return stats
+
+    def close(self) -> None:
+        """关闭缓存"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
@@ -0,0 +1,328 @@
+"""
+重试与熔断模块
+
+提供带全抖动指数退避、支持 Retry-After 和总等待预算的重试策略，
+以及进程内按提供商共享的熔断器（关闭/打开/半开）。
+"""
+
+import time
+import socket
+import random
+import asyncio
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, TYPE_CHECKING
+
+import aiohttp
+
+from .exceptions import APIError, CircuitOpenError
+from .timing import current_timing
+
+if TYPE_CHECKING:
+    from .config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 可重试的网络层异常
+NETWORK_ERRORS = (aiohttp.ClientError, socket.gaierror, asyncio.TimeoutError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头
+
+    Args:
+        value: 响应头的值，可以是秒数或HTTP日期
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetryStats:
+    """重试统计信息"""
+    calls: int = 0  # 调用次数
+    retries: int = 0  # 重试次数
+    gave_up: int = 0  # 用尽重试次数或预算后放弃的次数
+    rejected: int = 0  # 被熔断器拒绝的次数
+    total_delay: float = 0.0  # 累计退避等待时间（秒）
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+@dataclass
+class RetryPolicy:
+    """重试策略
+
+    退避时间取 [0, min(max_delay, base_delay * 2^attempt)] 之间的随机值（全抖动），
+    服务端给出 Retry-After 时至少等待该时长；累计等待超过 budget 时不再重试。
+    """
+    max_retries: int = 3  # 最大重试次数
+    base_delay: float = 0.5  # 退避基准时间（秒）
+    max_delay: float = 20.0  # 单次退避上限（秒）
+    budget: float = 30.0  # 单次调用的累计等待预算（秒）
+    retry_statuses: Tuple[int, ...] = (408, 429, 500, 502, 503, 504)  # 可重试的HTTP状态码
+
+    def __post_init__(self):
+        self.stats = RetryStats()
+
+    @classmethod
+    def from_config(cls, config: "ConfigManager") -> "RetryPolicy":
+        """从配置管理器读取重试策略
+
+        Args:
+            config: 配置管理器实例
+
+        Returns:
+            重试策略
+        """
+        retry_config = config.get("ai.retry", {}) or {}
+        defaults = cls()
+        return cls(
+            max_retries=int(retry_config.get("max_retries", defaults.max_retries)),
+            base_delay=float(retry_config.get("base_delay", defaults.base_delay)),
+            max_delay=float(retry_config.get("max_delay", defaults.max_delay)),
+            budget=float(retry_config.get("budget", defaults.budget)),
+            retry_statuses=tuple(retry_config.get("retry_statuses", defaults.retry_statuses)),
+        )
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """判断异常是否值得重试"""
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, APIError):
+            return error.status in self.retry_statuses
+        return isinstance(error, NETWORK_ERRORS)
+
+    def next_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """计算第 attempt 次重试前的等待时间
+
+        Args:
+            attempt: 已失败的次数（从0开始）
+            retry_after: 服务端建议的等待时间
+
+        Returns:
+            等待秒数
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(self,
+                  func: Callable[[], Awaitable[T]],
+                  breaker: Optional["CircuitBreaker"] = None,
+                  label: str = "API",
+                  acquire: Optional[Callable[[], Awaitable[Any]]] = None) -> T:
+        """按策略执行调用
+
+        Args:
+            func: 发起一次调用的协程工厂
+            breaker: 熔断器，为None时不做熔断
+            label: 日志中使用的名称
+            acquire: 每次尝试前等待的协程工厂（例如获取限流额度），在熔断器检查之前执行，
+                排队期间不占用半开状态的试探名额
+
+        Returns:
+            调用结果
+
+        Raises:
+            CircuitOpenError: 熔断器处于打开状态
+            Exception: 不可重试或重试耗尽时抛出最后一次的异常
+        """
+        self.stats.calls += 1
+        timing = current_timing()
+        waited = 0.0
+        attempt = 0
+        while True:
+            if acquire is not None:
+                await acquire()
+            if breaker is not None:
+                try:
+                    breaker.before_call()
+                except CircuitOpenError:
+                    self.stats.rejected += 1
+                    raise
+            if timing is not None:
+                timing.attempts += 1
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            except Exception as e:
+                retryable = self.is_retryable(e)
+                if breaker is not None:
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        # 服务端有响应（例如401），说明提供商本身可用
+                        breaker.record_success()
+                if not retryable:
+                    raise
+                if attempt >= self.max_retries or (breaker is not None and breaker.state == CircuitBreaker.OPEN):
+                    self.stats.gave_up += 1
+                    raise
+                delay = self.next_delay(attempt, getattr(e, "retry_after", None))
+                if waited + delay > self.budget:
+                    logger.warning(f"{label}重试等待预算已用尽，放弃重试: {str(e)}")
+                    self.stats.gave_up += 1
+                    raise
+                attempt += 1
+                waited += delay
+                self.stats.retries += 1
+                self.stats.total_delay += delay
+                if timing is not None:
+                    timing.retries += 1
+                logger.warning(f"{label}请求失败，将在{delay:.2f}秒后重试 ({attempt}/{self.max_retries}): {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return self.stats.to_dict()
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到 failure_threshold 次后打开，期间所有请求立即失败；
+    经过 recovery_timeout 秒后进入半开状态，只放行一个试探请求，
+    成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """初始化熔断器
+
+        Args:
+            name: 熔断器名称（通常为提供商及其端点）
+            failure_threshold: 打开熔断器所需的连续失败次数
+            recovery_timeout: 打开后进入半开状态前的等待时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opens = 0  # 打开次数
+        self.rejected = 0  # 被拒绝的请求数
+
+    @property
+    def state(self) -> str:
+        """当前状态，打开超时后自动转为半开"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """请求发出前检查是否放行
+
+        Raises:
+            CircuitOpenError: 熔断器打开或半开状态下已有试探请求
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"{self.name}暂时不可用（熔断中），请稍后重试", retry_after=retry_after)
+
+    def record_success(self) -> None:
+        """记录一次成功"""
+        if self._state != self.CLOSED:
+            logger.info(f"熔断器关闭: {self.name}")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """记录一次失败"""
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold):
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self.opens += 1
+            logger.warning(f"熔断器打开: {self.name}（连续失败{self._failures}次）")
+
+    def release(self) -> None:
+        """请求被取消时释放半开状态的试探名额"""
+        self._trial_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+# 进程内共享的熔断器
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str,
+                failure_threshold: Optional[int] = None,
+                recovery_timeout: Optional[float] = None) -> CircuitBreaker:
+    """获取指定名称的共享熔断器，不存在时创建
+
+    Args:
+        name: 熔断器名称
+        failure_threshold: 连续失败阈值，指定时更新已有熔断器
+        recovery_timeout: 恢复等待时间，指定时更新已有熔断器
+
+    Returns:
+        熔断器
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name)
+        _breakers[name] = breaker
+    if failure_threshold is not None:
+        breaker.failure_threshold = int(failure_threshold)
+    if recovery_timeout is not None:
+        breaker.recovery_timeout = float(recovery_timeout)
+    return breaker
+
+
+def reset_breakers() -> None:
+    """清除所有共享熔断器"""
+    _breakers.clear()
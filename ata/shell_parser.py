@@ -0,0 +1,395 @@
+"""
+Shell命令解析模块
+
+把POSIX shell命令解析为结构：脚本由用 ; && || & 换行 分隔的管道组成，
+管道由简单命令组成，简单命令包含变量赋值、参数和重定向。
+参数去掉引号和转义后得到实际的值（r''m 即 rm），
+$(...)、`...`、<(...) 和 >(...) 中的命令被递归解析。
+
+只做安全检查所需的静态分析，不展开变量、通配符和别名。
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple, Union
+
+# 不含引号、转义、替换和操作符的连续字符
+_PLAIN = re.compile(r"[^\s|&;()<>'\"\\$`#]+")
+# 双引号中不需要特殊处理的连续字符
+_DQ_PLAIN = re.compile(r'[^"\\$`]+')
+_ASSIGNMENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\[[^\]]*\])?\+?=")
+
+# 跳过空白后一次匹配常见词法单元：注释、重定向、操作符、不含引号和替换的整个参数；
+# 都不匹配时（lastgroup 为 None）由 _read_word 逐段读取参数
+_FAST_TOKEN = re.compile(r"""
+    [^\S\n]*
+    (?:
+        (?P<comment>\#[^\n]*)
+      | (?P<redirect>(?:\d+|&)?(?:>>|>\||>&|<<<|<<-|<<|<>|<&|>(?!\()|<(?!\()))
+      | (?P<op>&&|\|\||;;|\|&|[|&;()\n])
+      | (?P<plain>[^\s|&;()<>'"\\$`\#][^\s|&;()<>'"\\$`]*)(?![^\s|&;()<>])
+    )?
+""", re.VERBOSE)
+
+_SEPARATORS = frozenset((";", ";;", "&", "&&", "||", "\n"))
+_PIPES = frozenset(("|", "|&"))
+
+# 出现在命令开头时不是命令名的保留字
+RESERVED_WORDS = frozenset((
+    "!", "{", "}", "if", "then", "else", "elif", "fi", "do", "done",
+    "while", "until", "for", "case", "esac", "time", "function",
+))
+
+
+class ShellSyntaxError(ValueError):
+    """命令无法解析（引号或括号未闭合等）"""
+    pass
+
+
+@dataclass
+class Word:
+    """一个参数"""
+    raw: str  # 原始文本
+    value: str  # 去掉引号和转义后的值，变量和替换保持原样
+    substitutions: List["Script"] = field(default_factory=list)  # 参数中的命令替换
+
+
+@dataclass
+class Redirect:
+    """一个重定向"""
+    op: str  # 重定向操作符，例如 >、>>、2>、&>、<
+    target: Word  # 重定向目标
+
+    @property
+    def writes(self) -> bool:
+        """是否写入目标"""
+        return ">" in self.op and not self.op.endswith("&")
+
+
+@dataclass
+class SimpleCommand:
+    """简单命令，或括号中的子shell（body）"""
+    assignments: List[Word] = field(default_factory=list)
+    words: List[Word] = field(default_factory=list)
+    redirects: List[Redirect] = field(default_factory=list)
+    body: Optional["Script"] = None  # ( ... ) 中的命令
+
+    @property
+    def argv(self) -> List[str]:
+        """参数值列表"""
+        return [word.value for word in self.words]
+
+    @property
+    def name(self) -> str:
+        """命令名（不含路径）"""
+        return os.path.basename(self.words[0].value) if self.words else ""
+
+    def text(self) -> str:
+        """规范化的命令文本：参数值以单个空格连接，后跟重定向"""
+        parts = self.argv
+        parts.extend(f"{redirect.op} {redirect.target.value}" for redirect in self.redirects)
+        return " ".join(parts)
+
+
+@dataclass
+class Pipeline:
+    """管道"""
+    commands: List[SimpleCommand] = field(default_factory=list)
+
+    def text(self) -> str:
+        """规范化的管道文本"""
+        return " | ".join(command.text() for command in self.commands)
+
+
+@dataclass
+class Script:
+    """命令脚本"""
+    pipelines: List[Pipeline] = field(default_factory=list)
+
+    def walk(self) -> Iterator[Pipeline]:
+        """遍历所有管道，包括子shell和命令替换中的管道"""
+        for pipeline in self.pipelines:
+            yield pipeline
+            for command in pipeline.commands:
+                if command.body is not None:
+                    yield from command.body.walk()
+                for word in command.assignments + command.words:
+                    for script in word.substitutions:
+                        yield from script.walk()
+                for redirect in command.redirects:
+                    for script in redirect.target.substitutions:
+                        yield from script.walk()
+
+    def commands(self) -> Iterator[SimpleCommand]:
+        """遍历所有简单命令"""
+        for pipeline in self.walk():
+            yield from pipeline.commands
+
+
+# 词法单元：(类型, 值)，类型为 word、op 或 redirect
+_Token = Tuple[str, Union[str, Word]]
+
+
+def _skip_single(text: str, i: int) -> int:
+    """跳过单引号字符串，i 指向开头引号之后，返回结尾引号之后的位置"""
+    end = text.find("'", i)
+    if end < 0:
+        raise ShellSyntaxError("单引号未闭合")
+    return end + 1
+
+
+def _find_backtick(text: str, i: int) -> int:
+    """返回与 i 之前的反引号配对的反引号位置"""
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "`":
+            return i
+        i += 1
+    raise ShellSyntaxError("反引号未闭合")
+
+
+def _matching_paren(text: str, i: int) -> int:
+    """返回与 i 之前的左括号配对的右括号位置，跳过引号中的括号"""
+    depth = 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "'":
+            i = _skip_single(text, i + 1)
+            continue
+        if c == '"':
+            i = _read_double_quoted(text, i + 1, [], [])
+            continue
+        if c == "`":
+            i = _find_backtick(text, i + 1) + 1
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ShellSyntaxError("括号未闭合")
+
+
+def _read_dollar(text: str, i: int, value: List[str], substitutions: List[str]) -> int:
+    """读取 $ 开头的展开，i 指向 $，返回展开之后的位置"""
+    nxt = text[i + 1:i + 2]
+    if nxt == "(":
+        end = _matching_paren(text, i + 2)
+        substitutions.append(text[i + 2:end])
+    elif nxt == "{":
+        end = text.find("}", i + 2)
+        if end < 0:
+            raise ShellSyntaxError("${ 未闭合")
+    else:
+        value.append("$")
+        return i + 1
+    value.append(text[i:end + 1])
+    return end + 1
+
+
+def _read_double_quoted(text: str, i: int, value: List[str], substitutions: List[str]) -> int:
+    """读取双引号字符串，i 指向开头引号之后，返回结尾引号之后的位置"""
+    n = len(text)
+    while i < n:
+        match = _DQ_PLAIN.match(text, i)
+        if match:
+            value.append(match.group())
+            i = match.end()
+            continue
+        c = text[i]
+        if c == '"':
+            return i + 1
+        if c == "\\":
+            nxt = text[i + 1:i + 2]
+            if nxt in ("$", "`", '"', "\\"):
+                value.append(nxt)
+            elif nxt != "\n":
+                value.append(c + nxt)
+            i += 2
+        elif c == "$":
+            i = _read_dollar(text, i, value, substitutions)
+        elif c == "`":
+            end = _find_backtick(text, i + 1)
+            substitutions.append(text[i + 1:end])
+            value.append(text[i:end + 1])
+            i = end + 1
+    raise ShellSyntaxError("双引号未闭合")
+
+
+def _read_word(text: str, i: int) -> Tuple[str, str, List[str], int]:
+    """读取一个参数
+
+    Returns:
+        (原始文本, 值, 命令替换的原始文本列表, 结束位置)
+    """
+    start = i
+    value: List[str] = []
+    substitutions: List[str] = []
+    n = len(text)
+    while i < n:
+        match = _PLAIN.match(text, i)
+        if match:
+            value.append(match.group())
+            i = match.end()
+            continue
+        c = text[i]
+        if c == "\\":
+            if text[i + 1:i + 2] not in ("", "\n"):
+                value.append(text[i + 1])
+            i += 2
+        elif c == "'":
+            end = _skip_single(text, i + 1)
+            value.append(text[i + 1:end - 1])
+            i = end
+        elif c == '"':
+            i = _read_double_quoted(text, i + 1, value, substitutions)
+        elif c == "$":
+            i = _read_dollar(text, i, value, substitutions)
+        elif c == "`":
+            end = _find_backtick(text, i + 1)
+            substitutions.append(text[i + 1:end])
+            value.append(text[i:end + 1])
+            i = end + 1
+        elif c in "<>" and text[i + 1:i + 2] == "(":
+            # 进程替换
+            end = _matching_paren(text, i + 2)
+            substitutions.append(text[i + 2:end])
+            value.append(text[i:end + 1])
+            i = end + 1
+        elif c == "#" and i > start:
+            # 参数中间的 # 不是注释
+            value.append(c)
+            i += 1
+        else:
+            break
+    return text[start:i], "".join(value), substitutions, min(i, n)
+
+
+def tokenize(text: str) -> List[_Token]:
+    """把命令切分为词法单元
+
+    Raises:
+        ShellSyntaxError: 引号或括号未闭合
+    """
+    tokens: List[_Token] = []
+    i = 0
+    n = len(text)
+    while i < n:
+        match = _FAST_TOKEN.match(text, i)
+        kind = match.lastgroup
+        i = match.end()
+        if kind == "plain":
+            raw = match.group(kind)
+            tokens.append(("word", Word(raw, raw)))
+            continue
+        if kind == "redirect" or kind == "op":
+            tokens.append((kind, match.group(kind)))
+            continue
+        if kind == "comment" or i >= n:
+            continue
+        raw, value, substitutions, i = _read_word(text, i)
+        tokens.append(("word", Word(raw, value, [parse(sub) for sub in substitutions])))
+    return tokens
+
+
+class _Parser:
+    """由词法单元构建脚本结构"""
+
+    def __init__(self, tokens: List[_Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self) -> Optional[_Token]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def script(self, nested: bool = False) -> Script:
+        """解析脚本；nested 为真时解析到配对的右括号为止"""
+        script = Script()
+        while True:
+            token = self._peek()
+            if token is None:
+                if nested:
+                    raise ShellSyntaxError("括号未闭合")
+                return script
+            kind, value = token
+            if kind == "op" and value in _SEPARATORS:
+                self.pos += 1
+            elif kind == "op" and value == ")":
+                if not nested:
+                    raise ShellSyntaxError("多余的右括号")
+                self.pos += 1
+                return script
+            else:
+                script.pipelines.append(self.pipeline())
+
+    def pipeline(self) -> Pipeline:
+        """解析管道"""
+        pipeline = Pipeline([self.command()])
+        while True:
+            token = self._peek()
+            if token is None or token[0] != "op" or token[1] not in _PIPES:
+                return pipeline
+            self.pos += 1
+            pipeline.commands.append(self.command())
+
+    def command(self) -> SimpleCommand:
+        """解析简单命令或子shell"""
+        command = SimpleCommand()
+        token = self._peek()
+        if token == ("op", "("):
+            self.pos += 1
+            command.body = self.script(nested=True)
+        while True:
+            token = self._peek()
+            if token is None:
+                return command
+            kind, value = token
+            if kind == "word":
+                self.pos += 1
+                if command.words or command.body is not None:
+                    command.words.append(value)
+                elif _ASSIGNMENT.match(value.raw):
+                    command.assignments.append(value)
+                elif value.raw not in RESERVED_WORDS:
+                    command.words.append(value)
+            elif kind == "redirect":
+                self.pos += 1
+                target = self._peek()
+                if target is None or target[0] != "word":
+                    raise ShellSyntaxError(f"重定向 {value} 缺少目标")
+                self.pos += 1
+                command.redirects.append(Redirect(value, target[1]))
+            elif value == "(" and len(command.words) == 1 and self.tokens[self.pos + 1:self.pos + 2] == [("op", ")")]:
+                # 函数定义 name() { ...; }，函数名不是命令
+                self.pos += 2
+                command.words.clear()
+            elif value == "(":
+                raise ShellSyntaxError("意外的左括号")
+            else:
+                return command
+
+
+def parse(text: str) -> Script:
+    """解析命令
+
+    Args:
+        text: 命令文本
+
+    Returns:
+        脚本结构
+
+    Raises:
+        ShellSyntaxError: 命令无法解析
+    """
+    return _Parser(tokenize(text)).script()
@@ -0,0 +1,108 @@
+"""
+请求合并模块
+
+将并发到达的相同请求合并为一次上游调用（single-flight），
+所有等待者共享同一个结果。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    """请求合并统计信息"""
+    calls: int = 0  # 总调用次数
+    executions: int = 0  # 实际发起的上游调用次数
+    coalesced: int = 0  # 被合并到已有调用上的次数
+    cancelled_waiters: int = 0  # 主动取消等待的次数
+    abandoned: int = 0  # 因所有等待者离开而取消的上游调用次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """相同键的并发调用只执行一次
+
+    等待者通过 asyncio.shield 等待共享任务，因此取消某个等待者
+    不会影响其他等待者；只有全部等待者都离开时才取消上游调用。
+    """
+
+    def __init__(self):
+        """初始化请求合并器"""
+        self._calls: Dict[str, _Call] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """执行或加入一次调用
+
+        Args:
+            key: 调用键，相同键的并发调用会被合并
+            func: 实际发起调用的协程工厂
+
+        Returns:
+            调用结果
+
+        Raises:
+            Exception: 上游调用抛出的异常会传递给所有等待者
+        """
+        self.stats.calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            self.stats.executions += 1
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, task))
+        else:
+            self.stats.coalesced += 1
+            logger.debug(f"合并进行中的请求: {key[:16]}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            self.stats.cancelled_waiters += 1
+            if call.waiters == 1 and not call.task.done():
+                # 最后一个等待者离开，上游结果已无人需要
+                self.stats.abandoned += 1
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        """调用完成后移除记录并标记异常已被处理"""
+        call = self._calls.get(key)
+        if call is not None and call.task is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # 防止所有等待者都已离开时出现"异常未被获取"的警告
+            task.exception()
+
+    def in_flight(self) -> int:
+        """获取进行中的上游调用数量"""
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.to_dict()
+        stats["in_flight"] = self.in_flight()
+        return stats
@@ -0,0 +1,183 @@
+"""
+Server-Sent Events 解码模块
+
+增量解码 text/event-stream 响应体：按任意字节块输入，
+在复用的字节缓冲区上按行切分并组装事件，跨块拆分的事件、
+多行 data 字段和心跳注释都能正确处理。
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_LF = 0x0A
+_CR = 0x0D
+_COLON = 0x3A
+_SPACE = 0x20
+_DATA = b"data:"
+
+
+class SSEEvent:
+    """一个完整的SSE事件"""
+
+    __slots__ = ("data", "event", "id")
+
+    def __init__(self, data: bytes, event: str = "message", id: Optional[str] = None):
+        self.data = data
+        self.event = event
+        self.id = id
+
+    @property
+    def text(self) -> str:
+        """事件数据的文本形式"""
+        return self.data.decode("utf-8")
+
+    def json(self) -> Any:
+        """将事件数据解析为JSON"""
+        return json.loads(self.data)
+
+    def __repr__(self) -> str:
+        return f"SSEEvent(event={self.event!r}, data={self.data!r}, id={self.id!r})"
+
+
+class SSEDecoder:
+    """增量SSE解码器
+
+    事件数据保留为bytes，json.loads可直接解析，避免额外的解码和拷贝。
+    单行data字段（最常见的情况）不会发生拼接。
+
+    示例:
+        decoder = SSEDecoder()
+        async for chunk in response.content.iter_any():
+            for event in decoder.feed(chunk):
+                ...
+        for event in decoder.close():
+            ...
+    """
+
+    def __init__(self):
+        """初始化解码器"""
+        self._buffer = bytearray()
+        self._data: List[bytes] = []
+        self._event = ""
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+        self.events = 0  # 已产出的事件数
+        self.comments = 0  # 跳过的注释（心跳）行数
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """输入新到达的字节块
+
+        Args:
+            chunk: 响应体字节块
+
+        Returns:
+            本次完成的事件列表
+        """
+        buffer = self._buffer
+        buffer += chunk
+        events: List[SSEEvent] = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_end = end
+            if line_end > start and buffer[line_end - 1] == _CR:
+                line_end -= 1
+            if line_end == start:
+                # 空行：分派事件
+                if self._data:
+                    events.append(self._dispatch())
+                else:
+                    self._event = ""
+            else:
+                self._process_line(buffer, start, line_end)
+            start = end + 1
+        if start:
+            del buffer[:start]
+        return events
+
+    def close(self) -> List[SSEEvent]:
+        """结束输入，处理缺少结尾换行的最后一个事件
+
+        Returns:
+            剩余的事件列表
+        """
+        events: List[SSEEvent] = []
+        buffer = self._buffer
+        if buffer:
+            end = len(buffer)
+            if buffer[end - 1] == _CR:
+                end -= 1
+            if end:
+                self._process_line(buffer, 0, end)
+            buffer.clear()
+        if self._data:
+            events.append(self._dispatch())
+        return events
+
+    def _process_line(self, buffer: bytearray, start: int, end: int) -> None:
+        """处理一行非空内容"""
+        if buffer.startswith(_DATA, start):
+            # 快速路径：data字段
+            value_start = start + 5
+            if value_start < end and buffer[value_start] == _SPACE:
+                value_start += 1
+            self._data.append(bytes(buffer[value_start:end]))
+            return
+        if buffer[start] == _COLON:
+            self.comments += 1
+            return
+
+        colon = buffer.find(b":", start, end)
+        if colon < 0:
+            field = bytes(buffer[start:end])
+            value = b""
+        else:
+            field = bytes(buffer[start:colon])
+            value_start = colon + 1
+            if value_start < end and buffer[value_start] == _SPACE:
+                value_start += 1
+            value = bytes(buffer[value_start:end])
+
+        if field == b"event":
+            self._event = value.decode("utf-8")
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+        elif field == b"data":
+            self._data.append(value)
+        else:
+            logger.debug(f"忽略未知的SSE字段: {field!r}")
+
+    def _dispatch(self) -> SSEEvent:
+        """组装并重置当前事件"""
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        event = SSEEvent(data, self._event or "message", self.last_event_id)
+        self._data = []
+        self._event = ""
+        self.events += 1
+        return event
+
+
+async def iter_events(chunks: AsyncIterable[bytes]) -> AsyncIterator[SSEEvent]:
+    """从字节块流中逐个产出SSE事件
+
+    Args:
+        chunks: 字节块异步迭代器，例如 response.content.iter_any()
+
+    Returns:
+        事件异步生成器
+    """
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for event in decoder.feed(chunk):
+            yield event
+    for event in decoder.close():
+        yield event
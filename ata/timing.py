@@ -0,0 +1,129 @@
+"""
+请求耗时分解模块
+
+通过上下文变量在一次AI调用的各层（限流、连接池、重试、流式解析）
+之间传递耗时记录，无需逐层传参。
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_current_timing: contextvars.ContextVar = contextvars.ContextVar("ata_request_timing", default=None)
+
+
+@dataclass
+class RequestTiming:
+    """一次AI调用的耗时分解，时间单位为秒"""
+    queue_wait: float = 0.0  # 客户端限流排队时间
+    dns: float = 0.0  # DNS解析时间
+    connect: float = 0.0  # 建立新连接的时间（含TLS），复用连接时为0
+    time_to_first_byte: Optional[float] = None  # 发出请求到收到响应头
+    time_to_first_token: Optional[float] = None  # 开始到第一个内容片段（流式）
+    parse: float = 0.0  # 响应清理和JSON解析时间
+    total: float = 0.0  # 总耗时
+    attempts: int = 0  # HTTP请求次数
+    retries: int = 0  # 重试次数
+    prompt_tokens: Optional[int] = None  # 提示令牌数（有用量时为实际值，否则为估算值）
+    completion_tokens: Optional[int] = None  # 生成令牌数
+    cached: bool = False  # 是否命中响应缓存
+
+    def __post_init__(self):
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        """自开始以来经过的时间"""
+        return time.monotonic() - self.started
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        """根据调用结果补全总耗时和令牌数"""
+        self.total = self.elapsed()
+        self.cached = bool(result.get("cached", False))
+        usage = result.get("usage")
+        if usage:
+            self.prompt_tokens = usage.get("prompt_tokens")
+            self.completion_tokens = usage.get("completion_tokens")
+        elif self.prompt_tokens is None:
+            self.prompt_tokens = result.get("prompt_tokens")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，时间保留到毫秒"""
+        return {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in asdict(self).items()
+        }
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """获取当前上下文中正在记录的耗时，没有时返回None"""
+    return _current_timing.get()
+
+
+@contextmanager
+def track_timing() -> Iterator[RequestTiming]:
+    """在上下文中记录一次调用的耗时
+
+    示例:
+        with track_timing() as timing:
+            result = await provider.generate_command(...)
+        timing.finish(result)
+    """
+    timing = RequestTiming()
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(token)
+
+
+def begin_timing() -> Tuple[RequestTiming, contextvars.Token]:
+    """开始记录耗时，供无法使用 with 语句的异步生成器使用
+
+    Returns:
+        (耗时记录, 用于 end_timing 的令牌)
+    """
+    timing = RequestTiming()
+    return timing, _current_timing.set(timing)
+
+
+def end_timing(token: contextvars.Token) -> None:
+    """结束 begin_timing 开始的记录"""
+    try:
+        _current_timing.reset(token)
+    except ValueError:
+        # 生成器在其他上下文中被关闭，记录已随原上下文失效
+        pass
+
+
+def format_timing(timing: Dict[str, Any], execution: Optional[float] = None) -> str:
+    """格式化为一行简短的耗时摘要
+
+    Args:
+        timing: RequestTiming.to_dict() 的结果
+        execution: 命令执行耗时（秒）
+
+    Returns:
+        摘要文本
+    """
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    parts = [f"AI {ms(timing.get('total'))}"]
+    if timing.get("cached"):
+        parts.append("缓存命中")
+    else:
+        parts += [
+            f"排队 {ms(timing.get('queue_wait'))}",
+            f"连接 {ms((timing.get('dns') or 0) + (timing.get('connect') or 0))}",
+            f"首字节 {ms(timing.get('time_to_first_byte'))}",
+            f"首令牌 {ms(timing.get('time_to_first_token'))}",
+            f"解析 {ms(timing.get('parse'))}",
+            f"重试 {timing.get('retries', 0)}",
+        ]
+    if timing.get("prompt_tokens") is not None:
+        parts.append(f"令牌 {timing.get('prompt_tokens')}/{timing.get('completion_tokens') or '-'}")
+    if execution is not None:
+        parts.append(f"执行 {ms(execution)}")
+    return " | ".join(parts)
@@ -7,20 +7,27 @@ import json
 import logging
 import html
 import re
+import uuid
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 from datetime import datetime
 
-from quart import Quart, request, jsonify, send_from_directory
+from quart import Quart, Response, g, request, jsonify, send_from_directory
 from quart_cors import cors
 
 from .ai_interface import AIInterface
-from .command_executor import CommandExecutor
+from .command_executor import CommandExecutor, CommandResult
 from .config_manager import ConfigManager
+from .exceptions import CommandExecutionError
 from .system_monitor import SystemMonitor
 
 logger = logging.getLogger(__name__)
 
+# 会话ID可由客户端通过请求头指定，否则使用Cookie，首次访问时分配
+SESSION_HEADER = "X-Session-ID"
+SESSION_COOKIE = "ata_session"
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
 class WebServer:
     """Web服务器类"""
     
@@ -97,9 +104,79 @@ class WebServer:
             "timestamp": datetime.now().isoformat()
         }
     
+    @staticmethod
+    def _capture_info(result: CommandResult) -> Dict[str, Any]:
+        """执行结果中的输出大小和截断信息，截断时可通过 /api/output/<output_id> 读取完整输出"""
+        return {
+            "stdout_bytes": result.stdout_bytes,
+            "stderr_bytes": result.stderr_bytes,
+            "truncated": result.truncated,
+            "output_id": result.output_id
+        }
+    
+    @staticmethod
+    async def _json_body() -> Dict[str, Any]:
+        """读取JSON请求体，请求体为空、不是JSON或不是对象时返回空字典"""
+        data = await request.get_json(silent=True)
+        return data if isinstance(data, dict) else {}
+    
+    def _stream_execution(self, command: str, events: List[Dict[str, Any]],
+                          user_input: Optional[str] = None) -> Response:
+        """流式执行命令，以NDJSON逐行返回输出块
+        
+        事件格式同 CommandExecutor.stream，出错时以 error 事件结束。响应体由生成器按需产出，
+        客户端读取缓慢时执行器停止读取管道，服务端只缓存有限的输出块；客户端断开时终止命令。
+        
+        Args:
+            command: 要执行的命令
+            events: 在命令输出之前返回的事件
+            user_input: 生成该命令的用户输入，执行成功后据此预取后续请求
+        
+        Returns:
+            NDJSON响应
+        """
+        session_id = g.session_id
+        
+        async def generate():
+            for event in events:
+                yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+            try:
+                async for event in self.command_executor.stream(command):
+                    yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+                    if (event["type"] == "exit" and event["success"] and user_input
+                            and self.ai_interface.prefetcher is not None):
+                        self.ai_interface.prefetcher.on_executed(user_input, command, session_id=session_id)
+            except Exception as e:
+                logger.error(f"流式执行命令失败: {str(e)}")
+                yield (json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n").encode("utf-8")
+        
+        return Response(generate(), mimetype="application/x-ndjson")
+    
+    def _resolve_session(self) -> Dict[str, Any]:
+        """从请求头或Cookie中解析会话ID，没有有效ID时分配新ID
+        
+        新ID的对话历史先保存为临时会话，客户端回传该ID后才转为正式会话。
+        """
+        for candidate in (request.headers.get(SESSION_HEADER), request.cookies.get(SESSION_COOKIE)):
+            if candidate and _SESSION_ID_PATTERN.match(candidate):
+                return {"id": candidate, "new": False}
+        return {"id": uuid.uuid4().hex, "new": True}
+    
     def _setup_routes(self):
         """设置路由"""
         
+        @self.app.before_request
+        async def load_session():
+            session = self._resolve_session()
+            g.session_id = session["id"]
+            g.new_session = session["new"]
+        
+        @self.app.after_request
+        async def save_session(response):
+            if getattr(g, "new_session", False):
+                response.set_cookie(SESSION_COOKIE, g.session_id, httponly=True, samesite="Lax")
+            return response
+        
         @self.app.route('/')
         async def index():
             web_dir = self.project_root / 'web'
@@ -182,8 +259,10 @@ class WebServer:
                 # 保存配置
                 self.config.save()
                 
-                # 重新初始化AI接口
+                # 重新初始化AI接口，并释放旧接口持有的连接池引用
+                old_interface = self.ai_interface
                 self.ai_interface = AIInterface(self.config)
+                await old_interface.close()
                 
                 return jsonify({"status": "success"})
             except Exception as e:
@@ -213,7 +292,9 @@ class WebServer:
                     }), 400
                 
                 # 执行命令
-                result = self.command_executor.execute(command)
+                result = await self.command_executor.execute_async(
+                    command, timeout=self.command_executor.command_timeout or None
+                )
                 
                 # 格式化输出
                 formatted_output = []
@@ -235,7 +316,9 @@ class WebServer:
                     "success": result.success,
                     "output": formatted_output,
                     "exit_code": result.exit_code,
-                    "duration": result.duration
+                    "duration": result.duration,
+                    "timing": {"execution": round(result.duration, 3)},
+                    **self._capture_info(result)
                 })
                 
             except Exception as e:
@@ -260,7 +343,13 @@ class WebServer:
 
                 # 首先通过AI接口处理自然语言输入
                 try:
-                    command = await self.ai_interface.chat(user_input)
+                    ai_result = await self.ai_interface.chat_detailed(
+                        user_input,
+                        bypass_cache=bool(data.get("bypass_cache", False)),
+                        session_id=g.session_id,
+                        provisional=g.new_session
+                    )
+                    command = ai_result.get("command", "")
                     logger.info(f"AI转换结果 - 输入: {user_input}, 输出: {command}")
                 except Exception as e:
                     logger.error(f"AI处理失败: {str(e)}")
@@ -294,7 +383,13 @@ class WebServer:
                     }), 400
                 
                 # 执行命令
-                result = self.command_executor.execute(command)
+                result = await self.command_executor.execute_async(
+                    command, timeout=self.command_executor.command_timeout or None
+                )
+                
+                # 执行成功后在后台预取可能的后续请求
+                if result.success and self.ai_interface.prefetcher is not None:
+                    self.ai_interface.prefetcher.on_executed(user_input, command, session_id=g.session_id)
                 
                 # 添加命令输出
                 if result.stdout:
@@ -310,11 +405,15 @@ class WebServer:
                     "timestamp": datetime.now().isoformat()
                 })
 
+                timing = dict(ai_result.get("timing") or {})
+                timing["execution"] = round(result.duration, 3)
                 return jsonify({
                     "success": result.success,
                     "output": formatted_output,
                     "exit_code": result.exit_code,
-                    "duration": result.duration
+                    "duration": result.duration,
+                    "timing": timing,
+                    **self._capture_info(result)
                 })
                 
             except Exception as e:
@@ -328,14 +427,89 @@ class WebServer:
                     }]
                 }), 400
         
+        @self.app.route('/api/execute-raw/stream', methods=['POST'])
+        async def execute_raw_stream():
+            """直接执行原始命令，以NDJSON实时返回输出"""
+            data = await self._json_body()
+            command = data.get("command")
+            if not command:
+                return jsonify({"error": "命令不能为空"}), 400
+            
+            is_dangerous, warnings = self.command_executor.is_dangerous(command)
+            if is_dangerous and not data.get("force", False):
+                return jsonify({"error": "危险命令", "warnings": warnings}), 400
+            
+            return self._stream_execution(command, [])
+        
+        @self.app.route('/api/execute/stream', methods=['POST'])
+        async def execute_stream():
+            """通过AI生成命令并执行，以NDJSON实时返回输出
+            
+            第一个事件为 command 事件，包含转换后的命令，随后是命令输出。
+            """
+            data = await self._json_body()
+            user_input = data.get("command")
+            if not user_input:
+                return jsonify({"error": "命令不能为空"}), 400
+            
+            try:
+                ai_result = await self.ai_interface.chat_detailed(
+                    user_input,
+                    bypass_cache=bool(data.get("bypass_cache", False)),
+                    session_id=g.session_id,
+                    provisional=g.new_session
+                )
+            except Exception as e:
+                logger.error(f"AI处理失败: {str(e)}")
+                return jsonify({"error": f"AI无法理解您的输入: {str(e)}"}), 400
+            command = ai_result.get("command", "")
+            
+            is_dangerous, warnings = self.command_executor.is_dangerous(command)
+            if is_dangerous and not data.get("force", False):
+                return jsonify({"error": "危险命令", "command": command, "warnings": warnings}), 400
+            
+            return self._stream_execution(command, [{
+                "type": "command",
+                "command": command,
+                "timing": ai_result.get("timing")
+            }], user_input=user_input)
+        
+        @self.app.route('/api/output/<output_id>')
+        async def read_output(output_id):
+            """分页读取被截断命令的完整输出
+            
+            查询参数: stream（stdout或stderr）、offset（字节偏移）、limit（字节数，最大1MB）
+            """
+            stream = request.args.get("stream", "stdout")
+            if stream not in ("stdout", "stderr"):
+                return jsonify({"error": "stream必须是stdout或stderr"}), 400
+            try:
+                offset = int(request.args.get("offset", 0))
+                limit = min(int(request.args.get("limit", 64 * 1024)), 1024 * 1024)
+            except ValueError:
+                return jsonify({"error": "offset和limit必须是整数"}), 400
+            try:
+                page = self.command_executor.read_output(output_id, stream, offset, limit)
+            except CommandExecutionError as e:
+                return jsonify({"error": str(e)}), 404
+            return jsonify(page)
+        
         @self.app.route('/api/history')
         async def history():
             try:
-                history = self.ai_interface.get_history()
-                return jsonify({"history": history})
+                # 先从持久化存储恢复会话
+                await self.ai_interface.conversations.load(g.session_id)
+                history = self.ai_interface.get_history(g.session_id)
+                return jsonify({"history": history, "session_id": g.session_id})
             except Exception as e:
                 logger.error(f"处理历史记录请求时出错: {str(e)}")
                 return jsonify({"error": str(e)}), 400
+        
+        @self.app.route('/api/history', methods=['DELETE'])
+        async def clear_history():
+            """清除当前会话的对话历史"""
+            await self.ai_interface.clear_history(g.session_id)
+            return jsonify({"success": True, "session_id": g.session_id})
 
         @self.app.route('/api/test-connection', methods=['POST'])
         async def test_connection():
@@ -412,6 +586,79 @@ class WebServer:
                 logger.error(f"获取系统信息失败: {str(e)}")
                 return jsonify({"error": str(e)}), 400
 
+        @self.app.route('/api/ai/stream', methods=['POST'])
+        async def ai_stream():
+            """流式生成命令，以NDJSON逐行返回事件"""
+            data = await self._json_body()
+            user_input = data.get("command")
+            if not user_input:
+                return jsonify({"error": "命令不能为空"}), 400
+            session_id = g.session_id
+            provisional = g.new_session
+            
+            async def generate():
+                try:
+                    async for event in self.ai_interface.chat_stream(
+                        user_input,
+                        bypass_cache=bool(data.get("bypass_cache", False)),
+                        session_id=session_id,
+                        provisional=provisional
+                    ):
+                        yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+                except Exception as e:
+                    logger.error(f"流式生成命令失败: {str(e)}")
+                    yield (json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n").encode("utf-8")
+            
+            return Response(generate(), mimetype="application/x-ndjson")
+
+        @self.app.route('/api/ai/batch', methods=['POST'])
+        async def ai_batch():
+            """批量生成命令，按完成顺序以NDJSON逐行返回结果
+            
+            条目数不能超过 ai.batch_max_inputs，并发数不超过 ai.batch_concurrency。
+            """
+            data = await self._json_body()
+            inputs = data.get("inputs")
+            if not isinstance(inputs, list) or not inputs or not all(isinstance(i, str) for i in inputs):
+                return jsonify({"error": "inputs必须是非空的字符串列表"}), 400
+            max_inputs = int(self.config.get("ai.batch_max_inputs", 100))
+            if len(inputs) > max_inputs:
+                return jsonify({"error": f"inputs最多{max_inputs}条"}), 400
+            
+            # 在返回响应之前校验参数，流开始后无法再返回400
+            max_concurrency = max(1, int(self.config.get("ai.batch_concurrency", 5)))
+            try:
+                concurrency = int(data.get("concurrency") or max_concurrency)
+            except (TypeError, ValueError):
+                concurrency = 0
+            if concurrency < 1:
+                return jsonify({"error": "concurrency必须是正整数"}), 400
+            concurrency = min(concurrency, max_concurrency)
+            
+            async def generate():
+                async for item in self.ai_interface.generate_commands_batch(
+                    inputs,
+                    concurrency=concurrency,
+                    bypass_cache=bool(data.get("bypass_cache", False))
+                ):
+                    yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+            
+            return Response(generate(), mimetype="application/x-ndjson")
+
+        @self.app.route('/api/ai/metrics')
+        async def ai_metrics():
+            """获取AI层运行指标"""
+            try:
+                return jsonify(self.ai_interface.get_metrics())
+            except Exception as e:
+                logger.error(f"获取AI指标失败: {str(e)}")
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.after_serving
+        async def shutdown():
+            """服务停止时关闭AI接口"""
+            await self.ai_interface.close()
+
         @self.app.route('/api/ai/execute', methods=['POST'])
         async def ai_execute():
             """执行AI命令"""
@@ -421,8 +668,17 @@ class WebServer:
                 if not command:
                     return jsonify({"error": "命令不能为空"}), 400
                 
-                response = await self.ai_interface.chat(command)
-                return jsonify({"response": response})
+                result = await self.ai_interface.chat_detailed(
+                    command,
+                    bypass_cache=bool(data.get("bypass_cache", False)),
+                    session_id=g.session_id,
+                    provisional=g.new_session
+                )
+                return jsonify({
+                    "response": result.get("command", ""),
+                    "provider": result.get("provider"),
+                    "timing": result.get("timing")
+                })
             except Exception as e:
                 logger.error(f"执行AI命令失败: {str(e)}")
                 return jsonify({"error": str(e)}), 500
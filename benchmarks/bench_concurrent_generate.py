@@ -0,0 +1,79 @@
+"""
+并发生成命令基准测试
+
+启动一个带固定延迟的本地OpenAI兼容桩服务，比较N个 generate_command
+顺序执行与并发执行的耗时。并发执行应在约一个往返时间内完成。
+
+用法:
+    python -m benchmarks.bench_concurrent_generate --requests 20 --latency 0.5
+"""
+
+import json
+import time
+import asyncio
+import argparse
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ata.ai_interface import OpenAIProvider
+from ata.http_pool import HTTPConnectionPool, PoolConfig
+
+COMMAND_JSON = json.dumps({"command": "df -h", "explanation": "查看磁盘使用情况", "warnings": []})
+
+
+async def start_stub(latency: float) -> TestServer:
+    """启动本地桩服务"""
+    async def handler(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": COMMAND_JSON}}]
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+async def run(requests: int, latency: float) -> None:
+    server = await start_stub(latency)
+    pool = HTTPConnectionPool(PoolConfig(limit_per_host=requests))
+    provider = OpenAIProvider(
+        api_key="bench",
+        pool=pool,
+        api_url=str(server.make_url("/v1/chat/completions"))
+    )
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            await provider.generate_command(f"task {i}", system_info={})
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            provider.generate_command(f"task {i}", system_info={}) for i in range(requests)
+        ])
+        concurrent = time.perf_counter() - start
+
+        print(f"请求数: {requests}, 单次往返延迟: {latency:.3f}s")
+        print(f"顺序执行: {sequential:.3f}s ({sequential / latency:.1f} 个往返)")
+        print(f"并发执行: {concurrent:.3f}s ({concurrent / latency:.1f} 个往返)")
+        print(f"连接池统计: {pool.get_stats()}")
+    finally:
+        await pool.close()
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="并发 generate_command 基准测试")
+    parser.add_argument("--requests", type=int, default=20, help="请求数量")
+    parser.add_argument("--latency", type=float, default=0.5, help="桩服务延迟（秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+日志开销基准测试
+
+模拟一次AI请求在热路径上记录的日志（系统提示、历史记录、请求数据、原始响应，
+每个约8KB），比较原有的 f-string + json.dumps + 同步文件写入与
+延迟载荷 + 后台队列写入在调用线程上的每请求耗时。
+
+- DEBUG关闭：原有写法仍会构造字符串，延迟载荷不做任何序列化；
+- DEBUG开启：原有写法在调用线程中格式化并写文件，新写法只入队。
+
+用法:
+    python -m benchmarks.bench_logging --requests 2000 --repeat 5
+"""
+
+import json
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict
+
+from ata.log_pipeline import LogPipeline, StructuredFormatter, payload
+
+logger = logging.getLogger("bench_logging")
+logger.propagate = False
+
+
+def make_request(size: int = 8192) -> Dict[str, object]:
+    """构造约 size 字节的请求数据"""
+    prompt = ("列出当前目录下最近修改的文件并按大小排序 " * (size // 60))[:size // 3]
+    history = [{"role": "user", "content": prompt[:size // 6]},
+               {"role": "assistant", "content": "ls -lt"}]
+    return {
+        "prompt": prompt,
+        "history": history,
+        "data": {"model": "deepseek-chat", "messages": history + [{"role": "user", "content": prompt}]},
+        "response": {"choices": [{"message": {"content": json.dumps({"command": "ls -lt", "explanation": prompt})}}]},
+    }
+
+
+def legacy_request(request: Dict[str, object]) -> None:
+    """原有写法：f-string 在调用前就序列化"""
+    logger.debug(f"系统提示: {request['prompt']}")
+    logger.debug(f"历史记录: {json.dumps(request['history'], ensure_ascii=False)}")
+    logger.debug(f"API请求数据: {json.dumps(request['data'], ensure_ascii=False)}")
+    logger.debug(f"API原始响应: {json.dumps(request['response'], ensure_ascii=False)}")
+
+
+def lazy_request(request: Dict[str, object]) -> None:
+    """新写法：载荷在记录被输出时才序列化"""
+    logger.debug("系统提示: %s", payload(request["prompt"]))
+    logger.debug("历史记录: %s", payload(request["history"]))
+    logger.debug("API请求数据: %s", payload(request["data"]))
+    logger.debug("API原始响应: %s", payload(request["response"]))
+
+
+def measure(name: str, func: Callable[[Dict[str, object]], None],
+            request: Dict[str, object], requests: int, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            func(request)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<22} {best / requests * 1e6:>10.1f} 微秒/请求")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="日志开销基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="每轮模拟的请求数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    parser.add_argument("--size", type=int, default=8192, help="每个载荷的大致字节数")
+    args = parser.parse_args()
+
+    request = make_request(args.size)
+    fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+    logger.setLevel(logging.INFO)
+    print("DEBUG关闭")
+    measure("legacy f-string", legacy_request, request, args.requests, args.repeat)
+    measure("lazy payload", lazy_request, request, args.requests, args.repeat)
+
+    logger.setLevel(logging.DEBUG)
+    with tempfile.TemporaryDirectory() as tmp:
+        print("DEBUG开启，写入文件")
+        handler = logging.FileHandler(Path(tmp) / "sync.log", encoding="utf-8")
+        handler.setFormatter(logging.Formatter(fmt))
+        logger.addHandler(handler)
+        measure("legacy sync file", legacy_request, request, args.requests, args.repeat)
+        logger.removeHandler(handler)
+        handler.close()
+
+        # 队列容量足以容纳全部记录，只测调用线程的入队开销
+        pipeline = LogPipeline([logging.FileHandler(Path(tmp) / "queued.log", encoding="utf-8")],
+                               max_queue=args.requests * args.repeat * 4 + 1)
+        pipeline.listener.handlers[0].setFormatter(StructuredFormatter(fmt))
+        logger.addHandler(pipeline.handler)
+        measure("lazy payload + queue", lazy_request, request, args.requests, args.repeat)
+        logger.removeHandler(pipeline.handler)
+        start = time.perf_counter()
+        pipeline.stop()
+        print(f"后台线程写完剩余记录 {time.perf_counter() - start:.2f} 秒，丢弃 {pipeline.dropped} 条")
+
+
+if __name__ == "__main__":
+    main()
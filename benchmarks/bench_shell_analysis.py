@@ -0,0 +1,89 @@
+"""
+命令解析和结构化安全检查延迟基准测试
+
+生成不同长度的管道（每段为带引号、重定向和命令替换的常见命令），比较：
+- 原始文本检查：DangerMatcher.match，不解析；
+- 解析并检查：DangerMatcher.analyze，每次重新解析；
+- 缓存命中：CommandExecutor.analyze_command 对重复命令只查LRU。
+
+用法:
+    python -m benchmarks.bench_shell_analysis --stages 10 50 200 --repeat 5
+"""
+
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, List
+
+from ata.command_executor import CommandExecutor
+from ata.config_manager import ConfigManager
+from ata.danger_matcher import DangerMatcher
+from ata.shell_parser import parse
+
+SENSITIVE_DIRS = ["/etc", "/var", "/usr", "/boot", "/root", "/bin", "/sbin", "/proc", "/sys", "/dev"]
+
+STAGES = [
+    "grep -v '^#'",
+    "sed -e 's/foo/bar/g' -e \"s|$HOME|~|\"",
+    "awk -F: '{print $1, $3}'",
+    "sort -t, -k2,2n",
+    "uniq -c",
+    "cut -d' ' -f1-3",
+    "tr '[:upper:]' '[:lower:]'",
+    "xargs -I{} echo \"item: {}\"",
+    "head -n 100",
+    "tee -a /tmp/pipeline.log",
+    "grep -E \"$(date +%Y-%m)\"",
+    "jq -r '.items[] | select(.size > 1024) | .name'",
+]
+
+
+def make_pipeline(stages: int, seed: int) -> str:
+    """生成 stages 段的管道"""
+    rng = random.Random(seed)
+    parts = ["cat ~/logs/app-$(date +%F).log"]
+    parts.extend(rng.choice(STAGES) for _ in range(stages - 1))
+    return " | ".join(parts) + " > ~/report.txt 2>&1"
+
+
+def measure(name: str, func: Callable[[str], object], commands: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for command in commands:
+            func(command)
+        best = min(best, time.perf_counter() - start)
+    per_command = best / len(commands)
+    print(f"  {name:<20} {per_command * 1e6:>10.1f} 微秒/命令")
+    return per_command
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="命令解析和结构化安全检查延迟基准测试")
+    parser.add_argument("--stages", type=int, nargs="+", default=[10, 50, 200], help="管道段数")
+    parser.add_argument("--commands", type=int, default=50, help="每种长度生成的命令数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    matcher = DangerMatcher(CommandExecutor.DANGEROUS_PATTERNS, sensitive_dirs=SENSITIVE_DIRS)
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.yaml"
+        config_path.write_text("security:\n  analysis_cache_size: 4096\n", encoding="utf-8")
+        executor = CommandExecutor(ConfigManager(config_path))
+
+    for stages in args.stages:
+        commands = [make_pipeline(stages, seed) for seed in range(args.commands)]
+        length = sum(len(command) for command in commands) // len(commands)
+        print(f"{stages} 段管道（平均 {length} 字符）")
+        measure("text match", matcher.match, commands, args.repeat)
+        measure("parse only", parse, commands, args.repeat)
+        measure("parse + check", matcher.analyze, commands, args.repeat)
+        for command in commands:
+            executor.analyze_command(command)
+        measure("LRU hit", executor.analyze_command, commands, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
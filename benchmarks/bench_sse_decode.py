@@ -0,0 +1,111 @@
+"""
+SSE流解码基准测试
+
+构造一段模拟录制的OpenAI兼容流式响应（包含心跳注释，并按随机大小的
+TCP块拆分），比较原有的逐行解析循环与 SSEDecoder 的吞吐量和内存分配。
+
+原有循环直接按行迭代（相当于aiohttp已完成行重组），因此结果对其有利。
+
+用法:
+    python -m benchmarks.bench_sse_decode --events 5000 --repeat 5
+"""
+
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from ata.sse import SSEDecoder
+
+logger = logging.getLogger("bench_sse")
+
+
+def record_stream(events: int, seed: int = 0) -> List[bytes]:
+    """生成按随机TCP块大小拆分的流式响应"""
+    rng = random.Random(seed)
+    parts = []
+    for i in range(events):
+        if i % 50 == 0:
+            parts.append(b": keep-alive\n\n")
+        event = {"id": "chatcmpl-bench", "choices": [{"index": 0, "delta": {"content": f"tok{i} "}}]}
+        parts.append(f"data: {json.dumps(event)}\n\n".encode())
+    parts.append(b"data: [DONE]\n\n")
+    payload = b"".join(parts)
+
+    chunks = []
+    pos = 0
+    while pos < len(payload):
+        size = rng.randint(16, 1400)
+        chunks.append(payload[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def legacy_loop(chunks: List[bytes]) -> Tuple[int, int]:
+    """原有实现：逐行decode、替换前缀并尝试json.loads"""
+    count = 0
+    errors = 0
+    for line in b"".join(chunks).splitlines(keepends=True):
+        if line:
+            try:
+                line_text = line.decode("utf-8").replace("data: ", "")
+                event = json.loads(line_text)
+                if event["choices"][0]["delta"].get("content"):
+                    count += 1
+            except Exception as e:
+                errors += 1
+                logger.warning(f"解析流式响应失败: {str(e)}")
+                continue
+    return count, errors
+
+
+def decoder_loop(chunks: List[bytes]) -> Tuple[int, int]:
+    """新实现：SSEDecoder增量解码"""
+    count = 0
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        for event in decoder.feed(chunk):
+            if event.data == b"[DONE]":
+                return count, 0
+            if json.loads(event.data)["choices"][0]["delta"].get("content"):
+                count += 1
+    return count, 0
+
+
+def measure(name: str, func: Callable[[List[bytes]], Tuple[int, int]],
+            chunks: List[bytes], repeat: int) -> None:
+    best = float("inf")
+    count = errors = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count, errors = func(chunks)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {count:>7} 事件  {count / best:>12,.0f} 事件/秒  "
+          f"峰值内存 {peak / 1024:>8.1f} KiB  异常 {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SSE流解码基准测试")
+    parser.add_argument("--events", type=int, default=5000, help="流中的事件数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    # 原有循环会为每个空行和[DONE]记录警告，这里只计其调用开销
+    logging.disable(logging.CRITICAL)
+    chunks = record_stream(args.events)
+    print(f"流大小 {sum(map(len, chunks))} 字节，{len(chunks)} 个TCP块")
+    measure("legacy", legacy_loop, chunks, args.repeat)
+    measure("decoder", decoder_loop, chunks, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,7 @@ setup(
     version="1.0.0",
     packages=find_packages(),
     install_requires=[
-        "openai>=1.0.0",
+        "aiohttp>=3.8.1",
         "rich>=10.0.0",
         "pyyaml>=6.0.0",
         "requests>=2.0.0",
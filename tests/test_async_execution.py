@@ -0,0 +1,161 @@
+"""
+异步命令执行测试模块
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from ata.command_executor import CommandExecutor, CommandResult
+from ata.config_manager import ConfigManager
+from ata.exceptions import CommandExecutionError
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="使用POSIX shell命令")
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ConfigManager:
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "general:\n"
+        f"  working_directory: {tmp_path}\n"
+        "ai:\n"
+        "  provider: mock\n"
+        "  cache:\n"
+        "    persistent: false\n"
+        "ui:\n"
+        "  command_timeout: 10\n",
+        encoding="utf-8",
+    )
+    return ConfigManager(config_path)
+
+
+@pytest.fixture
+def executor(config: ConfigManager) -> CommandExecutor:
+    return CommandExecutor(config)
+
+
+def _process_gone(pid: int) -> bool:
+    """进程已退出（或只剩等待回收的僵尸进程）"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            return any(line.startswith("State:") and "Z" in line for line in f)
+    except FileNotFoundError:
+        return True
+
+
+async def _read_pid(path: Path) -> int:
+    for _ in range(100):
+        if path.exists() and path.read_text().strip():
+            return int(path.read_text())
+        await asyncio.sleep(0.02)
+    raise AssertionError("子进程未启动")
+
+
+@pytest.mark.asyncio
+async def test_same_result_contract(executor: CommandExecutor) -> None:
+    """测试与同步执行相同的结果和异常"""
+    result = await executor.execute_async("echo 'Hello'")
+    assert isinstance(result, CommandResult)
+    assert result.success
+    assert result.exit_code == 0
+    assert result.stdout == "Hello\n"
+    assert result.stderr == ""
+    assert result.duration > 0
+
+    result = await executor.execute_async("echo out; echo err >&2; exit 3", shell=True, check=False)
+    assert (result.success, result.exit_code, result.stdout, result.stderr) == (False, 3, "out\n", "err\n")
+    assert result.stdout == executor.execute("echo out; exit 3", shell=True, check=False).stdout
+
+    with pytest.raises(CommandExecutionError, match="命令执行失败"):
+        await executor.execute_async("false")
+    with pytest.raises(CommandExecutionError, match="命令执行错误"):
+        await executor.execute_async("command_that_does_not_exist_ata")
+    with pytest.raises(CommandExecutionError, match="命令不能为空"):
+        await executor.execute_async("  ")
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_process_group(executor: CommandExecutor, tmp_path: Path) -> None:
+    """测试超时后终止shell及其启动的子进程"""
+    pid_file = tmp_path / "child.pid"
+    start = time.monotonic()
+    with pytest.raises(CommandExecutionError, match="超时"):
+        await executor.execute_async(f"sleep 30 & echo $! > {pid_file}; wait", shell=True, timeout=0.5)
+    assert time.monotonic() - start < 5
+    assert _process_gone(await _read_pid(pid_file))
+
+
+@pytest.mark.asyncio
+async def test_cancellation_kills_process_group(executor: CommandExecutor, tmp_path: Path) -> None:
+    """测试取消执行时终止整个进程组"""
+    pid_file = tmp_path / "child.pid"
+    task = asyncio.ensure_future(
+        executor.execute_async(f"sleep 30 & echo $! > {pid_file}; wait", shell=True)
+    )
+    pid = await _read_pid(pid_file)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert _process_gone(pid)
+
+
+@pytest.mark.asyncio
+async def test_long_commands_do_not_block_web_server(config: ConfigManager) -> None:
+    """测试多个长时间运行的命令不会拖慢 /api/status"""
+    from ata.web_server import WebServer
+
+    server = WebServer(config)
+    client = server.app.test_client()
+    try:
+        start = time.monotonic()
+        commands = [
+            asyncio.ensure_future(client.post("/api/execute-raw", json={"command": "sleep 1"}))
+            for _ in range(8)
+        ]
+        await asyncio.sleep(0.2)
+
+        status_start = time.monotonic()
+        response = await client.get("/api/status")
+        status_time = time.monotonic() - status_start
+        assert response.status_code == 200
+        assert status_time < 0.5
+
+        responses = await asyncio.gather(*commands)
+        assert all(r.status_code == 200 for r in responses)
+        # 8个命令并发执行，而不是依次执行
+        assert time.monotonic() - start < 4
+    finally:
+        await server.ai_interface.close()
+
+
+@pytest.mark.asyncio
+async def test_command_timeout_only_applies_to_web(tmp_path: Path) -> None:
+    """测试 ui.command_timeout 只限制Web界面执行的命令，直接调用（CLI）不限制"""
+    from ata.web_server import WebServer
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: mock\n"
+        "  cache:\n"
+        "    enabled: false\n"
+        "ui:\n"
+        "  command_timeout: 0.3\n",
+        encoding="utf-8",
+    )
+    config = ConfigManager(config_path)
+    result = await CommandExecutor(config).execute_async("sleep 0.6; echo done", shell=True)
+    assert result.stdout == "done\n"
+
+    server = WebServer(config)
+    client = server.app.test_client()
+    try:
+        response = await client.post("/api/execute-raw", json={"command": "sleep 0.6"})
+        assert response.status_code == 400
+        assert "超时" in (await response.get_json())["error"]
+    finally:
+        await server.ai_interface.close()
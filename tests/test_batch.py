@@ -0,0 +1,95 @@
+"""
+批量生成命令测试模块
+"""
+
+import time
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.exceptions import APIError
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_with_bounded_concurrency() -> None:
+    """测试批量生成在并发上限内执行，并按完成顺序返回原始下标"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+    active = 0
+    peak = 0
+
+    async def generate(user_input, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        if user_input == "task 3":
+            raise APIError("boom")
+        return {"command": f"echo {user_input}", "explanation": "", "warnings": []}
+
+    ai.provider.generate_command = AsyncMock(side_effect=generate)
+    try:
+        inputs = [f"task {i}" for i in range(10)]
+        start = time.monotonic()
+        items = [item async for item in ai.generate_commands_batch(inputs, concurrency=5)]
+        elapsed = time.monotonic() - start
+
+        assert peak == 5
+        assert elapsed < 0.05 * 4
+        assert sorted(item["index"] for item in items) == list(range(10))
+        failed = [item for item in items if "error" in item]
+        assert [item["index"] for item in failed] == [3]
+        assert all(item["result"]["command"] == f"echo {item['input']}"
+                   for item in items if "result" in item)
+        assert ai.history == []
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_web_batch_validates_before_streaming(tmp_path) -> None:
+    """测试 /api/ai/batch 在开始流式响应之前校验参数，并限制条目数和并发数"""
+    from ata.config_manager import ConfigManager
+    from ata.web_server import WebServer
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: mock\n"
+        "  batch_concurrency: 2\n"
+        "  batch_max_inputs: 3\n"
+        "  cache:\n"
+        "    enabled: false\n",
+        encoding="utf-8",
+    )
+    server = WebServer(ConfigManager(config_path))
+    client = server.app.test_client()
+    calls = []
+
+    async def batch(inputs, concurrency=None, bypass_cache=False):
+        calls.append(concurrency)
+        for index, text in enumerate(inputs):
+            yield {"index": index, "input": text, "result": {"command": "ls"}}
+
+    server.ai_interface.generate_commands_batch = batch
+    try:
+        for concurrency in ("many", -1, [2]):
+            response = await client.post("/api/ai/batch", json={"inputs": ["a"], "concurrency": concurrency})
+            assert response.status_code == 400
+        response = await client.post("/api/ai/batch", json={"inputs": ["a", "b", "c", "d"]})
+        assert response.status_code == 400
+        response = await client.post("/api/ai/batch", data="not json")
+        assert response.status_code == 400
+        assert calls == []
+
+        response = await client.post("/api/ai/batch", json={"inputs": ["a", "b"], "concurrency": 50})
+        assert response.status_code == 200
+        assert len((await response.get_data(as_text=True)).splitlines()) == 2
+        response = await client.post("/api/ai/batch", json={"inputs": ["a"]})
+        assert response.status_code == 200
+        assert calls == [2, 2]
+    finally:
+        await server.ai_interface.close()
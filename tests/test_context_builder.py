@@ -0,0 +1,69 @@
+"""
+上下文构建测试模块
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.context_builder import ContextBuilder, estimate_tokens
+
+
+def _history(turns: int) -> list:
+    return [{"user": f"question {i} " * 10, "assistant": f"answer {i} " * 10} for i in range(turns)]
+
+
+def test_estimate_tokens() -> None:
+    """测试令牌估算"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("查看磁盘") == 4
+
+
+def test_oldest_turns_drop_first() -> None:
+    """测试超出预算时先丢弃最旧的轮次"""
+    builder = ContextBuilder(max_tokens=200)
+    messages, report = builder.build("system prompt", "list files", _history(20))
+
+    assert report["prompt_tokens"] <= 200
+    assert 0 < report["used_turns"] < 20
+    assert report["dropped_turns"] == 20 - report["used_turns"]
+    assert messages[-1] == {"role": "assistant", "content": "answer 19 " * 10}
+    assert messages[0]["role"] == "user"
+
+
+def test_history_length_limit() -> None:
+    """测试历史轮次上限"""
+    builder = ContextBuilder(max_tokens=100000, max_history=3)
+    messages, report = builder.build("system prompt", "list files", _history(10))
+
+    assert report["used_turns"] == 3
+    assert len(messages) == 6
+    assert messages[0]["content"] == "question 7 " * 10
+
+
+def test_role_messages_pass_through() -> None:
+    """测试已经是角色消息格式的历史原样保留"""
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "ls"}]
+    messages, _ = ContextBuilder().build("system prompt", "list files", history)
+    assert messages == history
+
+
+@pytest.mark.asyncio
+async def test_ai_interface_reports_prompt_tokens() -> None:
+    """测试AIInterface在预算内发送历史并报告提示令牌数"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+    ai.context_builder = ContextBuilder(max_tokens=400)
+    ai.history = _history(50)
+    ai.provider.generate_command = AsyncMock(return_value={"command": "ls", "explanation": "", "warnings": []})
+    try:
+        result = await ai.generate_command("list files", {})
+
+        sent = ai.provider.generate_command.await_args.kwargs["history"]
+        assert 0 < len(sent) < 100
+        assert 0 < result["prompt_tokens"] <= 400
+        assert ai.get_metrics()["context"]["dropped_turns"] > 0
+    finally:
+        await ai.close()
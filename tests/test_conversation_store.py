@@ -0,0 +1,171 @@
+"""
+会话存储测试模块
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.context_builder import ContextBuilder
+from ata.conversation_store import ConversationStore, Turn
+
+
+@pytest.mark.asyncio
+async def test_ring_buffer_keeps_latest_turns() -> None:
+    """测试每个会话只保留最近的轮次"""
+    store = ConversationStore(max_turns=3)
+    for i in range(5):
+        await store.append("a", f"q{i}", f"c{i}")
+
+    assert [turn.user for turn in store.turns("a")] == ["q2", "q3", "q4"]
+    assert store.get_stats()["turns_dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_bounds_sessions() -> None:
+    """测试会话数超限时淘汰最久未使用的会话"""
+    store = ConversationStore(max_sessions=2)
+    await store.append("a", "q", "c")
+    await store.append("b", "q", "c")
+    store.turns("a")  # a 变为最近使用
+    await store.append("c", "q", "c")
+
+    assert store.turns("b") == []
+    assert len(store.turns("a")) == 1
+    stats = store.get_stats()
+    assert stats["sessions"] == 2
+    assert stats["sessions_evicted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_provisional_sessions_do_not_evict_confirmed_ones() -> None:
+    """测试临时会话单独淘汰，不挤掉正式会话；回传ID后转为正式会话"""
+    store = ConversationStore(max_sessions=2)
+    await store.append("alice", "q", "c")
+    for i in range(5):
+        await store.append(f"anon{i}", f"q{i}", "c", provisional=True)
+
+    assert len(store.turns("alice")) == 1
+    stats = store.get_stats()
+    assert (stats["sessions"], stats["provisional_sessions"]) == (1, 2)
+    assert stats["provisional_evicted"] == 3
+    assert stats["sessions_evicted"] == 0
+
+    assert [turn.user for turn in await store.load("anon4")] == ["q4"]
+    stats = store.get_stats()
+    assert (stats["sessions"], stats["provisional_sessions"]) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_expire() -> None:
+    """测试空闲会话过期"""
+    store = ConversationStore(idle_ttl=0.05)
+    await store.append("a", "q", "c")
+    await asyncio.sleep(0.06)
+
+    assert store.turns("a") == []
+    assert store.get_stats()["sessions_expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_persistence_survives_restart(tmp_path) -> None:
+    """测试持久化会话在重启后恢复，且只保留最近的轮次"""
+    path = tmp_path / "conversations.db"
+    store = ConversationStore(max_turns=2, path=path)
+    for i in range(3):
+        await store.append("a", f"q{i}", f"c{i}")
+    store.close()
+
+    reopened = ConversationStore(max_turns=2, path=path)
+    try:
+        turns = await reopened.load("a")
+        assert [turn.assistant for turn in turns] == ["c1", "c2"]
+        assert reopened.get_stats()["disk_loads"] == 1
+
+        await reopened.clear("a")
+        assert await reopened.load("a") == []
+    finally:
+        reopened.close()
+
+
+def test_turns_are_compact_and_converted_lazily() -> None:
+    """测试轮次对象没有实例字典，构建提示时转换为消息格式"""
+    turn = Turn("list files", "ls -la")
+    assert not hasattr(turn, "__dict__")
+
+    messages, report = ContextBuilder().build("system prompt", "and hidden ones?", [turn])
+    assert messages == [
+        {"role": "user", "content": "list files"},
+        {"role": "assistant", "content": "ls -la"},
+    ]
+    assert report["used_turns"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sessions_do_not_share_history() -> None:
+    """测试不同会话的对话历史相互独立"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+
+    async def generate(user_input, system_info, history):
+        return {"command": f"echo {user_input}", "explanation": "", "warnings": []}
+
+    ai.provider.generate_command = AsyncMock(side_effect=generate)
+    try:
+        await asyncio.gather(
+            ai.chat("alice 1", session_id="alice"),
+            ai.chat("bob 1", session_id="bob"),
+        )
+        await ai.chat("alice 2", session_id="alice")
+
+        sent = ai.provider.generate_command.await_args.kwargs["history"]
+        assert [m["content"] for m in sent] == ["alice 1", "echo alice 1"]
+        assert [turn["user"] for turn in ai.get_history("bob")] == ["bob 1"]
+        assert ai.history == []
+        assert ai.get_metrics()["conversations"]["sessions"] == 2
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_cookieless_requests_create_provisional_sessions(tmp_path) -> None:
+    """测试不带会话ID的请求只创建临时会话，客户端回传ID后才占用会话名额"""
+    from ata.config_manager import ConfigManager
+    from ata.web_server import SESSION_HEADER, WebServer
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: openai\n"
+        "  cache:\n"
+        "    enabled: false\n"
+        "  fast_path:\n"
+        "    enabled: false\n"
+        "  openai:\n"
+        "    api_key: test_key\n"
+        "  conversations:\n"
+        "    max_sessions: 2\n",
+        encoding="utf-8",
+    )
+    server = WebServer(ConfigManager(config_path))
+    ai = server.ai_interface
+    ai.provider.generate_command = AsyncMock(return_value={"command": "ls", "explanation": "", "warnings": []})
+    client = server.app.test_client(use_cookies=False)
+    try:
+        await client.post("/api/ai/execute", json={"command": "list files"}, headers={SESSION_HEADER: "alice"})
+        for _ in range(5):
+            response = await client.post("/api/ai/execute", json={"command": "list files"})
+            assert response.status_code == 200
+        stats = ai.get_metrics()["conversations"]
+        assert (stats["sessions"], stats["provisional_sessions"]) == (1, 2)
+        assert len(ai.get_history("alice")) == 1
+
+        # 客户端回传服务端分配的ID后转为正式会话，第一轮历史保留
+        session_id = response.headers["Set-Cookie"].split(";")[0].split("=", 1)[1]
+        await client.post("/api/ai/execute", json={"command": "list files"}, headers={SESSION_HEADER: session_id})
+        assert len(ai.get_history(session_id)) == 2
+        assert ai.get_metrics()["conversations"]["sessions"] == 2
+    finally:
+        await ai.close()
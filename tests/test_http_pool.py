@@ -0,0 +1,115 @@
+"""
+HTTP连接池测试模块
+"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ata.config_manager import ConfigManager
+from ata.http_pool import HTTPConnectionPool, PoolConfig, get_shared_pool, close_shared_pool
+
+
+async def _start_server(delay: float = 0.0) -> TestServer:
+    """启动一个本地测试服务器"""
+    async def handler(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused() -> None:
+    """测试keep-alive连接被复用"""
+    server = await _start_server()
+    pool = HTTPConnectionPool(PoolConfig(limit_per_host=2))
+    try:
+        session = await pool.get_session()
+        for _ in range(3):
+            async with session.post(server.make_url("/v1/chat/completions"), json={}) as resp:
+                assert resp.status == 200
+                await resp.json()
+
+        stats = pool.get_stats()
+        assert stats["requests"] == 3
+        assert stats["connections_created"] == 1
+        assert stats["connections_reused"] == 2
+        assert stats["reuse_ratio"] == pytest.approx(2 / 3)
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_time_recorded_when_pool_exhausted() -> None:
+    """测试连接数达到上限时记录等待时间"""
+    server = await _start_server(delay=0.05)
+    pool = HTTPConnectionPool(PoolConfig(limit_per_host=1))
+    try:
+        session = await pool.get_session()
+
+        async def call() -> None:
+            async with session.post(server.make_url("/v1/chat/completions"), json={}) as resp:
+                await resp.read()
+
+        await asyncio.gather(call(), call())
+
+        stats = pool.get_stats()
+        assert stats["queued"] >= 1
+        assert stats["max_wait_time"] > 0
+        assert stats["connections_created"] == 1
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_release_closes_session_for_last_user() -> None:
+    """测试最后一个使用者释放时关闭会话"""
+    pool = HTTPConnectionPool()
+    pool.acquire()
+    pool.acquire()
+    session = await pool.get_session()
+
+    await pool.release()
+    assert not session.closed
+
+    await pool.release()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_shared_pool_is_process_wide() -> None:
+    """测试共享连接池为进程级单例"""
+    await close_shared_pool()
+    try:
+        first = get_shared_pool(PoolConfig(limit=5))
+        second = get_shared_pool()
+        assert first is second
+        assert second.config.limit == 5
+    finally:
+        await close_shared_pool()
+
+
+def test_pool_config_from_config(tmp_path) -> None:
+    """测试从配置文件读取连接池配置"""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "ai:\n  http_pool:\n    limit_per_host: 4\n    keepalive_timeout: 15\n",
+        encoding="utf-8"
+    )
+    config = ConfigManager(config_file)
+
+    pool_config = PoolConfig.from_config(config)
+
+    assert pool_config.limit_per_host == 4
+    assert pool_config.keepalive_timeout == 15.0
+    assert pool_config.limit == PoolConfig().limit
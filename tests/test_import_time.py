@@ -0,0 +1,71 @@
+"""
+导入耗时测试模块
+
+通过 ``python -X importtime`` 检查各运行模式只导入自己需要的依赖，
+防止启动时间退化。
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 各模式启动时不应加载的第三方依赖
+HEAVY_MODULES = {"rich", "aiohttp", "pydantic", "psutil", "quart", "fastapi", "requests", "yaml"}
+
+# ``import ata`` 的累计耗时上限（微秒），留有足够余量以适应较慢的机器
+IMPORT_ATA_BUDGET_US = 100_000
+
+
+def _import_times(statement: str) -> Dict[str, int]:
+    """在新进程中执行导入语句，返回 {模块名: 累计耗时(微秒)}"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _loaded(times: Dict[str, int], modules: set) -> set:
+    return {name for name in modules if name in times}
+
+
+def test_import_ata_is_lightweight() -> None:
+    """测试导入包本身不加载任何重量级依赖"""
+    times = _import_times("import ata")
+    assert _loaded(times, HEAVY_MODULES) == set()
+    assert times["ata"] < IMPORT_ATA_BUDGET_US
+
+
+def test_public_api_loads_on_access() -> None:
+    """测试公共名称在首次访问时才导入所在模块"""
+    proc = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, ata; ata.CommandResult; print(' '.join(sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    loaded = set(proc.stdout.split())
+    assert "ata.command_executor" in loaded
+    assert loaded & {"ata.ai_interface", "ata.cli", "psutil", "rich"} == set()
+
+
+@pytest.mark.parametrize("statement, allowed", [
+    # 命令行入口：解析参数前只需要配置
+    ("import ata.__main__", {"yaml"}),
+    # CLI界面：rich 控制台，不加载AI客户端和Web框架
+    ("import ata.cli", {"rich", "yaml"}),
+])
+def test_modes_import_only_what_they_need(statement: str, allowed: set) -> None:
+    """测试各运行模式不导入其他模式的依赖"""
+    times = _import_times(statement)
+    assert _loaded(times, HEAVY_MODULES - allowed) == set()
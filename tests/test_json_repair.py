@@ -0,0 +1,158 @@
+"""
+结构化输出和JSON修复测试模块
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.config_manager import ConfigManager
+from ata.exceptions import AIError
+from ata.json_repair import StructuredOutputStats, loads_lenient, repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"command": "ls", "explanation": "x",}', {"command": "ls", "explanation": "x"}),
+    ("好的，命令如下：\n```json\n{'command': 'ls -la', 'explanation': \"it's\"}\n```\n希望有帮助",
+     {"command": "ls -la", "explanation": "it's"}),
+    ('{command: "ls", warnings: [], safe: True, extra: None}',
+     {"command": "ls", "warnings": [], "safe": True, "extra": None}),
+    ('{"command": "ls", 说明: "x"}', {"command": "ls", "说明": "x"}),
+    ('{"command": "printf \'a\nb\'", // 注释\n "explanation": "e" /* 块注释 */}',
+     {"command": "printf 'a\nb'", "explanation": "e"}),
+    ('{"command": "du -sh .", "explanation": "统计目录大', {"command": "du -sh .", "explanation": "统计目录大"}),
+    ('{"command": "df -h", "warnings": ["a", ', {"command": "df -h", "warnings": ["a"]}),
+    ('{"command": "echo }", "explanation": "x"} 后面还有说明 {}', {"command": "echo }", "explanation": "x"}),
+])
+def test_repair_recovers_command_objects(text: str, expected: dict) -> None:
+    """测试常见的不严格输出被修复"""
+    result, repaired = loads_lenient(text)
+    assert repaired is True
+    assert result == expected
+
+
+def test_strict_json_is_not_rewritten() -> None:
+    """测试严格的JSON直接解析，不标记为修复"""
+    assert loads_lenient('{"command": "ls"}') == ({"command": "ls"}, False)
+
+
+def test_unrecoverable_output_raises_original_error() -> None:
+    """测试无法修复时抛出严格解析的错误"""
+    assert repair_json("我无法完成这个请求") is None
+    with pytest.raises(json.JSONDecodeError) as excinfo:
+        loads_lenient("我无法完成这个请求")
+    assert excinfo.value.pos == 0
+    with pytest.raises(json.JSONDecodeError):
+        loads_lenient('{"command": "ls",}', repair=False)
+    # 未加引号的非ASCII值无法修复，但不能抛出JSONDecodeError以外的异常
+    with pytest.raises(json.JSONDecodeError):
+        loads_lenient('{"a": é}')
+
+
+def test_stats() -> None:
+    """测试解析统计"""
+    stats = StructuredOutputStats()
+    stats.record(False)
+    stats.record(True)
+    stats.record(None)
+    assert stats.to_dict() == {
+        "responses": 3, "strict": 1, "repaired": 1, "failed": 1, "repair_rate": pytest.approx(1 / 3)
+    }
+
+
+def _response(content: str) -> dict:
+    return {"choices": [{"message": {"content": content}}]}
+
+
+@pytest.mark.asyncio
+async def test_openai_requests_json_mode_and_repairs() -> None:
+    """测试请求附带JSON模式，修复后的响应无需重新请求"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+    ai.provider._make_request = AsyncMock(return_value=_response(
+        "这是命令：\n```json\n{'command': 'ls -la', 'explanation': '列出文件',}\n```"
+    ))
+    try:
+        result = await ai.generate_command("列出所有文件", {})
+        assert result["command"] == "ls -la"
+        assert ai.provider._make_request.await_count == 1
+        data = ai.provider._make_request.await_args.args[1]
+        assert data["response_format"] == {"type": "json_object"}
+        assert ai.get_metrics()["structured_output"]["repaired"] == 1
+
+        ai.provider._make_request.return_value = _response("抱歉，我无法回答")
+        with pytest.raises(AIError):
+            await ai.generate_command("做点什么", {})
+        assert ai.get_metrics()["structured_output"]["failed"] == 1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_command_repairs_without_retry() -> None:
+    """测试流式生成命令（CLI默认路径）同样在本地修复，并计入修复统计"""
+    chunks = ["```json\n{'command': 'ls -la', ", "'explanation': '列出文件',}\n```"]
+
+    async def fake_stream(url, data):
+        for chunk in chunks:
+            yield chunk
+
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+    ai.provider._make_stream_request = fake_stream
+    try:
+        events = [event async for event in ai.stream_command("列出所有文件", {})]
+        assert events[-1]["command"] == "ls -la"
+        assert events[-1]["explanation"] == "列出文件"
+        assert ai.get_metrics()["structured_output"]["repaired"] == 1
+
+        chunks[:] = ["抱歉，", "我无法回答"]
+        with pytest.raises(AIError):
+            async for _ in ai.stream_command("做点什么", {}):
+                pass
+        assert ai.get_metrics()["structured_output"]["failed"] == 1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_deepseek_truncated_commands() -> None:
+    """测试被截断的多平台命令仍能选出当前系统的命令"""
+    ai = AIInterface(provider="deepseek", api_key="test_key")
+    ai.cache = None
+    os_key = ai.provider._current_os_key()
+    ai.provider._make_request = AsyncMock(return_value=_response(
+        '{"commands": [{"os": "%s", "command": "df -h", "explanation": "磁盘"}, {"os": "' % os_key
+    ))
+    try:
+        result = await ai.generate_command("查看磁盘", {})
+        assert result["command"] == "df -h"
+        assert ai.get_metrics()["structured_output"]["repaired"] == 1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_json_mode_can_be_disabled(tmp_path) -> None:
+    """测试关闭JSON模式后请求不带 response_format"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: openai\n"
+        "  openai:\n"
+        "    api_key: test_key\n"
+        "  cache:\n"
+        "    enabled: false\n"
+        "  structured_output:\n"
+        "    json_mode: false\n",
+        encoding="utf-8",
+    )
+    ai = AIInterface(ConfigManager(config_path))
+    try:
+        data = ai.provider._command_request([{"role": "user", "content": "ls"}], stream=True)
+        assert "response_format" not in data
+        assert data["stream"] is True
+    finally:
+        await ai.close()
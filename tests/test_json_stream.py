@@ -0,0 +1,153 @@
+"""
+增量JSON解析测试模块
+"""
+
+import json
+import sys
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ata.ai_interface import AIInterface, DeepSeekProvider
+from ata.exceptions import AIError
+from ata.http_pool import HTTPConnectionPool
+from ata.json_stream import IncrementalJSONParser
+
+OS_KEY = DeepSeekProvider._current_os_key()
+
+MULTI_OS_JSON = json.dumps({
+    "commands": [
+        {"os": OS_KEY, "command": "df -h", "explanation": "查看磁盘使用情况"},
+        {"os": "windows", "command": "wmic logicaldisk get size,freespace", "explanation": "查看磁盘"}
+    ],
+    "warnings": ["无"]
+}, ensure_ascii=False)
+
+
+def test_parser_emits_watched_values_in_chunks() -> None:
+    """测试逐字符输入时关注路径上的值完整出现即返回"""
+    parser = IncrementalJSONParser(watch=[("commands", "*")])
+    text = "```json\n" + MULTI_OS_JSON + "\n```"
+    events = []
+    for ch in text:
+        events.extend(parser.feed(ch))
+
+    paths = [path for path, _ in events]
+    assert paths == [("commands", 0), ("commands", 1), ()]
+    assert events[0][1]["command"] == "df -h"
+    assert parser.done
+    assert parser.document == json.loads(MULTI_OS_JSON)
+
+
+def test_parser_handles_escaped_strings() -> None:
+    """测试字符串中的转义字符和括号不影响解析"""
+    parser = IncrementalJSONParser(watch=[("command",)])
+    events = parser.feed('{"command": "echo \\"{[a]}\\"", "warnings": []}')
+
+    assert events[0] == (("command",), 'echo "{[a]}"')
+    assert parser.done
+
+
+def test_parser_stops_on_non_strict_json() -> None:
+    """测试文本不是严格的JSON时停止返回部分结果，而不是抛出异常"""
+    parser = IncrementalJSONParser(watch=[("command",)])
+    events = parser.feed('{"command": "ls", ') + parser.feed('"explanation": "x",}')
+
+    assert events == [(("command",), "ls")]
+    assert parser.failed
+    assert not parser.done
+    assert parser.feed(" ") == []
+    assert parser.buffer == '{"command": "ls", "explanation": "x",} '
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunks, command, explanation", [
+    (['{"command": "ls", ', '"explanation": "x",}'], "ls", "x"),
+    (["{'command': 'ls -la', ", "'explanation': '列出文件'}"], "ls -la", "列出文件"),
+])
+async def test_stream_command_repairs_non_strict_json(chunks: list, command: str, explanation: str) -> None:
+    """测试流式响应不是严格的JSON时在结束后修复，而不是抛出JSONDecodeError"""
+    async def fake_stream(url, data):
+        for chunk in chunks:
+            yield chunk
+
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None
+    ai.provider._make_stream_request = fake_stream
+    try:
+        events = [event async for event in ai.stream_command("列出文件", {})]
+        assert [event["type"] for event in events] == ["command", "result"]
+        assert events[0]["command"] == command
+        assert (events[1]["command"], events[1]["explanation"]) == (command, explanation)
+
+        chunks[:] = ['{"command": ', "我无法完成"]
+        with pytest.raises(AIError):
+            async for _ in ai.stream_command("做点什么", {}):
+                pass
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_command_yields_command_before_result() -> None:
+    """测试命令在完整响应结束前即可使用"""
+    gate = asyncio.Event()
+    split = MULTI_OS_JSON.index('"warnings"')
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for piece in (MULTI_OS_JSON[:split], MULTI_OS_JSON[split:]):
+            event = {"choices": [{"delta": {"content": piece}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await gate.wait()
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    server = TestServer(app)
+    await server.start_server()
+    pool = HTTPConnectionPool()
+    try:
+        provider = DeepSeekProvider(
+            api_key="test_key",
+            pool=pool,
+            api_url=str(server.make_url("/v1/chat/completions"))
+        )
+        stream = provider.stream_command("查看磁盘", system_info={"os": sys.platform})
+
+        first = await asyncio.wait_for(stream.__anext__(), timeout=2)
+        assert first["type"] == "command"
+        assert first["command"] == "df -h"
+        assert first["time_to_command"] >= 0
+
+        gate.set()
+        result = await stream.__anext__()
+        assert result["type"] == "result"
+        assert result["warnings"] == ["无"]
+        assert result["total_time"] >= result["time_to_command"]
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_web_stream_rejects_invalid_body(tmp_path) -> None:
+    """测试 /api/ai/stream 的请求体不是JSON对象时返回400而不是500"""
+    from ata.config_manager import ConfigManager
+    from ata.web_server import WebServer
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("ai:\n  provider: mock\n  cache:\n    enabled: false\n", encoding="utf-8")
+    server = WebServer(ConfigManager(config_path))
+    client = server.app.test_client()
+    try:
+        for kwargs in ({"data": "not json"}, {"json": ["ls"]}, {}):
+            response = await client.post("/api/ai/stream", **kwargs)
+            assert response.status_code == 400
+            assert (await response.get_json())["error"] == "命令不能为空"
+    finally:
+        await server.ai_interface.close()
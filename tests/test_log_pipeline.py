@@ -0,0 +1,159 @@
+"""
+结构化日志模块测试
+"""
+
+import json
+import logging
+
+import pytest
+
+from ata import log_pipeline
+from ata.log_pipeline import (
+    LogPipeline,
+    PayloadPolicy,
+    RedactingFilter,
+    StructuredFormatter,
+    configure_logging,
+    fields,
+    payload,
+    redact,
+    register_secret,
+)
+
+
+class CountingValue:
+    """记录被序列化次数的对象"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return "value"
+
+
+@pytest.fixture(autouse=True)
+def reset_policy():
+    """每个测试后恢复默认载荷策略"""
+    yield
+    log_pipeline._policy = PayloadPolicy()
+
+
+def make_record(msg: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("ata.test", logging.INFO, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_payload_not_serialized_when_level_disabled() -> None:
+    """测试日志级别关闭时载荷不会被序列化"""
+    logger = logging.getLogger("ata.test.lazy")
+    logger.setLevel(logging.INFO)
+    value = CountingValue()
+    try:
+        logger.debug("数据: %s", payload({"value": value}))
+        assert value.calls == 0
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+
+def test_payload_truncation_and_sampling() -> None:
+    """测试载荷按策略截断和采样"""
+    log_pipeline._policy = PayloadPolicy(max_chars=10)
+    assert str(payload("x" * 25)) == "x" * 10 + "...<已截断 15 字符>"
+    assert str(payload({"a": 1})) == '{"a": 1}'
+
+    log_pipeline._policy = PayloadPolicy(sample_rate=0.0)
+    assert str(payload("x" * 25)) == "<未采样 25 字符>"
+
+
+def test_payload_mutated_during_serialization_falls_back_to_repr() -> None:
+    """测试序列化时对象被修改（RuntimeError）退回到 repr"""
+    class Mutating:
+        def __str__(self) -> str:
+            raise RuntimeError("dictionary changed size during iteration")
+
+        def __repr__(self) -> str:
+            return "<mutating>"
+
+    assert str(payload({"a": Mutating()})) == "{'a': <mutating>}"
+
+
+def test_redaction() -> None:
+    """测试密钥格式和登记的明文值被屏蔽"""
+    register_secret("plain-secret-value")
+    text = redact('key sk-abcdef1234567890 auth Bearer abc.def "api_key": "xyz" plain-secret-value')
+    assert "abcdef1234567890" not in text
+    assert "abc.def" not in text
+    assert "xyz" not in text
+    assert "plain-secret-value" not in text
+
+    register_secret("abc")  # 过短的值不登记，避免误伤正常文本
+    assert redact("abcdef") == "abcdef"
+
+
+def test_structured_formatter_fields_and_json() -> None:
+    """测试结构化字段的文本和JSON输出"""
+    record = make_record("命令已生成 %s", "sk-abcdef1234567890",
+                         **fields(provider="openai", prompt=payload({"q": "ls"})))
+
+    text = StructuredFormatter("%(message)s").format(record)
+    assert text == '命令已生成 sk-*** | provider=openai prompt={"q": "ls"}'
+
+    data = json.loads(StructuredFormatter(as_json=True).format(record))
+    assert data["message"] == "命令已生成 sk-***"
+    assert data["provider"] == "openai"
+    assert data["prompt"] == '{"q": "ls"}'
+    assert data["level"] == "INFO"
+
+
+def test_pipeline_writes_in_background(tmp_path) -> None:
+    """测试后台线程写入文件，停止时写完队列中的记录"""
+    path = tmp_path / "ata.log"
+    file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(StructuredFormatter("%(message)s"))
+    pipeline = LogPipeline([file_handler])
+
+    logger = logging.getLogger("ata.test.pipeline")
+    logger.propagate = False
+    logger.addHandler(pipeline.handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        for i in range(100):
+            logger.debug("记录 %s", payload({"i": i}))
+    finally:
+        logger.removeHandler(pipeline.handler)
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+        pipeline.stop()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 100
+    assert lines[-1] == '记录 {"i": 99}'
+
+
+def test_full_queue_drops_records() -> None:
+    """测试队列已满时丢弃记录而不阻塞"""
+    pipeline = LogPipeline([logging.NullHandler()], max_queue=1)
+    pipeline.listener.stop()  # 停止消费，让队列保持已满
+    pipeline._stopped = True
+
+    pipeline.handler.handle(make_record("a"))
+    pipeline.handler.handle(make_record("b"))
+    pipeline.handler.handle(make_record("c"))
+    assert pipeline.dropped == 2
+
+
+def test_configure_logging_adds_redacting_filter_once() -> None:
+    """测试重复配置同一个控制台处理器时只添加一个脱敏过滤器"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    handler = logging.StreamHandler()
+    try:
+        configure_logging(console_handler=handler)
+        configure_logging(console_handler=handler)
+        assert sum(isinstance(f, RedactingFilter) for f in handler.filters) == 1
+    finally:
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
@@ -0,0 +1,86 @@
+"""
+本地模拟服务测试模块
+"""
+
+import pytest
+
+from ata.ai_interface import AIInterface, DeepSeekProvider, MockProvider
+from ata.exceptions import APIError
+from ata.http_pool import HTTPConnectionPool
+from ata.mock_server import MockServer, MockServerConfig
+from ata.retry import CircuitBreaker, RetryPolicy
+
+
+async def _start(**kwargs) -> MockServer:
+    server = MockServer(MockServerConfig(latency=0.01, time_to_first_token=0.01, seed=1, **kwargs))
+    await server.start(port=0)
+    return server
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_full_stack() -> None:
+    """测试mock提供商经过完整链路生成命令"""
+    server = await _start()
+    ai = AIInterface(provider="mock")
+    ai.provider.api_url = server.url
+    try:
+        result = await ai.generate_command("查看磁盘使用情况", {"os": "linux"})
+        assert result["command"] == "df -h"
+        assert result["provider"] == "mock"
+        assert result["usage"]["prompt_tokens"] > 0
+
+        events = [event async for event in ai.stream_command("list memory", {}, bypass_cache=True)]
+        assert events[0]["type"] == "command"
+        assert events[-1]["command"] == "free -h"
+    finally:
+        await ai.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_deepseek_format_is_served() -> None:
+    """测试按DeepSeek的多平台格式返回"""
+    server = await _start()
+    pool = HTTPConnectionPool()
+    try:
+        provider = DeepSeekProvider(api_key="mock", pool=pool, api_url=server.url)
+        result = await provider.generate_command("list processes", {})
+        assert result["command"] == "ps aux"
+    finally:
+        await pool.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_error_injection() -> None:
+    """测试注入429错误时客户端遵守Retry-After并最终失败"""
+    server = await _start(error_429_rate=1.0, retry_after=0.01)
+    pool = HTTPConnectionPool()
+    try:
+        provider = MockProvider(api_key="mock", pool=pool, api_url=server.url,
+                                retry_policy=RetryPolicy(max_retries=2, base_delay=0.01),
+                                breaker=CircuitBreaker("mock-test"))
+        with pytest.raises(APIError) as exc_info:
+            await provider.generate_command("list files", {})
+        assert exc_info.value.status == 429
+        assert server.stats["errors_429"] == 3
+    finally:
+        await pool.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_truncated_stream_raises() -> None:
+    """测试截断的流式响应转换为错误"""
+    server = await _start(truncate_rate=1.0)
+    pool = HTTPConnectionPool()
+    try:
+        provider = MockProvider(api_key="mock", pool=pool, api_url=server.url,
+                                breaker=CircuitBreaker("mock-test"))
+        with pytest.raises(APIError):
+            async for _ in provider.stream_command("list files", {}):
+                pass
+        assert server.stats["truncated"] == 1
+    finally:
+        await pool.close()
+        await server.stop()
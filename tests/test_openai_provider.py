@@ -0,0 +1,127 @@
+"""
+OpenAI异步提供商测试模块
+"""
+
+import json
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ata.ai_interface import OpenAIProvider
+from ata.exceptions import APIError
+from ata.http_pool import HTTPConnectionPool, PoolConfig
+
+COMMAND_JSON = json.dumps({
+    "command": "ls -la",
+    "explanation": "列出所有文件",
+    "warnings": []
+})
+
+
+async def _start_stub(delay: float = 0.0, status: int = 200) -> TestServer:
+    """启动兼容OpenAI协议的本地桩服务"""
+    async def handler(request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        await asyncio.sleep(delay)
+        if status != 200:
+            return web.json_response({"error": {"message": "boom"}}, status=status)
+
+        if payload.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for piece in ("ls", " -la"):
+                event = {"choices": [{"delta": {"content": piece}}]}
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": COMMAND_JSON}}]
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def _make_provider(server: TestServer, pool: HTTPConnectionPool) -> OpenAIProvider:
+    return OpenAIProvider(
+        api_key="test_key",
+        pool=pool,
+        api_url=str(server.make_url("/v1/chat/completions"))
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_command() -> None:
+    """测试异步生成命令"""
+    server = await _start_stub()
+    pool = HTTPConnectionPool()
+    try:
+        provider = _make_provider(server, pool)
+        result = await provider.generate_command("列出文件", system_info={"os": "linux"})
+
+        assert result["command"] == "ls -la"
+        assert result["explanation"] == "列出所有文件"
+        assert result["warnings"] == []
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_do_not_serialize() -> None:
+    """测试并发请求在约一个往返时间内完成"""
+    delay = 0.2
+    server = await _start_stub(delay=delay)
+    pool = HTTPConnectionPool(PoolConfig(limit_per_host=10))
+    try:
+        provider = _make_provider(server, pool)
+        start = time.monotonic()
+        results = await asyncio.gather(*[
+            provider.generate_command(f"任务{i}", system_info={}) for i in range(8)
+        ])
+        elapsed = time.monotonic() - start
+
+        assert all(r["command"] == "ls -la" for r in results)
+        assert elapsed < delay * 3
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat() -> None:
+    """测试流式聊天"""
+    server = await _start_stub()
+    pool = HTTPConnectionPool()
+    try:
+        provider = _make_provider(server, pool)
+        chunks = [
+            chunk async for chunk in provider.stream_chat(
+                [{"role": "user", "content": "列出文件"}], system_info={}
+            )
+        ]
+        assert "".join(chunks) == "ls -la"
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_http_error_raises_api_error() -> None:
+    """测试HTTP错误转换为APIError"""
+    server = await _start_stub(status=401)
+    pool = HTTPConnectionPool()
+    try:
+        provider = _make_provider(server, pool)
+        with pytest.raises(APIError):
+            await provider.generate_command("列出文件", system_info={})
+    finally:
+        await pool.close()
+        await server.close()
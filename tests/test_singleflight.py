@@ -0,0 +1,120 @@
+"""
+请求合并测试模块
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ata.ai_interface import AIInterface
+from ata.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution() -> None:
+    """测试并发的相同调用只执行一次"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ls -la"
+
+    results = await asyncio.gather(*[flight.do("key", upstream) for _ in range(5)])
+
+    assert results == ["ls -la"] * 5
+    assert calls == 1
+    stats = flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_others() -> None:
+    """测试取消一个等待者不影响其他等待者"""
+    flight = SingleFlight()
+    gate = asyncio.Event()
+
+    async def upstream() -> str:
+        await gate.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("key", upstream))
+    second = asyncio.ensure_future(flight.do("key", upstream))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+    assert flight.get_stats()["abandoned"] == 0
+
+
+@pytest.mark.asyncio
+async def test_upstream_cancelled_when_all_waiters_leave() -> None:
+    """测试所有等待者离开后取消上游调用"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def upstream() -> str:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "never"
+
+    waiter = asyncio.ensure_future(flight.do("key", upstream))
+    await started.wait()
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flight.get_stats()["abandoned"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_waiters() -> None:
+    """测试上游异常传递给所有等待者"""
+    flight = SingleFlight()
+
+    async def upstream() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", upstream), flight.do("key", upstream), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_ai_interface_coalesces_identical_requests() -> None:
+    """测试AIInterface合并相同的并发请求"""
+    ai = AIInterface(provider="openai", api_key="test_key")
+    ai.cache = None  # 关闭缓存，只验证请求合并
+
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(0.05)
+        return {"command": "df -h", "explanation": "", "warnings": []}
+
+    ai.provider.generate_command = AsyncMock(side_effect=slow_generate)
+    try:
+        results = await asyncio.gather(
+            ai.generate_command("check disk usage", {}),
+            ai.generate_command("Check  disk usage", {}),
+            ai.generate_command("list files", {}),
+        )
+        assert [r["command"] for r in results] == ["df -h"] * 3
+        assert ai.provider.generate_command.await_count == 2
+        assert ai.get_metrics()["singleflight"]["coalesced"] == 1
+    finally:
+        await ai.close()
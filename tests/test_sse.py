@@ -0,0 +1,57 @@
+"""
+SSE解码测试模块
+"""
+
+import json
+
+from ata.sse import SSEDecoder
+
+STREAM = (
+    b": keep-alive\n\n"
+    b'data: {"choices": [{"delta": {"content": "ls"}}]}\n\n'
+    b"event: update\r\n"
+    b"id: 7\r\n"
+    b"data: first\r\n"
+    b"data: second\r\n\r\n"
+    b"data: [DONE]\n\n"
+)
+
+
+def _decode(chunks) -> list:
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.close())
+    return events, decoder
+
+
+def test_decode_events_split_at_every_byte() -> None:
+    """测试按单字节拆分时事件边界正确"""
+    whole, _ = _decode([STREAM])
+    split, decoder = _decode([STREAM[i:i + 1] for i in range(len(STREAM))])
+
+    assert [(e.event, e.data, e.id) for e in split] == [(e.event, e.data, e.id) for e in whole]
+    assert len(split) == 3
+    assert json.loads(split[0].data)["choices"][0]["delta"]["content"] == "ls"
+    assert split[1].event == "update"
+    assert split[1].id == "7"
+    assert split[1].text == "first\nsecond"
+    assert split[2].data == b"[DONE]"
+    assert decoder.comments == 1
+
+
+def test_close_flushes_unterminated_event() -> None:
+    """测试缺少结尾空行的最后一个事件在结束时产出"""
+    decoder = SSEDecoder()
+    assert decoder.feed(b"retry: 3000\ndata: tail") == []
+    events = decoder.close()
+
+    assert [e.data for e in events] == [b"tail"]
+    assert decoder.retry == 3000
+
+
+def test_blank_lines_without_data_dispatch_nothing() -> None:
+    """测试没有data字段的空事件不会产出"""
+    decoder = SSEDecoder()
+    assert decoder.feed(b"\n\nevent: ping\n\n: comment\n\n") == []
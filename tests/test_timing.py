@@ -0,0 +1,134 @@
+"""
+请求耗时分解测试模块
+"""
+
+from pathlib import Path
+
+import pytest
+
+from ata.ai_interface import AIInterface, MockProvider
+from ata.config_manager import ConfigManager
+from ata.exceptions import APIError
+from ata.http_pool import HTTPConnectionPool
+from ata.mock_server import MockServer, MockServerConfig
+from ata.retry import CircuitBreaker, RetryPolicy
+from ata.timing import RequestTiming, current_timing, format_timing, track_timing
+
+TIMING_KEYS = {
+    "queue_wait", "dns", "connect", "time_to_first_byte", "time_to_first_token",
+    "parse", "total", "attempts", "retries", "prompt_tokens", "completion_tokens", "cached",
+}
+
+
+async def _start(**kwargs) -> MockServer:
+    server = MockServer(MockServerConfig(latency=0.01, time_to_first_token=0.01, seed=1, **kwargs))
+    await server.start(port=0)
+    return server
+
+
+def test_track_timing_restores_context() -> None:
+    """测试上下文结束后不再记录"""
+    assert current_timing() is None
+    with track_timing() as timing:
+        assert current_timing() is timing
+    assert current_timing() is None
+
+
+def test_format_timing() -> None:
+    """测试耗时摘要格式"""
+    timing = RequestTiming(time_to_first_byte=0.12, total=0.5, attempts=2, retries=1,
+                           prompt_tokens=120, completion_tokens=30)
+    line = format_timing(timing.to_dict(), execution=0.03)
+    assert line.startswith("AI 500ms")
+    assert "首字节 120ms" in line
+    assert "重试 1" in line
+    assert "令牌 120/30" in line
+    assert line.endswith("执行 30ms")
+
+
+@pytest.mark.asyncio
+async def test_generate_command_reports_timing() -> None:
+    """测试生成命令的结果带有耗时分解"""
+    server = await _start()
+    ai = AIInterface(provider="mock")
+    ai.provider.api_url = server.url
+    try:
+        result = await ai.generate_command("查看磁盘使用情况", {"os": "linux"})
+        timing = result["timing"]
+        assert set(timing) == TIMING_KEYS
+        assert timing["attempts"] == 1
+        assert timing["retries"] == 0
+        assert 0 < timing["time_to_first_byte"] <= timing["total"]
+        assert timing["prompt_tokens"] > 0
+        assert timing["cached"] is False
+
+        cached = await ai.generate_command("查看磁盘使用情况", {"os": "linux"})
+        assert cached["timing"]["cached"] is True
+        assert cached["timing"]["attempts"] == 0
+    finally:
+        await ai.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_stream_command_reports_timing() -> None:
+    """测试流式结果事件带有首令牌时间"""
+    server = await _start()
+    ai = AIInterface(provider="mock")
+    ai.provider.api_url = server.url
+    try:
+        events = [event async for event in ai.stream_command("list memory", {}, bypass_cache=True)]
+        timing = events[-1]["timing"]
+        assert timing["attempts"] == 1
+        assert 0 < timing["time_to_first_token"] <= timing["total"]
+        assert current_timing() is None
+    finally:
+        await ai.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_retries_are_counted() -> None:
+    """测试重试次数计入耗时记录"""
+    server = await _start(error_429_rate=1.0, retry_after=0.01)
+    pool = HTTPConnectionPool()
+    try:
+        provider = MockProvider(api_key="mock", pool=pool, api_url=server.url,
+                                retry_policy=RetryPolicy(max_retries=2, base_delay=0.01),
+                                breaker=CircuitBreaker("timing-test"))
+        with track_timing() as timing:
+            with pytest.raises(APIError):
+                await provider.generate_command("list files", {})
+        assert timing.attempts == 3
+        assert timing.retries == 2
+    finally:
+        await pool.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_execute_raw_reports_execution_timing(tmp_path: Path) -> None:
+    """测试 /api/execute-raw 不经过AI，只报告执行耗时"""
+    from ata.web_server import WebServer
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "general:\n"
+        f"  working_directory: {tmp_path}\n"
+        "ai:\n"
+        "  provider: mock\n"
+        "  cache:\n"
+        "    persistent: false\n",
+        encoding="utf-8",
+    )
+    server = WebServer(ConfigManager(config_path))
+    client = server.app.test_client()
+    try:
+        response = await client.post("/api/execute-raw", json={"command": "echo hi"})
+        assert response.status_code == 200
+        data = await response.get_json()
+        assert data["success"] is True
+        assert set(data["timing"]) == {"execution"}
+        assert data["timing"]["execution"] >= 0
+    finally:
+        await server.ai_interface.close()